@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Count, Q
+from notices.models import Notice
+from tlsa_server.cache import bump_model_versions
+from .models import ClassCounter, ClassLocation, Experiment
+
+COUNTER_FIELDS = ['class_notice_count', 'lab_notice_count', 'experiment_count']
+
+def get_class_labs(class_ids):
+    """Map each class to the lab of its first location, same as ClassLocation.objects.filter(...).first()."""
+    class_labs = {}
+    locations = ClassLocation.objects.filter(class_id__in=class_ids).select_related('lab_id').order_by('id')
+    for location in locations:
+        class_labs.setdefault(location.class_id_id, location.lab_id)
+    return class_labs
+
+def count_class_notices(class_ids, class_labs, notices=None):
+    """
+    Count class and lab notices for a batch of classes in one grouped query.
+
+    `notices` narrows the counted notices, e.g. Notice.objects.active().
+    Returns a dict of class_id -> (class_notice_count, lab_notice_count).
+    """
+    if notices is None:
+        notices = Notice.objects.all()
+    lab_ids = {lab.id for lab in class_labs.values()}
+    notice_counts = notices.filter(
+        Q(notice_type='class', class_or_lab_id__in=class_ids) |
+        Q(notice_type='lab', class_or_lab_id__in=lab_ids)
+    ).values('notice_type', 'class_or_lab_id').annotate(count=Count('id'))
+    notice_count_map = {(row['notice_type'], row['class_or_lab_id']): row['count'] for row in notice_counts}
+
+    counts = {}
+    for class_id in class_ids:
+        lab = class_labs.get(class_id)
+        counts[class_id] = (
+            notice_count_map.get(('class', class_id), 0),
+            notice_count_map.get(('lab', lab.id), 0) if lab else 0,
+        )
+    return counts
+
+def compute_class_counters(class_ids, class_labs=None):
+    """
+    Count class notices, lab notices and experiments for a batch of classes with grouped aggregates.
+
+    Returns a dict of class_id -> {field: count} for every counter field.
+    """
+    class_ids = list(set(class_ids))
+    if class_labs is None:
+        class_labs = get_class_labs(class_ids)
+
+    notice_counts = count_class_notices(class_ids, class_labs)
+
+    experiment_counts = Experiment.objects.filter(class_id__in=class_ids).values('class_id').annotate(count=Count('id'))
+    experiment_count_map = {row['class_id']: row['count'] for row in experiment_counts}
+
+    counters = {}
+    for class_id in class_ids:
+        class_notice_count, lab_notice_count = notice_counts[class_id]
+        counters[class_id] = {
+            'class_notice_count': class_notice_count,
+            'lab_notice_count': lab_notice_count,
+            'experiment_count': experiment_count_map.get(class_id, 0),
+        }
+    return counters
+
+def refresh_class_counters(class_ids):
+    """
+    Recompute the stored counters of the given classes.
+
+    Only existing ClassCounter rows are updated, rows are created together with their class.
+    """
+    counters = list(ClassCounter.objects.filter(class_instance_id__in=set(class_ids)))
+    if not counters:
+        return
+    computed = compute_class_counters([counter.class_instance_id for counter in counters])
+    for counter in counters:
+        for field, value in computed[counter.class_instance_id].items():
+            setattr(counter, field, value)
+    ClassCounter.objects.bulk_update(counters, COUNTER_FIELDS)
+    # Called from signals inside the writer's transaction, see track_model_versions
+    transaction.on_commit(lambda: bump_model_versions(ClassCounter))
+
+def refresh_lab_counters(lab_ids):
+    """Recompute the counters of every class located at the given labs."""
+    class_ids = ClassLocation.objects.filter(lab_id__in=set(lab_ids)).values_list('class_id', flat=True)
+    refresh_class_counters(list(class_ids))
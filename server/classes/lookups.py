@@ -0,0 +1,22 @@
+from django.db.models import JSONField, Lookup
+from django.db.models.fields.json import DataContains
+
+@JSONField.register_lookup
+class HasTag(Lookup):
+    """
+    `field__has_tag='Corrosive'`: the JSON list in the field contains the string.
+
+    On PostgreSQL this is the containment query `field__contains=['Corrosive']` (jsonb @>),
+    served by the GIN indexes of classes.migrations.0005. SQLite has no JSON containment,
+    there the list is scanned with json_each.
+    """
+    lookup_name = 'has_tag'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'EXISTS (SELECT 1 FROM json_each({lhs}) WHERE json_each.value = {rhs})', [*lhs_params, *rhs_params]
+
+    def as_postgresql(self, compiler, connection):
+        return compiler.compile(DataContains(self.lhs, [self.rhs]))
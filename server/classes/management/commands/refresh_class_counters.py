@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from classes.models import Class, ClassCounter
+from classes.counters import COUNTER_FIELDS, compute_class_counters
+from tlsa_server.cache import bump_model_versions
+
+class Command(BaseCommand):
+    help = 'Recompute the per-class notice and experiment counters, or verify them with --verify'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help='Only report counters that differ from the live counts')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of classes processed per batch')
+
+    def handle(self, *args, **kwargs):
+        verify = kwargs['verify']
+        batch_size = kwargs['batch_size']
+
+        class_ids = list(Class.objects.order_by('id').values_list('id', flat=True))
+        mismatches = 0
+        for start in range(0, len(class_ids), batch_size):
+            batch = class_ids[start:start + batch_size]
+            computed = compute_class_counters(batch)
+            stored = {counter.class_instance_id: counter for counter in ClassCounter.objects.filter(class_instance_id__in=batch)}
+
+            changed = []
+            for class_id in batch:
+                counter = stored.get(class_id) or ClassCounter(class_instance_id=class_id)
+                expected = computed[class_id]
+                if class_id in stored and all(getattr(counter, field) == value for field, value in expected.items()):
+                    continue
+
+                mismatches += 1
+                if verify:
+                    actual = {field: getattr(counter, field) for field in COUNTER_FIELDS} if class_id in stored else None
+                    self.stdout.write(self.style.WARNING(f'Class {class_id}: stored {actual}, expected {expected}'))
+                for field, value in expected.items():
+                    setattr(counter, field, value)
+                changed.append(counter)
+
+            if not verify and changed:
+                with transaction.atomic():
+                    ClassCounter.objects.bulk_create(
+                        changed,
+                        update_conflicts=True,
+                        unique_fields=['class_instance'],
+                        update_fields=COUNTER_FIELDS,
+                    )
+                bump_model_versions(ClassCounter)
+
+        if verify:
+            if mismatches:
+                raise CommandError(f'{mismatches} of {len(class_ids)} class counters are out of date.')
+            self.stdout.write(self.style.SUCCESS(f'All {len(class_ids)} class counters are up to date.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Refreshed {mismatches} of {len(class_ids)} class counters.'))
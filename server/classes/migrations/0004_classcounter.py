@@ -0,0 +1,58 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_class_counters(apps, schema_editor):
+    Class = apps.get_model('classes', 'Class')
+    ClassCounter = apps.get_model('classes', 'ClassCounter')
+    ClassLocation = apps.get_model('classes', 'ClassLocation')
+    Experiment = apps.get_model('classes', 'Experiment')
+    Notice = apps.get_model('notices', 'Notice')
+
+    class_labs = {}
+    for class_id, lab_id in ClassLocation.objects.order_by('id').values_list('class_id', 'lab_id'):
+        class_labs.setdefault(class_id, lab_id)
+
+    notice_counts = {
+        (row['notice_type'], row['class_or_lab_id']): row['count']
+        for row in Notice.objects.values('notice_type', 'class_or_lab_id').annotate(count=Count('id'))
+    }
+    experiment_counts = dict(Experiment.objects.values('class_id').annotate(count=Count('id')).values_list('class_id', 'count'))
+
+    counters = []
+    for class_id in Class.objects.values_list('id', flat=True):
+        lab_id = class_labs.get(class_id)
+        counters.append(ClassCounter(
+            class_instance_id=class_id,
+            class_notice_count=notice_counts.get(('class', class_id), 0),
+            lab_notice_count=notice_counts.get(('lab', lab_id), 0) if lab_id else 0,
+            experiment_count=experiment_counts.get(class_id, 0),
+        ))
+    ClassCounter.objects.bulk_create(counters, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_alter_experiment_experiment_method_tags_and_more'),
+        ('notices', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassCounter',
+            fields=[
+                ('class_instance', models.OneToOneField(db_column='class_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='classes.class')),
+                ('class_notice_count', models.IntegerField(default=0)),
+                ('lab_notice_count', models.IntegerField(default=0)),
+                ('experiment_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'class_counter',
+            },
+        ),
+        migrations.RunPython(populate_class_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+TAG_FIELDS = ['safety_tags', 'experiment_method_tags', 'submission_type_tags', 'other_tags']
+
+
+def create_gin_indexes(apps, schema_editor):
+    # jsonb_path_ops GIN indexes serve the containment (@>) queries of the has_tag lookup,
+    # other databases scan the JSON lists instead (see classes.lookups)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in TAG_FIELDS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS experiment_{field}_gin ON classes_experiment USING GIN ({field} jsonb_path_ops)"
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for field in TAG_FIELDS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS experiment_{field}_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0004_classcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
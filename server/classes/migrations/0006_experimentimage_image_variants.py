@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0005_experiment_tag_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experimentimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
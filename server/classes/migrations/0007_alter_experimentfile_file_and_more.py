@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0006_experimentimage_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='experimentfile',
+            name='file',
+            field=models.FileField(upload_to='experiment_files/'),
+        ),
+        migrations.AlterField(
+            model_name='experimentimage',
+            name='image',
+            field=models.ImageField(upload_to='experiment_images/'),
+        ),
+    ]
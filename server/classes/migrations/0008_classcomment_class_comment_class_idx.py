@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0007_alter_experimentfile_file_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='classcomment',
+            index=models.Index(fields=['class_id', 'id'], name='class_comment_class_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0008_classcomment_class_comment_class_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experimentfile',
+            name='file_original_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='experimentimage',
+            name='image_original_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
@@ -1,31 +1,8 @@
 from django.db import models
 from tlsa_server.models import TLSA_User
 from labs.models import Lab
-from django.utils.deconstruct import deconstructible
-import os
-from datetime import datetime
-
-@deconstructible
-class DateTimeFileName(object):
-    def __init__(self, path):
-        self.path = path
-
-    def __call__(self, instance, filename):
-        # Get the file extension
-        ext = filename.split('.')[-1]
-        
-        # Get the original filename (without extension)
-        original_name = os.path.splitext(filename)[0]
-        
-        # Get the current datetime in a readable format
-        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Create the new filename
-        new_filename = f"{original_name}-{current_datetime}.{ext}"
-        
-        # Return the full path
-        return os.path.join(self.path, new_filename)
-
+# Referenced by migrations/0001_initial.py
+from tlsa_server.storage import DateTimeFileName  # noqa: F401
 
 class Class(models.Model):
     name = models.CharField(max_length=100)
@@ -36,6 +13,23 @@ class Class(models.Model):
     def __str__(self):
         return self.name
 
+class ClassCounter(models.Model):
+    """Denormalized notice and experiment counts for a class, kept current by classes.signals."""
+    class_instance = models.OneToOneField(Class, on_delete=models.CASCADE, primary_key=True, related_name='counter', db_column='class_id')
+    class_notice_count = models.IntegerField(default=0)
+    lab_notice_count = models.IntegerField(default=0)  # Notices of the lab the class is located at
+    experiment_count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'class_counter'
+
+    @property
+    def notice_count(self):
+        return self.class_notice_count + self.lab_notice_count
+
+    def __str__(self):
+        return f"Counters for Class {self.class_instance_id}"
+
 class ClassLocation(models.Model):
     class_id = models.ForeignKey(Class, on_delete=models.CASCADE)
     lab_id = models.ForeignKey(Lab, on_delete=models.CASCADE)
@@ -56,10 +50,15 @@ class ClassComment(models.Model):
     sent_time = models.DateTimeField(auto_now_add=True)
     content = models.TextField()
 
+    class Meta:
+        indexes = [
+            # CommentToClassView pages through class_id=... ORDER BY id (id follows sent_time)
+            models.Index(fields=['class_id', 'id'], name='class_comment_class_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.sender_id} on Class {self.class_id}"
 
-
 class Experiment(models.Model):
     EXPERIMENT_METHOD_CHOICES = [
         ('individual', 'Individual'),
@@ -85,14 +84,17 @@ class Experiment(models.Model):
     
 class ExperimentImage(models.Model):
     experiment = models.ForeignKey(Experiment, related_name='images', on_delete=models.CASCADE)
-    image = models.ImageField(upload_to=DateTimeFileName('experiment_images/'))
+    image = models.ImageField(upload_to='experiment_images/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)  # See tlsa_server.images
+    image_original_name = models.CharField(max_length=255, blank=True, default='', editable=False)  # Uploaded file name, see tlsa_server.storage
 
     def __str__(self):
         return f"Image for {self.experiment.title}"
 
 class ExperimentFile(models.Model):
     experiment = models.ForeignKey(Experiment, related_name='files', on_delete=models.CASCADE)
-    file = models.FileField(upload_to=DateTimeFileName('experiment_files/'))
+    file = models.FileField(upload_to='experiment_files/')
+    file_original_name = models.CharField(max_length=255, blank=True, default='', editable=False)  # Uploaded file name, see tlsa_server.storage
 
     def __str__(self):
         return f"File for {self.experiment.title}"
\ No newline at end of file
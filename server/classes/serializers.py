@@ -1,13 +1,16 @@
 from rest_framework import serializers
 from .models import Class, TeachClass, ClassLocation, ClassComment, Experiment, ExperimentFile, ExperimentImage
 from django.contrib.auth import get_user_model
+from tlsa_server.images import ImageVariantSerializerMixin
 
 class ClassSerializer(serializers.ModelSerializer):
     class Meta:
         model = Class
-        fields = ['class_id', 'name', 'start_time']
+        fields = ['class_id', 'name', 'start_time', 'notice_count', 'experiment_count']
 
     class_id = serializers.IntegerField(source='id', read_only=True)
+    notice_count = serializers.IntegerField(source='counter.notice_count', read_only=True)
+    experiment_count = serializers.IntegerField(source='counter.experiment_count', read_only=True)
 
 class TeachClassSerializer(serializers.ModelSerializer):
     class Meta:
@@ -77,7 +80,7 @@ class ClassCommentWithoutSenderSerializer(serializers.ModelSerializer):
 # -----------------------------------------------
 # Experiment
 
-class ExperimentImageSerializer(serializers.ModelSerializer):
+class ExperimentImageSerializer(ImageVariantSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ExperimentImage
         fields = ['image']
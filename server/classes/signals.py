@@ -0,0 +1,77 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from notices.models import Notice
+from .models import Class, ClassCounter, ClassLocation, Experiment, ExperimentFile, ExperimentImage
+from tlsa_server.blobs import track_blobs
+from tlsa_server.cache import track_model_versions
+from tlsa_server.storage import track_original_names
+from tlsa_server.images import track_image_variants
+from .counters import refresh_class_counters, refresh_lab_counters
+
+# Queryset.update() and bulk_create() do not send these signals,
+# run `manage.py refresh_class_counters` after bulk changes.
+
+# Version counters behind the ETags of the course pages
+track_model_versions(ClassLocation)
+track_model_versions(ClassCounter)
+
+# Resized copies of uploaded images
+track_image_variants(ExperimentImage, 'image')
+
+# Reference counts and uploaded names of the stored files, deleting a row deletes files no other row uses
+track_blobs(ExperimentImage, 'image')
+track_original_names(ExperimentImage, 'image')
+track_blobs(ExperimentFile, 'file')
+track_original_names(ExperimentFile, 'file')
+
+@receiver(post_save, sender=Class)
+def create_class_counter(sender, instance, created, **kwargs):
+    if created:
+        ClassCounter.objects.get_or_create(class_instance=instance)
+
+def _refresh_notice_target(notice_type, class_or_lab_id):
+    if notice_type == 'class':
+        refresh_class_counters([class_or_lab_id])
+    elif notice_type == 'lab':
+        refresh_lab_counters([class_or_lab_id])
+
+@receiver(pre_save, sender=Notice)
+def remember_notice_target(sender, instance, **kwargs):
+    instance._previous_target = None
+    if instance.pk:
+        instance._previous_target = Notice.objects.filter(pk=instance.pk).values_list('notice_type', 'class_or_lab_id').first()
+
+@receiver(post_save, sender=Notice)
+def update_counters_on_notice_save(sender, instance, created, **kwargs):
+    previous_target = getattr(instance, '_previous_target', None)
+    current_target = (instance.notice_type, instance.class_or_lab_id)
+    if previous_target == current_target:
+        return
+    if previous_target:
+        _refresh_notice_target(*previous_target)
+    _refresh_notice_target(*current_target)
+
+@receiver(post_delete, sender=Notice)
+def update_counters_on_notice_delete(sender, instance, **kwargs):
+    _refresh_notice_target(instance.notice_type, instance.class_or_lab_id)
+
+@receiver(pre_save, sender=Experiment)
+@receiver(pre_save, sender=ClassLocation)
+def remember_previous_class(sender, instance, **kwargs):
+    instance._previous_class_id = None
+    if instance.pk:
+        instance._previous_class_id = sender.objects.filter(pk=instance.pk).values_list('class_id', flat=True).first()
+
+@receiver(post_save, sender=Experiment)
+@receiver(post_save, sender=ClassLocation)
+def update_counters_on_class_relation_save(sender, instance, created, **kwargs):
+    class_ids = {instance.class_id_id}
+    previous_class_id = getattr(instance, '_previous_class_id', None)
+    if previous_class_id:
+        class_ids.add(previous_class_id)
+    refresh_class_counters(class_ids)
+
+@receiver(post_delete, sender=Experiment)
+@receiver(post_delete, sender=ClassLocation)
+def update_counters_on_class_relation_delete(sender, instance, **kwargs):
+    refresh_class_counters([instance.class_id_id])
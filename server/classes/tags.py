@@ -0,0 +1,61 @@
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+# The JSON list fields of Experiment that hold tags
+EXPERIMENT_TAG_FIELDS = ['safety_tags', 'experiment_method_tags', 'submission_type_tags', 'other_tags']
+
+def filter_experiment_tags(experiments, query_params):
+    """
+    Filter experiments by the comma separated tags given per tag field in the query params.
+
+    `tag_match=all` (default) requires every given tag, `tag_match=any` at least one of them.
+    The deprecated `safety_tag` keeps its substring match and always applies on top.
+    """
+    tag_match = query_params.get('tag_match', 'all')
+    if tag_match not in ['all', 'any']:
+        raise ValidationError({"tag_match": "Must be 'all' or 'any'."})
+
+    conditions = []
+    for field in EXPERIMENT_TAG_FIELDS:
+        for tag in query_params.get(field, '').split(','):
+            if tag.strip():
+                conditions.append(Q(**{f'{field}__has_tag': tag.strip()}))
+    if query_params.get('safety_tag'):
+        experiments = experiments.filter(safety_tags__icontains=query_params['safety_tag'])
+    if not conditions:
+        return experiments
+
+    combined = conditions[0]
+    for condition in conditions[1:]:
+        combined = combined & condition if tag_match == 'all' else combined | condition
+    return experiments.filter(combined)
+
+def experiment_tag_counts(experiments):
+    """
+    Number of experiments per tag of each tag field, counted by the database in one query.
+
+    Returns {field: [{"tag": ..., "count": ...}, ...]} sorted by count, most used first.
+    """
+    ids_sql, ids_params = experiments.order_by().values('id').query.sql_with_params()
+    if connection.vendor == 'postgresql':
+        # Values that are not lists count as empty lists instead of failing the query
+        element = "jsonb_array_elements_text(CASE WHEN jsonb_typeof(e.{field}) = 'array' THEN e.{field} ELSE '[]'::jsonb END) AS t(tag)"
+        tag = "t.tag"
+    else:
+        element = "json_each(CASE WHEN json_type(e.{field}) = 'array' THEN e.{field} ELSE '[]' END) AS t"
+        tag = "t.value"
+
+    selects = [
+        f"SELECT '{field}', {tag}, COUNT(*) FROM classes_experiment e, {element.format(field=field)} "
+        f"WHERE e.id IN ({ids_sql}) GROUP BY {tag}"
+        for field in EXPERIMENT_TAG_FIELDS
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(selects), list(ids_params) * len(EXPERIMENT_TAG_FIELDS))
+        rows = cursor.fetchall()
+
+    facets = {field: [] for field in EXPERIMENT_TAG_FIELDS}
+    for field, tag_name, count in sorted(rows, key=lambda row: (-row[2], str(row[1]))):
+        facets[field].append({"tag": tag_name, "count": count})
+    return facets
@@ -1,3 +1,141 @@
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from tlsa_server.models import TLSA_User
+from labs.models import Lab
+from notices.models import Notice
+from .models import Class, ClassCounter, ClassLocation, Experiment, TeachClass
+from .views import AsyncClassView, ClassView
 
-# Create your tests here.
+class ClassCounterTests(TestCase):
+    def setUp(self):
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.now = timezone.now()
+        self.class_instance = Class.objects.create(name='Titration', start_time=self.now)
+        self.lab = Lab.objects.create(name='Lab 1', location='Chemistry Building')
+
+    def _create_notice(self, notice_type, class_or_lab_id):
+        return Notice.objects.create(class_or_lab_id=class_or_lab_id, sender=self.teacher, notice_type=notice_type, post_time=self.now, end_time=self.now + timedelta(days=1))
+
+    def _counter(self):
+        return ClassCounter.objects.get(class_instance=self.class_instance)
+
+    def test_counters_follow_notices_experiments_and_locations(self):
+        self.assertEqual(self._counter().notice_count, 0)
+
+        class_notice = self._create_notice('class', self.class_instance.id)
+        self._create_notice('lab', self.lab.id)
+        experiment = Experiment.objects.create(title='Titration', estimated_time=1, class_id=self.class_instance)
+        self.assertEqual(self._counter().class_notice_count, 1)
+        self.assertEqual(self._counter().lab_notice_count, 0)
+        self.assertEqual(self._counter().experiment_count, 1)
+
+        location = ClassLocation.objects.create(class_id=self.class_instance, lab_id=self.lab)
+        self.assertEqual(self._counter().lab_notice_count, 1)
+
+        class_notice.notice_type = 'lab'
+        class_notice.class_or_lab_id = self.lab.id
+        class_notice.save()
+        self.assertEqual(self._counter().class_notice_count, 0)
+        self.assertEqual(self._counter().lab_notice_count, 2)
+
+        experiment.delete()
+        location.delete()
+        self.assertEqual(self._counter().experiment_count, 0)
+        self.assertEqual(self._counter().lab_notice_count, 0)
+
+    def test_refresh_command_repairs_drift(self):
+        self._create_notice('class', self.class_instance.id)
+        ClassCounter.objects.filter(class_instance=self.class_instance).update(class_notice_count=5)
+
+        with self.assertRaises(CommandError):
+            call_command('refresh_class_counters', '--verify', stdout=StringIO())
+        call_command('refresh_class_counters', stdout=StringIO())
+        call_command('refresh_class_counters', '--verify', stdout=StringIO())
+        self.assertEqual(self._counter().class_notice_count, 1)
+
+    def test_class_delete_cascades(self):
+        self._create_notice('class', self.class_instance.id)
+        Experiment.objects.create(title='Titration', estimated_time=1, class_id=self.class_instance)
+        ClassLocation.objects.create(class_id=self.class_instance, lab_id=self.lab)
+        self.class_instance.delete()
+        self.assertFalse(ClassCounter.objects.exists())
+
+class AsyncClassViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        for i in range(3):
+            class_instance = Class.objects.create(name=f'Class {i}', start_time=timezone.now())
+            Experiment.objects.create(title='Titration', estimated_time=1, class_id=class_instance)
+            if i:
+                TeachClass.objects.create(class_id=class_instance, teacher_id=self.teacher)
+
+    def get(self, view, params):
+        request = self.factory.get('/api/v1/classes/class', params)
+        force_authenticate(request, user=self.teacher)
+        return view.as_view()(request)
+
+    async def test_matches_sync_view(self):
+        for params in [{}, {'page_size': 1}, {'personal': 'true'}, {'class_name': 'Class 1', 'legacy': 'true'}]:
+            response = await self.get(AsyncClassView, params)
+            expected = await sync_to_async(self.get)(ClassView, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, expected.data)
+
+class ExperimentTagTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='student'))
+        self.class_instance = Class.objects.create(name='Titration', start_time=timezone.now())
+        tags = [
+            (['Corrosive', 'Flammable'], ['group']),
+            (['Corrosive'], ['individual']),
+            (['Flammable gas'], ['group']),
+            ([], ['group']),
+        ]
+        self.experiments = [
+            Experiment.objects.create(title=f'Experiment {i}', estimated_time=1, class_id=self.class_instance, safety_tags=safety, experiment_method_tags=method)
+            for i, (safety, method) in enumerate(tags)
+        ]
+
+    def ids(self, params, url='experiment-list'):
+        response = self.client.get(reverse(url), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(experiment['id'] for experiment in response.data['results'])
+
+    def test_tag_filters(self):
+        e = [experiment.id for experiment in self.experiments]
+        # Exact tags, "Flammable" does not match "Flammable gas"
+        self.assertEqual(self.ids({'safety_tags': 'Flammable'}), [e[0]])
+        # The deprecated parameter still matches part of a tag
+        self.assertEqual(self.ids({'safety_tag': 'flammable'}), [e[0], e[2]])
+        self.assertEqual(self.ids({'safety_tag': 'Flammable', 'safety_tags': 'Corrosive', 'tag_match': 'any'}), [e[0]])
+        self.assertEqual(self.ids({'safety_tags': 'Corrosive,Flammable'}), [e[0]])
+        self.assertEqual(self.ids({'safety_tags': 'Corrosive,Flammable', 'tag_match': 'any'}), [e[0], e[1]])
+        self.assertEqual(self.ids({'safety_tags': 'Corrosive', 'experiment_method_tags': 'group'}), [e[0]])
+        self.assertEqual(self.ids({'safety_tags': 'Flammable gas', 'experiment_method_tags': 'individual', 'tag_match': 'any'}), [e[1], e[2]])
+        response = self.client.get(reverse('experiment-list'), {'safety_tags': 'Corrosive', 'tag_match': 'some'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tag_facets(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('experiment-tags'))
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(response.data['facets']['safety_tags'], [
+            {'tag': 'Corrosive', 'count': 2}, {'tag': 'Flammable', 'count': 1}, {'tag': 'Flammable gas', 'count': 1},
+        ])
+        self.assertEqual(response.data['facets']['experiment_method_tags'], [{'tag': 'group', 'count': 3}, {'tag': 'individual', 'count': 1}])
+        self.assertEqual(response.data['facets']['other_tags'], [])
+
+        response = self.client.get(reverse('experiment-tags'), {'safety_tags': 'Corrosive', 'class_id': self.class_instance.id})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['facets']['experiment_method_tags'], [{'tag': 'group', 'count': 1}, {'tag': 'individual', 'count': 1}])
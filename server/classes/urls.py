@@ -1,14 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from .views import (ClassView, 
+                    AsyncClassView,
                     TeacherClassView, 
                     ClassLocationView, 
                     CommentToClassView,
-                    ExperimentView)
+                    ExperimentView,
+                    ExperimentTagFacetView)
 
 urlpatterns = [
-    path('class', ClassView.as_view(), name='class'),
+    path('class', (AsyncClassView if settings.ASYNC_VIEWS else ClassView).as_view(), name='class'),
     path('teachers', TeacherClassView.as_view(), name='teach-class'),
     path('locations', ClassLocationView.as_view(), name='class-location'),
     path('comments', CommentToClassView.as_view(), name='class-comments'),
     path('experiments/', ExperimentView.as_view(), name='experiment-list'),
+    path('experiments/tags', ExperimentTagFacetView.as_view(), name='experiment-tags'),
 ]
\ No newline at end of file
@@ -1,7 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from tlsa_server.authentication import TokenClaimsAuthentication
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from tlsa_server.permissions import IsAuthenticated, IsTeacher, IsTeachingAffairs, IsManager
 from .models import (Class, 
@@ -23,11 +23,51 @@ from .serializers import (ClassSerializer,
                           ExperimentImageSerializer,
                           ExperimentFileSerializer)
 from django.db.models import Q
-from courses.models import (CourseClass, CourseEnrollment)
-from labs.models import (ManageLab)
-
-class ClassView(APIView):
-    authentication_classes = [JWTAuthentication]
+from courses.scope import get_user_scope
+from tlsa_server.pagination import KeysetPaginationMixin, KEYSET_PAGINATION_PARAMETERS
+from .tags import EXPERIMENT_TAG_FIELDS, filter_experiment_tags, experiment_tag_counts
+from tlsa_server.async_views import AsyncAPIViewMixin
+from tlsa_server.images import IMAGE_SIZE_PARAMETER, image_size_context
+from asgiref.sync import sync_to_async
+
+CLASS_LIST_SCHEMA = dict(
+    parameters=[
+        OpenApiParameter(
+            name='class_id',
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description='Class ID to retrieve',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='class_name',
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description='Class name to retrieve (similarity)',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='course_id',
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description='Course ID to retrieve classes for',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='personal',
+            type=bool,
+            location=OpenApiParameter.QUERY,
+            description='Get personal classes',
+            required=False,
+        ),
+    ] + KEYSET_PAGINATION_PARAMETERS,
+    responses={
+        200: ClassSerializer(many=True),
+    },
+)
+
+class ClassView(KeysetPaginationMixin, APIView):
+    authentication_classes = [TokenClaimsAuthentication]
     serializer_class = ClassSerializer
 
     def get_permissions(self):
@@ -58,47 +98,14 @@ class ClassView(APIView):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                name='class_id',
-                type=int,
-                location=OpenApiParameter.QUERY,
-                description='Class ID to retrieve',
-                required=False,
-            ),
-            OpenApiParameter(
-                name='class_name',
-                type=str,
-                location=OpenApiParameter.QUERY,
-                description='Class name to retrieve (similarity)',
-                required=False,
-            ),
-            OpenApiParameter(
-                name='course_id',
-                type=int,
-                location=OpenApiParameter.QUERY,
-                description='Course ID to retrieve classes for',
-                required=False,
-            ),
-            OpenApiParameter(
-                name='personal',
-                type=bool,
-                location=OpenApiParameter.QUERY,
-                description='Get personal classes',
-                required=False,
-            ),
-        ],
-        responses={
-            200: ClassSerializer(many=True),
-        },
-    )
-    def get(self, request, format=None):
+    def is_personal(self, request):
+        personal = request.query_params.get('personal')
+        return bool(personal and personal.lower() == "true" and request.user.role in ["student", "teacher", "manager"])
+
+    def get_classes(self, request, personal_class_ids=None):
         class_id = request.query_params.get('class_id')
         class_name = request.query_params.get('class_name')
         course_id = request.query_params.get('course_id')
-        personal = request.query_params.get('personal')
-        user = request.user
 
         query = Q()
 
@@ -108,21 +115,15 @@ class ClassView(APIView):
             query &= Q(name__icontains=class_name)
         if course_id:
             query &= Q(courseclass__course_id=course_id)
+        if personal_class_ids is not None:
+            query &= Q(id__in=personal_class_ids)
 
-        if personal and personal.lower() == "true":
-            if user.role == "student":
-                enrolled_courses = CourseEnrollment.objects.filter(student=user).values_list('course_id', flat=True)
-                query &= Q(courseclass__course_id__in=enrolled_courses)
-            elif user.role == "teacher":
-                query &= Q(teachclass__teacher_id=user)
-            elif user.role == "manager":
-                managed_labs = ManageLab.objects.filter(manager=user).values_list('lab_id', flat=True)
-                query &= Q(classlocation__lab_id__in=managed_labs)
-
-        classes = Class.objects.filter(query)
+        return Class.objects.filter(query).select_related('counter')
 
-        serializer = ClassSerializer(classes, many=True)
-        return Response(serializer.data)
+    @extend_schema(**CLASS_LIST_SCHEMA)
+    def get(self, request, format=None):
+        personal_class_ids = get_user_scope(request.user)['class_ids'] if self.is_personal(request) else None
+        return self.paginated_response(self.get_classes(request, personal_class_ids), ClassSerializer)
     
     @extend_schema(
         request=ClassPatchSerializer,
@@ -183,6 +184,16 @@ class ClassView(APIView):
         return Response({"message": "Class deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
 
+class AsyncClassView(AsyncAPIViewMixin, ClassView):
+    """ClassView with an async GET, routed instead of ClassView when ASYNC_VIEWS is on."""
+
+    @extend_schema(**CLASS_LIST_SCHEMA)
+    async def get(self, request, format=None):
+        personal_class_ids = None
+        if self.is_personal(request):
+            personal_class_ids = (await sync_to_async(get_user_scope)(request.user))['class_ids']
+        return await self.apaginated_response(self.get_classes(request, personal_class_ids), ClassSerializer)
+
 class TeacherClassView(APIView):
     serializer_class = TeachClassSerializer
 
@@ -418,8 +429,8 @@ class ClassLocationView(APIView):
         location.delete()
         return Response({"message": "Location deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
-class CommentToClassView(APIView):
-    authentication_classes = [JWTAuthentication]
+class CommentToClassView(KeysetPaginationMixin, APIView):
+    authentication_classes = [TokenClaimsAuthentication]
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -465,7 +476,7 @@ class CommentToClassView(APIView):
                 description='Sender ID to retrieve comments',
                 required=False,
             ),
-        ],
+        ] + KEYSET_PAGINATION_PARAMETERS,
         responses={
             200: ClassCommentSerializer(many=True),
         },
@@ -481,9 +492,8 @@ class CommentToClassView(APIView):
         if sender_id:
             filters["sender_id"] = sender_id
 
-        comments = ClassComment.objects.filter(**filters)
-        serializer = serializer_class(comments, many=True)
-        return Response(serializer.data)
+        comments = ClassComment.objects.filter(**filters).select_related('sender_id')
+        return self.paginated_response(comments, serializer_class)
     
     @extend_schema(
         parameters=[
@@ -523,7 +533,7 @@ class CommentToClassView(APIView):
             return Response({"message": "Comment not found."}, status=status.HTTP_404_NOT_FOUND)
 
         if user.role not in ["teacher", "manager", "teachingAffairs"]:
-            if user != comment.sender_id:
+            if user.user_id != comment.sender_id_id:
                 return Response({"error": "You do not have permission to delete another user's message."}, status=status.HTTP_403_FORBIDDEN)
         comment.delete()
         return Response({"message": "Comment deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
@@ -531,9 +541,36 @@ class CommentToClassView(APIView):
 # -----------------------------------------------
 # Experiment
 
-class ExperimentView(APIView):
+EXPERIMENT_TAG_PARAMETERS = [
+    OpenApiParameter(
+        name=field,
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description=f'Filter by {field.replace("_", " ")}, comma separated',
+        required=False,
+    )
+    for field in EXPERIMENT_TAG_FIELDS
+] + [
+    OpenApiParameter(
+        name='tag_match',
+        type=str,
+        enum=['all', 'any'],
+        location=OpenApiParameter.QUERY,
+        description='Require all given tags (default) or any of them',
+        required=False,
+    ),
+    OpenApiParameter(
+        name='safety_tag',
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description='Filter by part of a safety tag (deprecated, use safety_tags)',
+        required=False,
+    ),
+]
+
+class ExperimentView(KeysetPaginationMixin, APIView):
     serializer_class = ExperimentSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenClaimsAuthentication]
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -624,14 +661,7 @@ class ExperimentView(APIView):
                 description='Query by description (similarity)',
                 required=False,
             ),
-            OpenApiParameter(
-                name='safety_tag',
-                type=str,
-                location=OpenApiParameter.QUERY,
-                description='Filter by safety tag (similarity)',
-                required=False,
-            ),
-        ],
+        ] + EXPERIMENT_TAG_PARAMETERS + [IMAGE_SIZE_PARAMETER] + KEYSET_PAGINATION_PARAMETERS,
         responses={
             200: ExperimentSerializer(many=True),
         },
@@ -641,7 +671,6 @@ class ExperimentView(APIView):
         experiment_id = request.query_params.get('experiment_id')
         class_id = request.query_params.get('class_id')
         description = request.query_params.get('description')
-        safety_tag = request.query_params.get('safety_tag')
 
         experiments = Experiment.objects.all()
 
@@ -651,11 +680,10 @@ class ExperimentView(APIView):
             experiments = experiments.filter(class_id=class_id)
         if description:
             experiments = experiments.filter(description__icontains=description)
-        if safety_tag:
-            experiments = experiments.filter(safety_tags__icontains=safety_tag)
+        experiments = filter_experiment_tags(experiments, request.query_params)
 
-        serializer = serializer_class(experiments, many=True)
-        return Response(serializer.data)
+        experiments = experiments.prefetch_related('images', 'files')
+        return self.paginated_response(experiments, serializer_class, context=image_size_context(request))
 
     @extend_schema(
         request={
@@ -750,4 +778,47 @@ class ExperimentView(APIView):
             return Response({"message": "Experiment not found."}, status=status.HTTP_404_NOT_FOUND)
 
         experiment.delete()
-        return Response({"message": "Experiment deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        return Response({"message": "Experiment deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
+
+class ExperimentTagFacetView(APIView):
+    authentication_classes = [TokenClaimsAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='class_id',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='Only count experiments of this class',
+                required=False,
+            ),
+        ] + EXPERIMENT_TAG_PARAMETERS,
+        examples=[
+            OpenApiExample(
+                'Tag counts',
+                value={
+                    "count": 12,
+                    "facets": {
+                        "safety_tags": [{"tag": "Corrosive", "count": 5}, {"tag": "Flammable", "count": 2}],
+                        "experiment_method_tags": [{"tag": "group", "count": 8}],
+                        "submission_type_tags": [{"tag": "paper_report", "count": 12}],
+                        "other_tags": []
+                    }
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request, format=None):
+        """Experiments per tag, under the same tag filters as ExperimentView.get."""
+        experiments = Experiment.objects.all()
+        class_id = request.query_params.get('class_id')
+        if class_id:
+            experiments = experiments.filter(class_id=class_id)
+        experiments = filter_experiment_tags(experiments, request.query_params)
+
+        return Response({
+            "count": experiments.count(),
+            "facets": experiment_tag_counts(experiments),
+        })
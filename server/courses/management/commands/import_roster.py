@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from courses.roster import RosterImporter, read_roster_csv
+
+class Command(BaseCommand):
+    help = 'Import users and course enrollments from a roster CSV (columns: user_id, password, real_name, department, phone_number, email, role, course_code, course_sequence)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=str, help='Path of the roster CSV file')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Number of rows validated and inserted per batch')
+        parser.add_argument('--workers', type=int, default=None, help='Password hashing processes, 0 hashes in this process (default: CPU count)')
+
+    def handle(self, *args, **kwargs):
+        def progress(report):
+            self.stdout.write(f"{report['rows']} rows processed: {report['created']} created, {report['existing']} existing, {len(report['errors'])} errors")
+
+        importer = RosterImporter(chunk_size=kwargs['chunk_size'], workers=kwargs['workers'], progress=progress)
+        try:
+            with open(kwargs['path'], newline='', encoding='utf-8-sig') as file:
+                report = importer.run(read_roster_csv(file))
+        except OSError as e:
+            raise CommandError(f"Could not read roster: {e}")
+
+        for error in report['errors']:
+            self.stdout.write(self.style.ERROR(f"Row {error['row']} ({error['user_id']}): {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report['rows']} rows: {report['created']} users created, {report['existing']} already existed, "
+            f"{report['enrolled']} enrollments linked, {len(report['errors'])} rows rejected."
+        ))
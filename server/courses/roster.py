@@ -0,0 +1,194 @@
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from tlsa_server.models import TLSA_User, numeric_validator
+from .models import Course, CourseEnrollment
+from tlsa_server.cache import bump_model_versions
+from .scope import invalidate_user_scopes
+
+ROSTER_COLUMNS = ['user_id', 'password', 'real_name', 'department', 'phone_number', 'email', 'role', 'course_code', 'course_sequence']
+ROSTER_ROLES = ['student', 'teacher', 'manager']
+
+def read_roster_csv(file):
+    """Yield the rows of a roster CSV as dicts, decoding uploaded binary files on the fly."""
+    if isinstance(file.read(0), bytes):
+        file = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    yield from csv.DictReader(file)
+
+class RosterImporter:
+    """
+    Create users and course enrollments from roster rows.
+
+    Rows are processed in chunks: each chunk is validated with one user and one course
+    lookup, passwords are hashed in a process pool, and users and enrollments are
+    inserted with bulk_create in one transaction per chunk. Existing users are left
+    untouched but are still enrolled. Repeated rows of a user_id enroll that user in
+    more courses, the user is created from the first valid one. Rows that fail validation
+    are reported in `errors` and skipped, they do not abort the import.
+    """
+
+    def __init__(self, chunk_size=500, workers=None, progress=None):
+        self.chunk_size = chunk_size
+        # workers=0 hashes in the current process, None uses every CPU
+        self.workers = workers
+        self.progress = progress
+        self.report = {'rows': 0, 'created': 0, 'existing': 0, 'enrolled': 0, 'errors': []}
+        # Role of every user_id validated so far, and the users already counted in the report
+        self._seen_roles = {}
+        self._counted_user_ids = set()
+        self._courses = {}
+
+    def run(self, rows):
+        executor = None
+        if self.workers != 0:
+            # django.setup lets workers started with "spawn" load the password hasher settings
+            executor = ProcessPoolExecutor(max_workers=self.workers or os.cpu_count(), initializer=django.setup)
+        try:
+            # Row numbers start at 2, the header is line 1
+            numbered_rows = enumerate(rows, start=2)
+            while True:
+                chunk = list(islice(numbered_rows, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk, executor)
+                self.report['rows'] += len(chunk)
+                if self.progress:
+                    self.progress(self.report)
+        finally:
+            if executor:
+                executor.shutdown()
+        return self.report
+
+    def _error(self, line, user_id, message):
+        self.report['errors'].append({'row': line, 'user_id': user_id, 'error': message})
+
+    def _load_courses(self, keys):
+        missing = [key for key in keys if key not in self._courses]
+        if not missing:
+            return
+        query = Q()
+        for course_code, course_sequence in missing:
+            query |= Q(course_code=course_code, course_sequence=course_sequence)
+        for course in Course.objects.filter(query):
+            self._courses[(course.course_code, course.course_sequence)] = course
+        for key in missing:
+            self._courses.setdefault(key, None)
+
+    def _validate(self, chunk):
+        valid = []
+        for line, row in chunk:
+            row = {column: (row.get(column) or '').strip() for column in ROSTER_COLUMNS}
+            user_id = row['user_id']
+            if not numeric_validator.regex.match(user_id):
+                self._error(line, user_id, numeric_validator.message)
+                continue
+            # Existing users keep their stored role, a role left empty is not compared with it
+            row['role_given'] = bool(row['role'])
+            row['role'] = row['role'] or self._seen_roles.get(user_id, 'student')
+            if self._seen_roles.get(user_id, row['role']) != row['role']:
+                self._error(line, user_id, f"Role '{row['role']}' conflicts with an earlier row of this user_id.")
+                continue
+            if row['role'] not in ROSTER_ROLES:
+                self._error(line, user_id, f"Invalid role '{row['role']}'.")
+                continue
+            if bool(row['course_code']) != bool(row['course_sequence']):
+                self._error(line, user_id, "course_code and course_sequence must be given together.")
+                continue
+            if row['course_code'] and row['role'] != 'student':
+                self._error(line, user_id, "Only students can be enrolled in a course.")
+                continue
+            self._seen_roles[user_id] = row['role']
+            valid.append((line, row))
+        return valid
+
+    def _import_chunk(self, chunk, executor):
+        rows = self._validate(chunk)
+        self._load_courses({(row['course_code'], row['course_sequence']) for _, row in rows if row['course_code']})
+
+        existing_roles = dict(TLSA_User.objects.filter(user_id__in=[row['user_id'] for _, row in rows]).values_list('user_id', 'role'))
+        # Keyed by user_id, repeated rows of a user add enrollments only
+        new_rows, enroll_rows, existing = {}, {}, set()
+        for line, row in rows:
+            course = self._courses.get((row['course_code'], row['course_sequence'])) if row['course_code'] else None
+            if row['course_code'] and course is None:
+                self._error(line, row['user_id'], f"Course {row['course_code']}-{row['course_sequence']} does not exist.")
+                continue
+            stored_role = existing_roles.get(row['user_id'])
+            if stored_role is not None:
+                if row['role_given'] and row['role'] != stored_role:
+                    self._error(line, row['user_id'], f"Role '{row['role']}' differs from the stored role '{stored_role}'.")
+                    continue
+                if course and stored_role != 'student':
+                    self._error(line, row['user_id'], "Only students can be enrolled in a course.")
+                    continue
+                existing.add(row['user_id'])
+            elif row['user_id'] not in new_rows:
+                if not row['password']:
+                    self._error(line, row['user_id'], "Password is required for new users.")
+                    continue
+                new_rows[row['user_id']] = row
+            if course:
+                enroll_rows[(row['user_id'], course.id)] = course
+        existing -= self._counted_user_ids
+        new_rows = list(new_rows.values())
+
+        passwords = [row['password'] for row in new_rows]
+        if executor:
+            hashed = list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+        else:
+            hashed = [make_password(password) for password in passwords]
+
+        users = [
+            # Same primary key and username TLSA_User.save() would assign
+            TLSA_User(
+                id=int(row['user_id']),
+                username=row['user_id'],
+                user_id=row['user_id'],
+                password=password,
+                real_name=row['real_name'] or None,
+                department=row['department'] or None,
+                phone_number=row['phone_number'] or None,
+                email=row['email'],
+                role=row['role'],
+            )
+            for row, password in zip(new_rows, hashed)
+        ]
+        # Enrollments that already exist are left out, so `enrolled` only counts new ones
+        enrolled = set()
+        if enroll_rows:
+            enrolled = set(CourseEnrollment.objects.filter(
+                student_id__in={user_id for user_id, _ in enroll_rows}, course_id__in={course_id for _, course_id in enroll_rows}
+            ).values_list('student_id', 'course_id'))
+        enrollments = [
+            CourseEnrollment(student_id=user_id, course=course)
+            for (user_id, course_id), course in enroll_rows.items() if (user_id, course_id) not in enrolled
+        ]
+
+        while True:
+            try:
+                with transaction.atomic():
+                    TLSA_User.objects.bulk_create(users)
+                    CourseEnrollment.objects.bulk_create(enrollments, ignore_conflicts=True)
+                break
+            except IntegrityError:
+                # Another import or a registration created some of these users meanwhile,
+                # they are enrolled as existing users
+                taken = set(TLSA_User.objects.filter(user_id__in=[user.user_id for user in users]).values_list('user_id', flat=True))
+                if not taken:
+                    raise
+                users = [user for user in users if user.user_id not in taken]
+                existing |= taken
+        invalidate_user_scopes([user_id for user_id, _ in enroll_rows])
+        bump_model_versions(TLSA_User, CourseEnrollment)
+
+        self._counted_user_ids.update(existing, (user.user_id for user in users))
+        self.report['created'] += len(users)
+        self.report['existing'] += len(existing)
+        self.report['enrolled'] += len(enrollments)
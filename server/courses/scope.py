@@ -0,0 +1,59 @@
+from tlsa_server.cache import namespace_cache
+from classes.models import ClassLocation, TeachClass
+from labs.models import ManageLab
+from .models import CourseClass, CourseEnrollment
+
+def resolve_user_scope(user):
+    """
+    Resolve the classes and labs a user is involved in, without caching.
+
+    Students: classes of their enrolled courses and the labs of those classes.
+    Teachers: classes they teach and the labs of those classes.
+    Managers: labs they manage and the classes located at those labs.
+    """
+    class_ids, lab_ids = [], []
+    if user.role == "student":
+        enrolled_courses = CourseEnrollment.objects.filter(student_id=user.user_id).values_list('course_id', flat=True)
+        class_ids = list(CourseClass.objects.filter(course_id__in=enrolled_courses).values_list('class_instance_id', flat=True).distinct())
+        lab_ids = list(ClassLocation.objects.filter(class_id__in=class_ids).values_list('lab_id', flat=True).distinct())
+    elif user.role == "teacher":
+        class_ids = list(TeachClass.objects.filter(teacher_id_id=user.user_id).values_list('class_id', flat=True).distinct())
+        lab_ids = list(ClassLocation.objects.filter(class_id__in=class_ids).values_list('lab_id', flat=True).distinct())
+    elif user.role == "manager":
+        lab_ids = list(ManageLab.objects.filter(manager_id=user.user_id).values_list('lab_id', flat=True).distinct())
+        class_ids = list(ClassLocation.objects.filter(lab_id__in=lab_ids).values_list('class_id', flat=True).distinct())
+    return {'class_ids': class_ids, 'lab_ids': lab_ids}
+
+def resolve_notice_audience(notice_type, class_or_lab_id):
+    """
+    The user_ids whose notice page shows a notice, the inverse of resolve_user_scope.
+
+    Class notices reach the students enrolled in a course of the class and its teachers,
+    lab notices the students and teachers of the classes located at the lab.
+    """
+    class_ids = notice_class_ids(notice_type, class_or_lab_id)
+    students = notice_enrollments(notice_type, class_or_lab_id).values_list('student_id', flat=True)
+    teachers = TeachClass.objects.filter(class_id__in=class_ids).values_list('teacher_id_id', flat=True)
+    return set(students) | set(teachers)
+
+def notice_class_ids(notice_type, class_or_lab_id):
+    if notice_type == "class":
+        return [class_or_lab_id]
+    return ClassLocation.objects.filter(lab_id=class_or_lab_id).values_list('class_id', flat=True)
+
+def notice_enrollments(notice_type, class_or_lab_id):
+    """CourseEnrollment rows of the courses a notice reaches, as a lazy queryset for use in subqueries."""
+    courses = CourseClass.objects.filter(class_instance_id__in=notice_class_ids(notice_type, class_or_lab_id)).values('course_id')
+    return CourseEnrollment.objects.filter(course_id__in=courses)
+
+def get_user_scope(user):
+    """Cached resolve_user_scope, invalidated by courses.signals."""
+    return namespace_cache('scope').get_or_set(user.user_id, lambda: resolve_user_scope(user))
+
+def invalidate_user_scopes(user_ids):
+    namespace_cache('scope').delete_many(user_ids)
+
+def invalidate_all_scopes():
+    # Structural changes (CourseClass, ClassLocation) can affect many users at once,
+    # they drop the whole namespace instead of deleting every user's entry.
+    namespace_cache('scope').clear()
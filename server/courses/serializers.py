@@ -1,7 +1,10 @@
 from rest_framework import serializers
+from django.db import transaction
 from .models import Course, CourseEnrollment, CourseClass
 from tlsa_server.models import TLSA_User
 from classes.models import Class
+from tlsa_server.cache import bump_model_versions
+from .scope import invalidate_user_scopes
 
 class CourseSerializer(serializers.ModelSerializer):
     class Meta:
@@ -46,40 +49,58 @@ class CourseEnrollmentSerializer(serializers.ModelSerializer):
     def validate_student_user_ids(self, value):
         if len(value) == 0:
             raise serializers.ValidationError("Must include at least 1 Student user_id.")
-        for student_user_id in value:
-            try:
-                user = TLSA_User.objects.get(user_id=student_user_id)
-                if user.role != "student":
-                    raise serializers.ValidationError(f"User with user_id {student_user_id} is not a student.")
-            except TLSA_User.DoesNotExist:
-                raise serializers.ValidationError(f"User with user_id {student_user_id} does not exist.")
-        return value
+        # Drop duplicates but keep the order the IDs were submitted in
+        return list(dict.fromkeys(value))
 
     def validate(self, data):
         course_code = data.get('course_code')
         course_sequence = data.get('course_sequence')
 
         try:
-            course = Course.objects.get(course_code=course_code, course_sequence=course_sequence)
+            data['course'] = Course.objects.get(course_code=course_code, course_sequence=course_sequence)
         except Course.DoesNotExist:
             raise serializers.ValidationError(f"Course with code {course_code} and sequence {course_sequence} does not exist.")
 
         return data
 
     def save(self):
+        """
+        Enroll all students in one transaction with a single lookup and a single bulk insert.
+
+        Unknown or non-student IDs do not fail the request, every ID is reported back as
+        added, already enrolled or invalid.
+        """
         student_user_ids = self.validated_data['student_user_ids']
-        course_code = self.validated_data['course_code']
-        course_sequence = self.validated_data['course_sequence']
-        course = Course.objects.get(course_code=course_code, course_sequence=course_sequence)
-        enrollments = []
-        for student_user_id in student_user_ids:
-            student = TLSA_User.objects.get(user_id=student_user_id)
-            enrollment = CourseEnrollment.objects.create(
-                student=student,
-                course=course,
+        course = self.validated_data['course']
+
+        with transaction.atomic():
+            student_ids = set(TLSA_User.objects.filter(user_id__in=student_user_ids, role='student').values_list('user_id', flat=True))
+            enrolled_ids = set(CourseEnrollment.objects.filter(course=course, student_id__in=student_ids).values_list('student_id', flat=True))
+
+            added, already_enrolled, invalid = [], [], []
+            for student_user_id in student_user_ids:
+                if student_user_id not in student_ids:
+                    invalid.append(student_user_id)
+                elif student_user_id in enrolled_ids:
+                    already_enrolled.append(student_user_id)
+                else:
+                    added.append(student_user_id)
+
+            # ignore_conflicts covers students enrolled concurrently since the lookup above
+            CourseEnrollment.objects.bulk_create(
+                [CourseEnrollment(student_id=student_user_id, course=course) for student_user_id in added],
+                ignore_conflicts=True,
             )
-            enrollments.append(enrollment)
-        return enrollments
+        # bulk_create skips the signals that normally invalidate the students' cached scopes and the enrollment version
+        invalidate_user_scopes(added)
+        bump_model_versions(CourseEnrollment)
+
+        return {
+            'course': course,
+            'added': added,
+            'already_enrolled': already_enrolled,
+            'invalid': invalid,
+        }
     
 class CourseEnrollmentGetSerializer(serializers.ModelSerializer):
     student_id = serializers.CharField(source='student.user_id', read_only=True)
@@ -126,11 +147,54 @@ class CourseClassGetSerializer(serializers.ModelSerializer):
 
 from rest_framework import serializers
 from .models import Course, CourseClass
-from classes.models import ClassLocation, Class, Experiment
+from classes.models import ClassLocation, Class, Experiment, ClassCounter
+from classes.counters import get_class_labs, compute_class_counters, count_class_notices
 from labs.models import Lab
-from datetime import datetime
 from notices.models import Notice
 
+def load_class_details(class_ids, active=False):
+    """
+    Collect lab names, notice counts and experiment counts for a batch of classes.
+
+    Counts are read from the materialized ClassCounter rows, so this runs a fixed
+    number of queries regardless of how many classes are passed in and the result
+    can be shared by every FrontendClassDetailSerializer on a page.
+    With `active`, notice counts only include notices within their post/end window;
+    these change with time so they are counted live in one indexed grouped query.
+    """
+    class_ids = list(set(class_ids))
+    class_labs = get_class_labs(class_ids)
+
+    counters = {
+        counter.class_instance_id: {
+            'class_notice_count': counter.class_notice_count,
+            'lab_notice_count': counter.lab_notice_count,
+            'experiment_count': counter.experiment_count,
+        }
+        for counter in ClassCounter.objects.filter(class_instance_id__in=class_ids)
+    }
+    # Classes without counters (e.g. created through bulk_create) are counted live
+    missing_ids = [class_id for class_id in class_ids if class_id not in counters]
+    if missing_ids:
+        counters.update(compute_class_counters(missing_ids, class_labs))
+
+    active_notice_counts = count_class_notices(class_ids, class_labs, Notice.objects.active()) if active else {}
+
+    details = {}
+    for class_id in class_ids:
+        lab = class_labs.get(class_id)
+        counter = counters[class_id]
+        if active:
+            notice_count = sum(active_notice_counts[class_id])
+        else:
+            notice_count = counter['class_notice_count'] + counter['lab_notice_count']
+        details[class_id] = {
+            'lab_name': lab.name if lab else None,
+            'notice_count': notice_count,
+            'experiment_count': counter['experiment_count'],
+        }
+    return details
+
 class FrontendClassDetailSerializer(serializers.ModelSerializer):
     lab_name = serializers.SerializerMethodField()
     notice_count = serializers.SerializerMethodField()
@@ -140,54 +204,21 @@ class FrontendClassDetailSerializer(serializers.ModelSerializer):
         model = Class
         fields = ['id', 'name', 'start_time', 'lab_name', 'notice_count', 'experiment_count']
 
+    def _get_details(self, obj):
+        # Details are normally preloaded for the whole page by the view, see load_class_details
+        class_details = self.context.setdefault('class_details', {})
+        if obj.id not in class_details:
+            class_details.update(load_class_details([obj.id]))
+        return class_details[obj.id]
+
     def get_lab_name(self, obj):
-        class_location = ClassLocation.objects.filter(class_id=obj).first()
-        return class_location.lab_id.name if class_location else None
+        return self._get_details(obj)['lab_name']
 
     def get_notice_count(self, obj):
-        # Get the lab_id associated with this class
-        class_location = ClassLocation.objects.filter(class_id=obj).first()
-        lab_id = class_location.lab_id.id if class_location else None
-
-        # Get current datetime for filtering notices
-        current_time = datetime.now()
-
-        # Base query for class notices
-        # class_notices = Notice.objects.filter(
-        #     notice_type='class',
-        #     class_or_lab_id=obj.id,
-        #     post_time__lte=current_time,
-        #     end_time__gte=current_time
-        # ).count()
-
-        # # If lab_id exists, add lab notices
-        # lab_notices = 0
-        # if lab_id:
-        #     lab_notices = Notice.objects.filter(
-        #         notice_type='lab',
-        #         class_or_lab_id=lab_id,
-        #         post_time__lte=current_time,
-        #         end_time__gte=current_time
-        #     ).count()
-
-        # Base query for class notices
-        class_notices = Notice.objects.filter(
-            notice_type='class',
-            class_or_lab_id=obj.id,
-        ).count()
-
-        # If lab_id exists, add lab notices
-        lab_notices = 0
-        if lab_id:
-            lab_notices = Notice.objects.filter(
-                notice_type='lab',
-                class_or_lab_id=lab_id,
-            ).count()
-
-        return class_notices + lab_notices
+        return self._get_details(obj)['notice_count']
 
     def get_experiment_count(self, obj):
-        return Experiment.objects.filter(class_id=obj).count()
+        return self._get_details(obj)['experiment_count']
 
 class CoursePageSerializer(serializers.ModelSerializer):
     classes = serializers.SerializerMethodField()
@@ -197,33 +228,9 @@ class CoursePageSerializer(serializers.ModelSerializer):
         fields = ['id', 'course_code', 'course_sequence', 'classes']
 
     def get_classes(self, obj):
-        course_classes = CourseClass.objects.filter(course=obj).select_related('class_instance')
-        class_instances = [cc.class_instance for cc in course_classes]
-        return FrontendClassDetailSerializer(class_instances, many=True).data
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+        # Uses the course classes prefetched by CoursePageListView
+        class_instances = [cc.class_instance for cc in obj.classes.all()]
+        return FrontendClassDetailSerializer(class_instances, many=True, context=self.context).data
 
 class CourseSummaryPageSerializer(serializers.ModelSerializer):
     class_count = serializers.IntegerField()
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from classes.models import ClassLocation, TeachClass
+from labs.models import ManageLab
+from .models import CourseClass, CourseEnrollment
+from tlsa_server.cache import track_model_versions
+from .models import Course
+from .scope import invalidate_user_scopes, invalidate_all_scopes
+
+# bulk_create() does not send these signals, callers invalidate the scopes themselves.
+
+# Version counters behind the ETags of the course pages
+track_model_versions(Course)
+track_model_versions(CourseClass)
+track_model_versions(CourseEnrollment)
+
+@receiver(post_save, sender=CourseEnrollment)
+@receiver(post_delete, sender=CourseEnrollment)
+def invalidate_student_scope(sender, instance, **kwargs):
+    invalidate_user_scopes([instance.student_id])
+
+@receiver(post_save, sender=TeachClass)
+@receiver(post_delete, sender=TeachClass)
+def invalidate_teacher_scope(sender, instance, **kwargs):
+    invalidate_user_scopes([instance.teacher_id_id])
+
+@receiver(post_save, sender=ManageLab)
+@receiver(post_delete, sender=ManageLab)
+def invalidate_manager_scope(sender, instance, **kwargs):
+    invalidate_user_scopes([instance.manager_id])
+
+@receiver(post_save, sender=CourseClass)
+@receiver(post_delete, sender=CourseClass)
+@receiver(post_save, sender=ClassLocation)
+@receiver(post_delete, sender=ClassLocation)
+def invalidate_scopes(sender, instance, **kwargs):
+    invalidate_all_scopes()
@@ -1,3 +1,251 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from io import StringIO
+import os
+import tempfile
+from unittest import mock
+from rest_framework.test import APIClient
+from tlsa_server.models import TLSA_User
+from labs.models import Lab, ManageLab
+from classes.models import Class, ClassLocation, Experiment, TeachClass
+from notices.models import Notice
+from .models import Course, CourseClass, CourseEnrollment
+from .roster import RosterImporter
+from .scope import get_user_scope
+from .serializers import CourseEnrollmentSerializer
 
-# Create your tests here.
+class CoursePageListViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.now = timezone.now()
+
+    def _create_courses(self, course_count, classes_per_course):
+        for i in range(course_count):
+            course = Course.objects.create(course_code=f'{i:08d}', course_sequence='0', department='Chemistry', name=f'Course {i}')
+            lab = Lab.objects.create(name=f'Lab {i}', location='Chemistry Building')
+            Notice.objects.create(class_or_lab_id=lab.id, sender=self.teacher, notice_type='lab', post_time=self.now, end_time=self.now + timedelta(days=1))
+            for j in range(classes_per_course):
+                class_instance = Class.objects.create(name=f'Class {i}-{j}', start_time=self.now)
+                CourseClass.objects.create(course=course, class_instance=class_instance)
+                ClassLocation.objects.create(class_id=class_instance, lab_id=lab)
+                Notice.objects.create(class_or_lab_id=class_instance.id, sender=self.teacher, notice_type='class', post_time=self.now, end_time=self.now + timedelta(days=1))
+                Experiment.objects.create(title='Titration', estimated_time=1, class_id=class_instance)
+
+    def test_class_details(self):
+        self._create_courses(1, 2)
+        response = self.client.get(reverse('frontend-course-list'))
+        self.assertEqual(response.status_code, 200)
+        classes = response.data['results'][0]['classes']
+        self.assertEqual(len(classes), 2)
+        for class_detail in classes:
+            self.assertEqual(class_detail['lab_name'], 'Lab 0')
+            self.assertEqual(class_detail['notice_count'], 2)
+            self.assertEqual(class_detail['experiment_count'], 1)
+
+    def test_query_count_is_independent_of_page_size(self):
+        self._create_courses(20, 10)
+        # count, courses, course classes, class locations, class counters
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('frontend-course-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 20)
+
+class CourseEnrollmentViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.course = Course.objects.create(course_code='00000001', course_sequence='0', department='Chemistry', name='Chemistry')
+        self.student_ids = [f'20220000{i:02d}' for i in range(50)]
+        TLSA_User.objects.bulk_create([TLSA_User(username=user_id, user_id=user_id, role='student') for user_id in self.student_ids])
+        CourseEnrollment.objects.create(student_id=self.student_ids[0], course=self.course)
+
+    def test_bulk_enrollment_reports_per_student(self):
+        self.client.force_authenticate(self.teacher)
+        data = {
+            'student_user_ids': self.student_ids + ['2029999999', self.teacher.user_id],
+            'course_code': '00000001',
+            'course_sequence': '0',
+        }
+        # course, students, existing enrollments, savepoint, bulk insert, release savepoint
+        with self.assertNumQueries(6):
+            response = self.client.post(reverse('course-enrollment'), data, format='json')
+        self.assertEqual(response.status_code, 201)
+        enrollment = response.data['enrollment']
+        self.assertEqual(enrollment['student_user_ids'], self.student_ids[1:])
+        self.assertEqual(enrollment['already_enrolled'], [self.student_ids[0]])
+        self.assertEqual(enrollment['invalid_user_ids'], ['2029999999', self.teacher.user_id])
+        self.assertEqual(CourseEnrollment.objects.filter(course=self.course).count(), 50)
+
+ROSTER_CSV = """user_id,password,real_name,role,course_code,course_sequence
+2023000001,secret1,Alice,student,00000001,0
+2023000002,secret2,Bob,,00000001,0
+123,secret3,Carol,student,,
+2023000001,,,,00000002,0
+2023000003,secret4,Dan,student,99999999,0
+2021000001,,Teacher,teacher,,
+"""
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RosterImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = TLSA_User.objects.create_user(username='2021000000', user_id='2021000000', password='password', role='teachingAffairs')
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.course = Course.objects.create(course_code='00000001', course_sequence='0', department='Chemistry', name='Chemistry')
+        self.other_course = Course.objects.create(course_code='00000002', course_sequence='0', department='Physics', name='Physics')
+
+    def _check_import(self, report):
+        self.assertEqual(report['rows'], 6)
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['existing'], 1)
+        self.assertEqual(report['enrolled'], 3)
+        self.assertEqual([error['row'] for error in report['errors']], [4, 6])
+        alice = TLSA_User.objects.get(user_id='2023000001')
+        self.assertTrue(alice.check_password('secret1'))
+        self.assertEqual(alice.real_name, 'Alice')
+        self.assertEqual(alice.username, alice.user_id)
+        # The repeated row of Alice enrolls her in a second course
+        self.assertEqual(set(CourseEnrollment.objects.values_list('student_id', 'course_id')), {
+            ('2023000001', self.course.id), ('2023000001', self.other_course.id), ('2023000002', self.course.id),
+        })
+
+    def test_repeated_user_with_other_role(self):
+        rows = [
+            {'user_id': '2023000001', 'password': 'secret1', 'course_code': '00000001', 'course_sequence': '0'},
+            {'user_id': '2023000001', 'role': 'teacher'},
+        ]
+        report = RosterImporter(workers=0).run(rows)
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [3])
+
+    def test_existing_user_keeps_stored_role(self):
+        rows = [
+            # No role column value, the stored teacher role still applies
+            {'user_id': '2021000001', 'course_code': '00000001', 'course_sequence': '0'},
+            {'user_id': '2021000001', 'role': 'student'},
+            {'user_id': '2021000001'},
+        ]
+        report = RosterImporter(workers=0).run(rows)
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3])
+        self.assertEqual((report['existing'], report['enrolled']), (1, 0))
+        self.assertFalse(CourseEnrollment.objects.exists())
+
+    def test_user_created_during_import(self):
+        def hash_and_register(password):
+            # A registration takes the user_id between the lookup and the insert
+            if not TLSA_User.objects.filter(user_id='2023000001').exists():
+                TLSA_User.objects.create_user(username='2023000001', user_id='2023000001', password='other', role='student')
+            return make_password(password)
+
+        rows = [
+            {'user_id': '2023000001', 'password': 'secret1', 'course_code': '00000001', 'course_sequence': '0'},
+            {'user_id': '2023000002', 'password': 'secret2', 'course_code': '00000001', 'course_sequence': '0'},
+        ]
+        with mock.patch('courses.roster.make_password', side_effect=hash_and_register):
+            report = RosterImporter(workers=0).run(rows)
+        self.assertEqual((report['created'], report['existing'], report['enrolled']), (1, 1, 2))
+        self.assertTrue(TLSA_User.objects.get(user_id='2023000001').check_password('other'))
+        self.assertEqual(CourseEnrollment.objects.filter(course=self.course).count(), 2)
+
+    def test_import_endpoint(self):
+        self.client.force_authenticate(self.admin)
+        roster = SimpleUploadedFile('roster.csv', ROSTER_CSV.encode('utf-8'), content_type='text/csv')
+        response = self.client.post(reverse('import-roster'), {'file': roster}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self._check_import(response.data['report'])
+
+        # Importing again enrolls nobody new
+        roster = SimpleUploadedFile('roster.csv', ROSTER_CSV.encode('utf-8'), content_type='text/csv')
+        report = self.client.post(reverse('import-roster'), {'file': roster}, format='multipart').data['report']
+        self.assertEqual((report['created'], report['existing'], report['enrolled']), (0, 3, 0))
+
+    def test_import_command_with_process_pool(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'roster.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(ROSTER_CSV)
+            out = StringIO()
+            call_command('import_roster', path, '--chunk-size', '2', '--workers', '2', stdout=out)
+        self.assertIn('6 rows processed', out.getvalue())
+        self.assertEqual(TLSA_User.objects.filter(user_id__startswith='2023').count(), 2)
+
+class UserScopeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.student = TLSA_User.objects.create_user(username='2022000001', user_id='2022000001', password='password', role='student')
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.manager = TLSA_User.objects.create_user(username='2020000001', user_id='2020000001', password='password', role='manager')
+        self.course = Course.objects.create(course_code='00000001', course_sequence='0', department='Chemistry', name='Chemistry')
+        self.class_instance = Class.objects.create(name='Titration', start_time=timezone.now())
+        self.lab = Lab.objects.create(name='Lab 1', location='Chemistry Building')
+        CourseClass.objects.create(course=self.course, class_instance=self.class_instance)
+        TeachClass.objects.create(class_id=self.class_instance, teacher_id=self.teacher)
+        ManageLab.objects.create(manager=self.manager, lab=self.lab)
+
+    def test_scope_is_cached_and_invalidated(self):
+        self.assertEqual(get_user_scope(self.student), {'class_ids': [], 'lab_ids': []})
+
+        CourseEnrollment.objects.create(student=self.student, course=self.course)
+        self.assertEqual(get_user_scope(self.student), {'class_ids': [self.class_instance.id], 'lab_ids': []})
+        with self.assertNumQueries(0):
+            get_user_scope(self.student)
+
+        self.assertEqual(get_user_scope(self.manager), {'class_ids': [], 'lab_ids': [self.lab.id]})
+        ClassLocation.objects.create(class_id=self.class_instance, lab_id=self.lab)
+        expected = {'class_ids': [self.class_instance.id], 'lab_ids': [self.lab.id]}
+        self.assertEqual(get_user_scope(self.student), expected)
+        self.assertEqual(get_user_scope(self.teacher), expected)
+        self.assertEqual(get_user_scope(self.manager), expected)
+
+        TeachClass.objects.filter(teacher_id=self.teacher).delete()
+        self.assertEqual(get_user_scope(self.teacher), {'class_ids': [], 'lab_ids': []})
+
+@override_settings(SHARED_CACHE=True)
+class CoursePageConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.student = TLSA_User.objects.create_user(username='2022000001', user_id='2022000001', password='password', role='student')
+        self.course = Course.objects.create(course_code='00000001', course_sequence='0', department='Chemistry', name='Chemistry')
+        self.class_instance = Class.objects.create(name='Titration', start_time=timezone.now())
+        CourseClass.objects.create(course=self.course, class_instance=self.class_instance)
+
+    def assert_not_modified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_course_summary(self):
+        url = reverse('course-summmary')
+        etag = self.client.get(url)['ETag']
+        # Only version counters, answered from the cache
+        with self.assertNumQueries(0):
+            self.assert_not_modified(url, etag)
+
+        serializer = CourseEnrollmentSerializer(data={'course_code': '00000001', 'course_sequence': '0', 'student_user_ids': ['2022000001']})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['student_count'], 1)
+
+    def test_course_page_list(self):
+        url = reverse('frontend-course-list')
+        response = self.client.get(url, {'active': 'true'})
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get(url, {'active': 'true'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+        self.class_instance.name = 'Distillation'
+        self.class_instance.save()
+        response = self.client.get(url, {'active': 'true'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['classes'][0]['name'], 'Distillation')
@@ -2,7 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from tlsa_server.authentication import TokenClaimsAuthentication
 from .models import Course, CourseEnrollment
 from .serializers import (CourseSerializer, 
                           CourseEnrollmentSerializer, 
@@ -11,8 +11,12 @@ from .serializers import (CourseSerializer,
                           CoursePatchSerializer, 
                           CourseEnrollmentGetSerializer,
                           CoursePageSerializer,
-                          CourseSummaryPageSerializer)
+                          CourseSummaryPageSerializer,
+                          load_class_details)
 from tlsa_server.permissions import IsAuthenticated, IsTeacher, IsTeachingAffairs
+from tlsa_server.pagination import KeysetPaginationMixin, KEYSET_PAGINATION_PARAMETERS
+from .roster import RosterImporter, read_roster_csv
+import csv
 from classes.models import (TeachClass, ClassLocation, Class, Experiment)
 from labs.models import (ManageLab, Lab)
 from courses.models import (CourseClass, Course, CourseEnrollment)
@@ -24,7 +28,7 @@ from django.db.models import Q
 
 class CourseView(APIView):
     serializer_class = CourseSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenClaimsAuthentication]
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -209,7 +213,7 @@ class CourseView(APIView):
         course.delete()
         return Response({"message": "Course deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
-class CourseEnrollmentView(APIView):
+class CourseEnrollmentView(KeysetPaginationMixin, APIView):
     serializer_class = CourseEnrollmentSerializer
 
     def get_permissions(self):
@@ -231,6 +235,8 @@ class CourseEnrollmentView(APIView):
                     "message": "Students enrolled successfully.",
                     "enrollment": {
                         "student_user_ids": ["2021000000", "2021000001"],
+                        "already_enrolled": ["2021000002"],
+                        "invalid_user_ids": ["2021999999"],
                         "course_id": 1
                     }
                 },
@@ -239,7 +245,7 @@ class CourseEnrollmentView(APIView):
             400: OpenApiExample(
                 name="Validation Error",
                 value={
-                    "student_user_ids": ["User with user_id 2021000000 does not exist."]
+                    "student_user_ids": ["Must include at least 1 Student user_id."]
                 },
                 response_only=True,
             ),
@@ -248,16 +254,18 @@ class CourseEnrollmentView(APIView):
     def post(self, request, format=None):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            enrollments = serializer.save()
+            result = serializer.save()
             return Response(
                 {
-                    "message": "Students enrolled successfully.",
+                    "message": "Students enrolled successfully." if result['added'] else "No new students enrolled.",
                     "enrollment": {
-                        "student_user_ids": [enrollment.student.user_id for enrollment in enrollments],
-                        "course_id": enrollments[0].course.id
+                        "student_user_ids": result['added'],
+                        "already_enrolled": result['already_enrolled'],
+                        "invalid_user_ids": result['invalid'],
+                        "course_id": result['course'].id
                     }
                 },
-                status=status.HTTP_201_CREATED
+                status=status.HTTP_201_CREATED if result['added'] else status.HTTP_200_OK
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -270,7 +278,7 @@ class CourseEnrollmentView(APIView):
                 description='Course ID to retrieve enrolled students for',
                 required=False,
             ),
-        ],
+        ] + KEYSET_PAGINATION_PARAMETERS,
         responses={
             200: CourseEnrollmentGetSerializer(many=True),
         },
@@ -282,10 +290,9 @@ class CourseEnrollmentView(APIView):
         if course_id:
             filters["course_id"] = course_id
 
-        enrollments = CourseEnrollment.objects.filter(**filters)
+        enrollments = CourseEnrollment.objects.filter(**filters).select_related('student', 'course')
 
-        serializer = CourseEnrollmentGetSerializer(enrollments, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(enrollments, CourseEnrollmentGetSerializer)
     
     @extend_schema(
         parameters=[
@@ -352,6 +359,57 @@ class CourseEnrollmentView(APIView):
         enrollment.delete()
         return Response({"message": "Course enrollment deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
+class RosterImportView(APIView):
+    """Import users and course enrollments from a roster CSV."""
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [IsTeachingAffairs()]
+        return []
+
+    @extend_schema(
+        request={
+            "multipart/form-data": {
+                "type": "object",
+                "properties": {
+                    "file": {"type": "string", "format": "binary"},
+                },
+            }
+        },
+        description="CSV columns: user_id, password, real_name, department, phone_number, email, role (default student), course_code, course_sequence. "
+                    "Rows are validated and inserted in chunks, invalid rows are reported and skipped.",
+        responses={
+            200: OpenApiExample(
+                name="Import report",
+                value={
+                    "message": "Roster imported.",
+                    "report": {
+                        "rows": 3,
+                        "created": 1,
+                        "existing": 1,
+                        "enrolled": 2,
+                        "errors": [{"row": 4, "user_id": "123", "error": "user_id must be exactly 10 digits and contain only numbers."}]
+                    }
+                },
+                response_only=True,
+            ),
+        },
+    )
+    def post(self, request, format=None):
+        roster = request.FILES.get('file')
+        if not roster:
+            return Response({"error": "A roster CSV file is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Hash in the request thread, forking a process pool from a threaded worker is unsafe.
+        # Large rosters go through `manage.py import_roster`, which uses a process pool.
+        importer = RosterImporter(workers=0)
+        try:
+            report = importer.run(read_roster_csv(roster.file))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({"error": f"Invalid roster CSV: {e}", "report": importer.report}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({"message": "Roster imported.", "report": report}, status=status.HTTP_200_OK)
+
 class CourseClassView(APIView):
     serializer_class = CourseClassSerializer
 
@@ -501,12 +559,29 @@ from django.db.models import Count, Q, OuterRef, Subquery, IntegerField
 from rest_framework.generics import ListAPIView
 from rest_framework.pagination import PageNumberPagination
 from notices.models import Notice
+from classes.models import ClassCounter
+from tlsa_server.cache import get_model_versions
+from tlsa_server.conditional import conditional_get, queryset_fingerprint
 
 class CustomPagination(PageNumberPagination):
     page_size = 20  # Set the page size to 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+def course_page_state(view, request):
+    classes = queryset_fingerprint(Class.objects.all())
+    parts = [classes, get_model_versions(Course, CourseClass, ClassLocation, ClassCounter, Lab)]
+
+    # Active notice counts change as notices start and end, not only on writes
+    active = request.query_params.get('active')
+    if active and active.lower() == "true":
+        parts.append(queryset_fingerprint(Notice.objects.active()))
+    # No Last-Modified, updated_at does not cover the version counters and deletions
+    return parts, None
+
+def course_summary_state(view, request):
+    return get_model_versions(Course, CourseClass, CourseEnrollment), None
+
 class CoursePageListView(ListAPIView):
     serializer_class = CoursePageSerializer
     pagination_class = CustomPagination
@@ -566,12 +641,30 @@ class CoursePageListView(ListAPIView):
 
     def get_queryset(self):
         queryset = Course.objects.prefetch_related(
-            'classes__class_instance',
-            'classes__class_instance__classlocation_set__lab_id',
-            'classes__class_instance__experiments'
-        ).all()
+            Prefetch('classes', queryset=CourseClass.objects.select_related('class_instance').order_by('id'))
+        ).order_by('id')
         return queryset
 
+    @conditional_get(course_page_state, cache_namespace='courses')
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        courses = page if page is not None else list(queryset)
+
+        # Load lab names and counts for every class on the page at once instead of per class
+        class_ids = [cc.class_instance_id for course in courses for cc in course.classes.all()]
+        active = request.query_params.get('active')
+        context = self.get_serializer_context()
+        context['class_details'] = load_class_details(class_ids, active=bool(active and active.lower() == "true"))
+
+        serializer = self.get_serializer(courses, many=True, context=context)
+        if page is not None:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+
 class CourseSummaryPageView(ListAPIView):
     serializer_class = CourseSummaryPageSerializer
     pagination_class = CustomPagination
@@ -581,5 +674,9 @@ class CourseSummaryPageView(ListAPIView):
         queryset = Course.objects.annotate(
             class_count=Count('classes', distinct=True),  # Use 'classes' instead of 'courseclass'
             student_count=Count('enrollments__student', distinct=True)  # Count of enrolled students
-        )
-        return queryset
\ No newline at end of file
+        ).order_by('id')
+        return queryset
+
+    @conditional_get(course_summary_state, cache_namespace='courses')
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
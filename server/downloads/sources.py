@@ -0,0 +1,64 @@
+from classes.models import ExperimentFile
+from courses.scope import get_user_scope
+from notices.models import Notice, NoticeContent
+from tlsa_server.models import TLSA_User
+
+# Roles allowed to download every file
+UNRESTRICTED_ROLES = ['teachingAffairs']
+
+class ExperimentFileSource:
+    """Files of experiments, for users whose scope includes the experiment's class."""
+    as_attachment = True
+
+    def get(self, object_id):
+        return ExperimentFile.objects.select_related('experiment').filter(id=object_id).first()
+
+    def file(self, experiment_file):
+        return experiment_file.file
+
+    def allowed(self, user, experiment_file):
+        return experiment_file.experiment.class_id_id in get_user_scope(user)['class_ids']
+
+class NoticeFileSource:
+    """
+    File blocks of notices, for the senders and the users whose scope includes one of
+    the notices showing the block. Blocks not in any notice yet are open to the roles
+    writing notices.
+    """
+    as_attachment = True
+
+    def get(self, object_id):
+        return NoticeContent.objects.filter(id=object_id).first()
+
+    def file(self, content):
+        return content.file_content
+
+    def allowed(self, user, content):
+        notices = Notice.objects.filter(rows__notice_content_id=content.id)
+        if not notices.exists():
+            return user.role in ['teacher', 'manager']
+        return (notices.filter(sender_id=user.user_id) | notices.in_scope(get_user_scope(user))).exists()
+
+class ProfilePictureSource:
+    """Profile pictures, for their owner, staff, and students sharing a class with the owner."""
+    as_attachment = False
+
+    def get(self, object_id):
+        return TLSA_User.objects.filter(user_id=object_id).first()
+
+    def file(self, owner):
+        return owner.profile_picture
+
+    def allowed(self, user, owner):
+        if user.user_id == owner.user_id or user.role != 'student':
+            return True
+        return bool(set(get_user_scope(user)['class_ids']) & set(get_user_scope(owner)['class_ids']))
+
+DOWNLOAD_SOURCES = {
+    'experiment_file': ExperimentFileSource(),
+    'notice_file': NoticeFileSource(),
+    'profile_picture': ProfilePictureSource(),
+}
+
+def can_download(user, kind, obj):
+    return user.role in UNRESTRICTED_ROLES or DOWNLOAD_SOURCES[kind].allowed(user, obj)
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from classes.models import Class, Experiment, ExperimentFile, TeachClass
+from courses.models import Course, CourseClass, CourseEnrollment
+from notices.models import Notice, NoticeContent, NoticeRow
+from tlsa_server.models import TLSA_User
+
+class DownloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root, MEDIA_X_ACCEL_REDIRECT='/protected-media/')
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.student = TLSA_User.objects.create_user(username='2022000001', user_id='2022000001', password='password', role='student')
+        self.outsider = TLSA_User.objects.create_user(username='2022000002', user_id='2022000002', password='password', role='student')
+
+        class_instance = Class.objects.create(name='Titration', start_time=timezone.now())
+        TeachClass.objects.create(class_id=class_instance, teacher_id=self.teacher)
+        course = Course.objects.create(course_code='00000001', course_sequence='0', department='Chemistry', name='Chemistry')
+        CourseClass.objects.create(course=course, class_instance=class_instance)
+        CourseEnrollment.objects.create(student=self.student, course=course)
+
+        experiment = Experiment.objects.create(title='Titration', estimated_time=1, class_id=class_instance)
+        self.experiment_file = ExperimentFile.objects.create(experiment=experiment, file=SimpleUploadedFile('sheet 1.pdf', b'%PDF-1.4'))
+
+        now = timezone.now()
+        notice = Notice.objects.create(class_or_lab_id=class_instance.id, sender=self.teacher, notice_type='class', post_time=now, end_time=now + timedelta(days=1))
+        self.content = NoticeContent.objects.create(content_type='file', file_content=SimpleUploadedFile('rules.txt', b'Wear goggles.'))
+        NoticeRow.objects.create(notice_id=notice, notice_content_id=self.content, order_num=1)
+
+    def get(self, user, name, object_id):
+        self.client.force_authenticate(user)
+        return self.client.get(reverse(name, args=[object_id]))
+
+    def test_in_scope_download_is_handed_to_nginx(self):
+        response = self.get(self.student, 'download-experiment-file', self.experiment_file.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.experiment_file.file.name.replace(' ', '%20'))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="sheet 1.pdf"')
+        self.assertEqual(response.content, b'')
+
+        self.assertEqual(self.get(self.teacher, 'download-notice-file', self.content.id).status_code, 200)
+
+    def test_out_of_scope_download_is_refused(self):
+        self.assertEqual(self.get(self.outsider, 'download-experiment-file', self.experiment_file.id).status_code, 403)
+        self.assertEqual(self.get(self.outsider, 'download-notice-file', self.content.id).status_code, 403)
+        self.assertEqual(self.get(self.outsider, 'download-experiment-file', 999).status_code, 404)
+
+    def test_profile_pictures(self):
+        self.assertEqual(self.get(self.outsider, 'download-profile-picture', self.student.user_id).status_code, 404)
+        self.student.profile_picture = SimpleUploadedFile('me.png', b'png')
+        self.student.save()
+
+        self.assertEqual(self.get(self.outsider, 'download-profile-picture', self.student.user_id).status_code, 403)
+        self.assertEqual(self.get(self.teacher, 'download-profile-picture', self.student.user_id).status_code, 200)
+        response = self.get(self.student, 'download-profile-picture', self.student.user_id)
+        self.assertTrue(response['Content-Disposition'].startswith('inline'))
+
+    @override_settings(MEDIA_X_ACCEL_REDIRECT=None)
+    def test_streams_without_nginx(self):
+        response = self.get(self.student, 'download-notice-file', self.content.id)
+        self.assertNotIn('X-Accel-Redirect', response)
+        self.assertEqual(b''.join(response.streaming_content), b'Wear goggles.')
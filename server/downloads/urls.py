@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import DownloadView
+
+urlpatterns = [
+    path('experiment-files/<int:object_id>', DownloadView.as_view(kind='experiment_file'), name='download-experiment-file'),
+    path('notice-files/<int:object_id>', DownloadView.as_view(kind='notice_file'), name='download-notice-file'),
+    path('profile-pictures/<str:object_id>', DownloadView.as_view(kind='profile_picture'), name='download-profile-picture'),
+]
@@ -0,0 +1,65 @@
+import mimetypes
+import os
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.http import content_disposition_header
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema, OpenApiExample
+from tlsa_server.permissions import IsAuthenticated
+from tlsa_server.storage import original_name_field
+from .sources import DOWNLOAD_SOURCES, can_download
+
+def media_response(file, as_attachment, filename=None):
+    """
+    Response sending a stored file, offered to the client as `filename` (the stored name by default).
+
+    With MEDIA_X_ACCEL_REDIRECT set the body is left to nginx, which serves the file from
+    its internal location, so the worker is free as soon as the headers are sent.
+    """
+    filename = filename or os.path.basename(file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    location = getattr(settings, 'MEDIA_X_ACCEL_REDIRECT', None)
+    if location:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = location + quote(file.name)
+    else:
+        response = FileResponse(file.open('rb'), content_type=content_type)
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    # Access depends on the user, shared caches must not keep the file
+    response['Cache-Control'] = 'private'
+    return response
+
+class DownloadView(APIView):
+    """Download of a stored file after checking the requester's class or lab scope."""
+    permission_classes = [IsAuthenticated]
+    kind = None
+
+    @extend_schema(
+        responses={
+            (200, 'application/octet-stream'): OpenApiTypes.BINARY,
+            403: OpenApiExample(
+                name="Not in scope",
+                value={"error": "You do not have permission to download this file."},
+                response_only=True,
+            ),
+            404: OpenApiExample(
+                name="File not found",
+                value={"message": "File not found."},
+                response_only=True,
+            ),
+        },
+    )
+    def get(self, request, object_id, format=None):
+        source = DOWNLOAD_SOURCES[self.kind]
+        obj = source.get(object_id)
+        if obj is None or not source.file(obj):
+            return Response({"message": "File not found."}, status=status.HTTP_404_NOT_FOUND)
+        if not can_download(request.user, self.kind, obj):
+            return Response({"error": "You do not have permission to download this file."}, status=status.HTTP_403_FORBIDDEN)
+        file = source.file(obj)
+        # Stored names are content hashes, the client gets the name the file was uploaded with
+        return media_response(file, source.as_attachment, getattr(obj, original_name_field(file.field.name), None))
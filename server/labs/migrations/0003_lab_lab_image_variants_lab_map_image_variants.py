@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lab',
+            name='lab_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lab',
+            name='map_image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0003_lab_lab_image_variants_lab_map_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lab',
+            name='lab_image',
+            field=models.ImageField(blank=True, null=True, upload_to='lab_images/'),
+        ),
+        migrations.AlterField(
+            model_name='lab',
+            name='map_image',
+            field=models.ImageField(blank=True, null=True, upload_to='lab_map/'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0004_alter_lab_lab_image_alter_lab_map_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lab',
+            name='lab_image_original_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='lab',
+            name='map_image_original_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
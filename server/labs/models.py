@@ -1,38 +1,21 @@
 from django.db import models
 from tlsa_server.models import TLSA_User
-import os
-from datetime import datetime
-from django.utils.deconstruct import deconstructible
-
-@deconstructible
-class DateTimeFileName(object):
-    def __init__(self, path):
-        self.path = path
-
-    def __call__(self, instance, filename):
-        # Get the file extension
-        ext = filename.split('.')[-1]
-        
-        # Get the original filename (without extension)
-        original_name = os.path.splitext(filename)[0]
-        
-        # Get the current datetime in a readable format
-        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Create the new filename
-        new_filename = f"{original_name}-{current_datetime}.{ext}"
-        
-        # Return the full path
-        return os.path.join(self.path, new_filename)
-
+# Referenced by migrations/0001_initial.py
+from tlsa_server.storage import DateTimeFileName  # noqa: F401
 
 class Lab(models.Model):
     name = models.CharField(max_length=100, unique=True)
     location = models.CharField(max_length=255)
     safety_equipments = models.JSONField(default=list, blank=True, null=True)
     safety_notes = models.TextField(blank=True, null=True)
-    lab_image = models.ImageField(upload_to=DateTimeFileName('lab_images/'), blank=True, null=True)
-    map_image = models.ImageField(upload_to=DateTimeFileName('lab_map/'), blank=True, null=True)
+    lab_image = models.ImageField(upload_to='lab_images/', blank=True, null=True)
+    map_image = models.ImageField(upload_to='lab_map/', blank=True, null=True)
+    # Resized copies of the images, see tlsa_server.images
+    lab_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    map_image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # Uploaded file names, see tlsa_server.storage
+    lab_image_original_name = models.CharField(max_length=255, blank=True, default='', editable=False)
+    map_image_original_name = models.CharField(max_length=255, blank=True, default='', editable=False)
     def __str__(self):
         return self.name
 
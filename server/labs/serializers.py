@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from .models import Lab, ManageLab
+from tlsa_server.images import ImageVariantSerializerMixin
 from tlsa_server.models import TLSA_User
 
-class LabSerializer(serializers.ModelSerializer):
+class LabSerializer(ImageVariantSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Lab
         fields = ['lab_id', 'name', 'location', 'safety_equipments', 'safety_notes', 'lab_image', 'map_image']
@@ -35,7 +36,7 @@ class ManagerDetailSerializer(serializers.ModelSerializer):
         model = ManageLab
         fields = ['manager_user_id', 'manager_name', 'manager_phone', 'manager_email', 'lab_id']
 
-class LabGetSerializer(serializers.ModelSerializer):
+class LabGetSerializer(ImageVariantSerializerMixin, serializers.ModelSerializer):
     managers = serializers.SerializerMethodField()
 
     class Meta:
@@ -43,8 +44,8 @@ class LabGetSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'location', 'safety_equipments', 'safety_notes', 'lab_image', 'map_image', 'managers']
 
     def get_managers(self, obj):
-        manage_labs = ManageLab.objects.filter(lab=obj)
-        return ManagerDetailSerializer(manage_labs, many=True).data
+        # Uses the managers prefetched by LabView when available
+        return ManagerDetailSerializer(obj.managelab_set.all(), many=True).data
     
 class LabPatchSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(required=True)
@@ -0,0 +1,18 @@
+from tlsa_server.blobs import track_blobs
+from tlsa_server.cache import track_model_versions
+from tlsa_server.storage import track_original_names
+from tlsa_server.images import track_image_variants
+from tlsa_server.models import TLSA_User
+from .models import Lab, ManageLab
+
+# Version counters behind the ETags of LabView.get
+track_model_versions(Lab)
+track_model_versions(ManageLab)
+track_model_versions(TLSA_User, ignore_fields=['last_login'])
+
+# Resized copies of uploaded images
+track_image_variants(Lab, 'lab_image', 'map_image')
+
+# Reference counts and uploaded names of the stored files
+track_blobs(Lab, 'lab_image', 'map_image')
+track_original_names(Lab, 'lab_image', 'map_image')
@@ -1,3 +1,96 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from asgiref.sync import sync_to_async
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from tlsa_server.cache import get_cache_stats
+from tlsa_server.models import TLSA_User
+from .models import Lab, ManageLab
+from .views import AsyncLabView, LabView
 
-# Create your tests here.
+@override_settings(SHARED_CACHE=True)
+class LabConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.manager = TLSA_User.objects.create_user(username='2020000001', user_id='2020000001', password='password', role='manager', real_name='Manager')
+        self.lab = Lab.objects.create(name='Lab 1', location='Chemistry Building')
+        ManageLab.objects.create(manager=self.manager, lab=self.lab)
+        self.client.force_authenticate(self.manager)
+
+    def test_unchanged_labs_return_304(self):
+        url = reverse('lab')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Logging in only touches last_login and keeps the ETag
+        self.manager.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.real_name = 'Lab Manager'
+            self.manager.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['managers'][0]['manager_name'], 'Lab Manager')
+
+    def test_payload_is_cached(self):
+        url = reverse('lab')
+        first = self.client.get(url)
+        # A client without the ETag gets the cached data, no lab is queried
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data, first.data)
+        self.assertEqual(response['ETag'], first['ETag'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lab.name = 'Lab A'
+            self.lab.save()
+            # Until the commit the version, and so the cached data, stay as they were
+            self.assertEqual(self.client.get(url)['ETag'], first['ETag'])
+        self.assertEqual(self.client.get(url).data['results'][0]['name'], 'Lab A')
+
+    @override_settings(SHARED_CACHE=False)
+    def test_worker_local_cache_disables_etags(self):
+        # Another worker would not see the version bumps of this one
+        url = reverse('lab')
+        response = self.client.get(url)
+        self.assertNotIn('ETag', response)
+        self.lab.name = 'Lab A'
+        self.lab.save()
+        self.assertEqual(self.client.get(url).data['results'][0]['name'], 'Lab A')
+        self.assertEqual(get_cache_stats()['labs']['hits'] + get_cache_stats()['labs']['misses'], 0)
+
+    def test_personal_labs_depend_on_scope(self):
+        url = reverse('lab')
+        etag = self.client.get(url, {'personal': 'true'})['ETag']
+        other_lab = Lab.objects.create(name='Lab 2', location='Physics Building')
+        ManageLab.objects.create(manager=self.manager, lab=other_lab)
+        response = self.client.get(url, {'personal': 'true'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+@override_settings(SHARED_CACHE=True)
+class AsyncLabViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = APIRequestFactory()
+        self.manager = TLSA_User.objects.create_user(username='2020000001', user_id='2020000001', password='password', role='manager', real_name='Manager')
+        for i in range(3):
+            lab = Lab.objects.create(name=f'Lab {i}', location='Chemistry Building')
+            ManageLab.objects.create(manager=self.manager, lab=lab)
+
+    def get(self, view, params):
+        request = self.factory.get('/api/v1/labs/lab', params)
+        force_authenticate(request, user=self.manager)
+        return view.as_view()(request)
+
+    async def test_matches_sync_view(self):
+        for params in [{}, {'page_size': 2}, {'personal': 'true', 'legacy': 'true'}]:
+            response = await self.get(AsyncLabView, params)
+            expected = await sync_to_async(self.get)(LabView, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, expected.data)
+            self.assertEqual(response['ETag'], expected['ETag'])
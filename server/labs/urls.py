@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.urls import path
-from .views import LabView, LabManagerView
+from .views import LabView, AsyncLabView, LabManagerView
 
 urlpatterns = [
-    path('lab', LabView.as_view(), name='lab'),
+    path('lab', (AsyncLabView if settings.ASYNC_VIEWS else LabView).as_view(), name='lab'),
     path('managers', LabManagerView.as_view(), name='lab-manager')
 ]
\ No newline at end of file
@@ -3,15 +3,59 @@ from rest_framework.response import Response
 from rest_framework import status
 from .models import Lab, ManageLab
 from .serializers import LabSerializer, ManageLabSerializer, ManagerDetailSerializer, LabGetSerializer, LabPatchSerializer
-from classes.models import ClassLocation, TeachClass
-from courses.models import CourseClass, CourseEnrollment
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from tlsa_server.permissions import IsAuthenticated, IsStudent, IsTeacher, IsManager, IsTeachingAffairs
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from tlsa_server.authentication import TokenClaimsAuthentication
+from tlsa_server.pagination import KeysetPaginationMixin, KEYSET_PAGINATION_PARAMETERS
+from tlsa_server.cache import get_model_versions
+from tlsa_server.conditional import conditional_get
+from tlsa_server.models import TLSA_User
+from tlsa_server.async_views import AsyncAPIViewMixin
+from tlsa_server.images import IMAGE_SIZE_PARAMETER, image_size_context
+from courses.scope import get_user_scope
+from django.db.models import Prefetch
+from asgiref.sync import sync_to_async
 
-class LabView(APIView):
+def lab_list_state(view, request):
+    # Lab listings include the managers' contact details
+    parts = get_model_versions(Lab, ManageLab, TLSA_User)
+    if view.is_personal(request):
+        parts.append(get_user_scope(request.user)['lab_ids'])
+    return parts, None
+
+LAB_LIST_SCHEMA = dict(
+    parameters=[
+        OpenApiParameter(
+            name='lab_id',
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description='Query by lab_id',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='lab_name',
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description='Query by lab_name (similarity)',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='personal',
+            type=bool,
+            location=OpenApiParameter.QUERY,
+            description='Get personal labs',
+            required=False,
+        ),
+        IMAGE_SIZE_PARAMETER,
+    ] + KEYSET_PAGINATION_PARAMETERS,
+    responses={
+        200: LabSerializer(many=True),
+    },
+)
+
+class LabView(KeysetPaginationMixin, APIView):
     serializer_class = LabSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenClaimsAuthentication]
 
     def get_permissions(self):
         if self.request.method == 'GET':
@@ -37,66 +81,31 @@ class LabView(APIView):
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                name='lab_id',
-                type=int,
-                location=OpenApiParameter.QUERY,
-                description='Query by lab_id',
-                required=False,
-            ),
-            OpenApiParameter(
-                name='lab_name',
-                type=str,
-                location=OpenApiParameter.QUERY,
-                description='Query by lab_name (similarity)',
-                required=False,
-            ),
-            OpenApiParameter(
-                name='personal',
-                type=bool,
-                location=OpenApiParameter.QUERY,
-                description='Get personal labs',
-                required=False,
-            ),
-        ],
-        responses={
-            200: LabSerializer(many=True),
-        },
-    )
-    def get(self, request, format=None):
-        serializer_class = LabGetSerializer
+    def is_personal(self, request):
+        personal = request.query_params.get('personal')
+        return bool(personal and personal.lower() == "true" and request.user.role in ["student", "teacher", "manager"])
+
+    def get_labs(self, request, personal_lab_ids=None):
         lab_id = request.query_params.get('lab_id')
         lab_name = request.query_params.get('lab_name')
-        personal = request.query_params.get('personal')
-        user = request.user
 
-        labs = Lab.objects.all()
+        labs = Lab.objects.prefetch_related(
+            Prefetch('managelab_set', queryset=ManageLab.objects.select_related('manager').order_by('id'))
+        )
 
         if lab_id:
             labs = labs.filter(id=lab_id)
         if lab_name:
             labs = labs.filter(name__icontains=lab_name)
-        if personal and personal.lower() == "true":
-            if user.role == "student":
-                enrolled_courses = CourseEnrollment.objects.filter(student=user).values_list('course_id', flat=True)
-                enrolled_classes = CourseClass.objects.filter(course_id__in=enrolled_courses).values_list('class_instance_id', flat=True)
-                lab_locations = ClassLocation.objects.filter(class_id__in=enrolled_classes).values_list('lab_id', flat=True)
-
-                labs = labs.filter(id__in=lab_locations)
-            elif user.role == "teacher":
-                taught_classes = TeachClass.objects.filter(teacher_id=user).values_list('class_id', flat=True)
-                lab_locations = ClassLocation.objects.filter(class_id__in=taught_classes).values_list('lab_id', flat=True)
-
-                labs = labs.filter(id__in=lab_locations)
-                
-            elif user.role == "manager":
-                managed_labs = ManageLab.objects.filter(manager=user).values_list('lab_id', flat=True)
-                labs = labs.filter(id__in=managed_labs)
+        if personal_lab_ids is not None:
+            labs = labs.filter(id__in=personal_lab_ids)
+        return labs
 
-        serializer = serializer_class(labs, many=True)
-        return Response(serializer.data)
+    @extend_schema(**LAB_LIST_SCHEMA)
+    @conditional_get(lab_list_state, cache_namespace='labs')
+    def get(self, request, format=None):
+        personal_lab_ids = get_user_scope(request.user)['lab_ids'] if self.is_personal(request) else None
+        return self.paginated_response(self.get_labs(request, personal_lab_ids), LabGetSerializer, context=image_size_context(request))
     
     @extend_schema(
         request=LabPatchSerializer,
@@ -166,6 +175,17 @@ class LabView(APIView):
         lab.delete()
         return Response({"message": "Lab deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
     
+class AsyncLabView(AsyncAPIViewMixin, LabView):
+    """LabView with an async GET, routed instead of LabView when ASYNC_VIEWS is on."""
+
+    @extend_schema(**LAB_LIST_SCHEMA)
+    @conditional_get(lab_list_state, cache_namespace='labs')
+    async def get(self, request, format=None):
+        personal_lab_ids = None
+        if self.is_personal(request):
+            personal_lab_ids = (await sync_to_async(get_user_scope)(request.user))['lab_ids']
+        return await self.apaginated_response(self.get_labs(request, personal_lab_ids), LabGetSerializer, context=image_size_context(request))
+
 class LabManagerView(APIView):
     serializer_class = ManageLabSerializer
 
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 13:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notices', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notice',
+            index=models.Index(fields=['notice_type', 'class_or_lab_id', 'post_time', 'end_time'], name='notice_target_window_idx'),
+        ),
+    ]
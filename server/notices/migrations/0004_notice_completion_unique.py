@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:13
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_completions(apps, schema_editor):
+    # Keep the earliest completion of each (notice, user) pair
+    NoticeCompletion = apps.get_model('notices', 'NoticeCompletion')
+    keep = NoticeCompletion.objects.values('notice_id', 'user_id').annotate(first_id=Min('id')).values('first_id')
+    NoticeCompletion.objects.exclude(id__in=keep).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notices', '0003_notice_target_window_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_completions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='noticecompletion',
+            constraint=models.UniqueConstraint(fields=('notice', 'user'), name='notice_completion_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notices', '0004_notice_completion_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticecontent',
+            name='image_content_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
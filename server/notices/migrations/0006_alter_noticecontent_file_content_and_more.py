@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notices', '0005_noticecontent_image_content_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='noticecontent',
+            name='file_content',
+            field=models.FileField(blank=True, null=True, upload_to='notice_files/'),
+        ),
+        migrations.AlterField(
+            model_name='noticecontent',
+            name='image_content',
+            field=models.ImageField(blank=True, null=True, upload_to='notice_images/'),
+        ),
+    ]
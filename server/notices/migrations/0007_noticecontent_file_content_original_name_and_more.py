@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notices', '0006_alter_noticecontent_file_content_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='noticecontent',
+            name='file_content_original_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='noticecontent',
+            name='image_content_original_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
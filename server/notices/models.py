@@ -1,29 +1,21 @@
 from django.db import models
 from tlsa_server.models import TLSA_User
-import os
-from datetime import datetime
-from django.utils.deconstruct import deconstructible
-
-@deconstructible
-class DateTimeFileName(object):
-    def __init__(self, path):
-        self.path = path
-
-    def __call__(self, instance, filename):
-        # Get the file extension
-        ext = filename.split('.')[-1]
-        
-        # Get the original filename (without extension)
-        original_name = os.path.splitext(filename)[0]
-        
-        # Get the current datetime in a readable format
-        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Create the new filename
-        new_filename = f"{original_name}-{current_datetime}.{ext}"
-        
-        # Return the full path
-        return os.path.join(self.path, new_filename)
+from django.utils import timezone
+# Referenced by migrations/0001_initial.py
+from tlsa_server.storage import DateTimeFileName  # noqa: F401
+
+class NoticeQuerySet(models.QuerySet):
+    def active(self, now=None):
+        """Notices that are currently shown, post_time <= now <= end_time."""
+        now = now or timezone.now()
+        return self.filter(post_time__lte=now, end_time__gte=now)
+
+    def in_scope(self, scope):
+        """Notices of the classes and labs in a scope from courses.scope.get_user_scope."""
+        return self.filter(
+            models.Q(notice_type='class', class_or_lab_id__in=scope['class_ids']) |
+            models.Q(notice_type='lab', class_or_lab_id__in=scope['lab_ids'])
+        )
 
 class Notice(models.Model):
     NOTICE_TYPE_CHOICES = [
@@ -45,6 +37,14 @@ class Notice(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = NoticeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Covers the (notice_type, class_or_lab_id) lookups and the active time window filter
+            models.Index(fields=['notice_type', 'class_or_lab_id', 'post_time', 'end_time'], name='notice_target_window_idx'),
+        ]
+
     def __str__(self):
         return f"Notice {self.id} by {self.sender.user_id} ({self.notice_type})"
 
@@ -59,6 +59,12 @@ class NoticeCompletion(models.Model):
     )
     completion_time = models.DateTimeField()
 
+    class Meta:
+        constraints = [
+            # One completion per user and notice, also the index behind completion summaries
+            models.UniqueConstraint(fields=['notice', 'user'], name='notice_completion_unique'),
+        ]
+
     def __str__(self):
         return f"Notice {self.notice.id} completed by {self.user.user_id}"
 
@@ -71,8 +77,11 @@ class NoticeContent(models.Model):
 
     content_type = models.CharField(max_length=10, choices=CONTENT_TYPE_CHOICES)
     text_content = models.TextField(blank=True, null=True)  # For text content
-    image_content = models.ImageField(upload_to=DateTimeFileName('notice_images/'), blank=True, null=True)  # For image content
-    file_content = models.FileField(upload_to=DateTimeFileName('notice_files/'), blank=True, null=True)  # For file content
+    image_content = models.ImageField(upload_to='notice_images/', blank=True, null=True)  # For image content
+    image_content_variants = models.JSONField(default=dict, blank=True, editable=False)  # Resized copies, see tlsa_server.images
+    file_content = models.FileField(upload_to='notice_files/', blank=True, null=True)  # For file content
+    image_content_original_name = models.CharField(max_length=255, blank=True, default='', editable=False)  # Uploaded file names, see tlsa_server.storage
+    file_content_original_name = models.CharField(max_length=255, blank=True, default='', editable=False)
 
     def __str__(self):
         return f"Content {self.id} ({self.content_type})"
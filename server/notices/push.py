@@ -0,0 +1,152 @@
+import json
+import queue
+import threading
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+from courses.scope import resolve_notice_audience
+
+class InProcessBroker:
+    """
+    Delivers events to subscribers connected to the same worker process.
+
+    Enough for development and single-process deployments, with several workers a
+    client only receives the events published by the worker it is connected to.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {}
+
+    def publish(self, user_ids, event):
+        with self._lock:
+            targets = [(user_id, q) for user_id in user_ids for q in self._queues.get(user_id, ())]
+        for user_id, q in targets:
+            try:
+                # Runs in the on_commit hook of the posting request, it must never wait
+                q.put_nowait(event)
+            except queue.Full:
+                # A client not reading its stream loses the subscription, it reconnects and
+                # reloads the notice page instead of silently missing events
+                q.overflowed = True
+                self._unsubscribe(user_id, q)
+
+    def subscribe(self, user_id):
+        q = queue.Queue(maxsize=100)
+        q.overflowed = False
+        with self._lock:
+            self._queues.setdefault(user_id, set()).add(q)
+        return InProcessSubscription(self, user_id, q)
+
+    def _unsubscribe(self, user_id, q):
+        with self._lock:
+            queues = self._queues.get(user_id, set())
+            queues.discard(q)
+            if not queues:
+                self._queues.pop(user_id, None)
+
+class InProcessSubscription:
+    def __init__(self, broker, user_id, q):
+        self._broker = broker
+        self._user_id = user_id
+        self._queue = q
+
+    @property
+    def closed(self):
+        """True once the broker dropped an overflowing subscription and its events are read."""
+        return self._queue.overflowed and self._queue.empty()
+
+    def get(self, timeout):
+        """Next event, or None after `timeout` seconds without one."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker._unsubscribe(self._user_id, self._queue)
+
+class RedisBroker:
+    """
+    Delivers events through Redis pub/sub (one channel per user), reaching
+    subscribers in every worker. Requires the redis package and NOTICE_PUSH_REDIS_URL.
+    """
+
+    def __init__(self):
+        import redis
+        self._redis = redis.Redis.from_url(settings.NOTICE_PUSH_REDIS_URL)
+
+    def publish(self, user_ids, event):
+        message = json.dumps(event)
+        pipeline = self._redis.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipeline.publish(f'tlsa:notices:{user_id}', message)
+        pipeline.execute()
+
+    def subscribe(self, user_id):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(f'tlsa:notices:{user_id}')
+        return RedisSubscription(pubsub)
+
+class RedisSubscription:
+    closed = False
+
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    def get(self, timeout):
+        message = self._pubsub.get_message(timeout=timeout)
+        return json.loads(message['data']) if message else None
+
+    def close(self):
+        self._pubsub.close()
+
+_broker = None
+_broker_lock = threading.Lock()
+
+_open_streams = 0
+_streams_lock = threading.Lock()
+
+def acquire_stream_slot():
+    """
+    Reserve one of the NOTICE_STREAM_MAX_CONNECTIONS streams of this process.
+
+    Returns a function releasing the slot (safe to call twice), or None when every slot is taken.
+    """
+    global _open_streams
+    with _streams_lock:
+        if _open_streams >= getattr(settings, 'NOTICE_STREAM_MAX_CONNECTIONS', 4):
+            return None
+        _open_streams += 1
+    released = False
+
+    def release():
+        global _open_streams
+        nonlocal released
+        with _streams_lock:
+            if not released:
+                released = True
+                _open_streams -= 1
+    return release
+
+def get_broker():
+    """The broker configured by NOTICE_PUSH_BROKER, created once per process."""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(getattr(settings, 'NOTICE_PUSH_BROKER', 'notices.push.InProcessBroker'))()
+        return _broker
+
+def publish_notice_event(notice, event, data):
+    """
+    Push `data` to the users whose notice page shows `notice` once the current
+    transaction commits, so clients never receive a notice that was rolled back.
+    """
+    notice_type, class_or_lab_id = notice.notice_type, notice.class_or_lab_id
+
+    def publish():
+        user_ids = resolve_notice_audience(notice_type, class_or_lab_id)
+        if user_ids:
+            get_broker().publish(user_ids, {'event': event, 'data': data})
+
+    transaction.on_commit(publish)
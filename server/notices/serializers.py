@@ -1,11 +1,26 @@
 from rest_framework import serializers
+from django.db.models import Prefetch
 from .models import Notice, NoticeCompletion, NoticeContent, NoticeTag, NoticeContentTag, NoticeRow
+from tlsa_server.images import ImageVariantSerializerMixin
 from tlsa_server.models import TLSA_User
 
-class NoticeContentSerializer(serializers.ModelSerializer):
+def prefetch_notice_details(queryset):
+    """
+    Load the rows (with their contents, in order) and completions of every notice in the queryset.
+
+    Serializing the result with NoticeGetSerializer costs 3 queries in total instead of
+    several per notice.
+    """
+    return queryset.prefetch_related(
+        Prefetch('rows', queryset=NoticeRow.objects.select_related('notice_content_id').order_by('order_num', 'id')),
+        'completions',
+    )
+
+class NoticeContentSerializer(ImageVariantSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = NoticeContent
-        fields = '__all__'
+        # Internal columns, the uploaded names are only used for downloads
+        exclude = ['image_content_variants', 'image_content_original_name', 'file_content_original_name']
 
 class NoticeTagSerializer(serializers.ModelSerializer):
     class Meta:
@@ -44,6 +59,48 @@ class NoticeCompletionSerializer(serializers.ModelSerializer):
         model = NoticeCompletion
         fields = '__all__'
 
+class NoticeCompletionBulkSerializer(serializers.Serializer):
+    notice_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    user_ids = serializers.ListField(child=serializers.CharField(), required=False, allow_empty=False, max_length=1000)
+
+class NoticeComposeNoticeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Notice
+        fields = ['class_or_lab_id', 'notice_type', 'post_time', 'end_time']
+
+class NoticeComposeBlockSerializer(serializers.Serializer):
+    content_type = serializers.ChoiceField(choices=NoticeContent.CONTENT_TYPE_CHOICES)
+    text_content = serializers.CharField(required=False, allow_blank=True)
+    # Name of the multipart field holding the image or file of the block
+    file = serializers.CharField(required=False)
+    tag_ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs):
+        content_type = attrs['content_type']
+        if content_type == 'text':
+            if 'text_content' not in attrs:
+                raise serializers.ValidationError({"text_content": "Text blocks require text_content."})
+            return attrs
+
+        files = self.context.get('files', {})
+        if attrs.get('file') not in files:
+            raise serializers.ValidationError({"file": "Image and file blocks require the name of an uploaded file."})
+        field = serializers.ImageField() if content_type == 'image' else serializers.FileField()
+        attrs['upload'] = field.run_validation(files[attrs['file']])
+        return attrs
+
+class NoticeComposeSerializer(serializers.Serializer):
+    """A notice with its ordered content blocks, see NoticeComposeView."""
+    notice = NoticeComposeNoticeSerializer()
+    blocks = NoticeComposeBlockSerializer(many=True, allow_empty=False, max_length=200)
+
+    def validate_blocks(self, blocks):
+        tag_ids = {tag_id for block in blocks for tag_id in block['tag_ids']}
+        missing = tag_ids - set(NoticeTag.objects.filter(id__in=tag_ids).values_list('id', flat=True))
+        if missing:
+            raise serializers.ValidationError(f"Notice tags not found: {sorted(missing)}.")
+        return blocks
+
 class NoticeSerializer(serializers.ModelSerializer):
     sender = serializers.PrimaryKeyRelatedField(queryset=TLSA_User.objects.all())
     completions = NoticeCompletionSerializer(many=True, read_only=True)
@@ -63,8 +120,9 @@ class NoticeGetSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_rows(self, obj):
-        rows = obj.rows.all().order_by('order_num')
-        return NoticeRowGetSerializer(rows, many=True).data
+        # Sorted in Python so rows loaded by prefetch_notice_details are not queried again
+        rows = sorted(obj.rows.all(), key=lambda row: row.order_num)
+        return NoticeRowGetSerializer(rows, many=True, context=self.context).data
 
 class NoticePatchSerializer(serializers.ModelSerializer):
     class Meta:
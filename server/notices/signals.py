@@ -0,0 +1,20 @@
+from tlsa_server.blobs import track_blobs
+from tlsa_server.cache import track_model_versions
+from tlsa_server.storage import track_original_names
+from tlsa_server.images import track_image_variants
+from .models import Notice, NoticeContent, NoticeContentTag, NoticeRow, NoticeTag
+
+# Version counters behind the cached tag dictionary and tag counts (notices.tags).
+# bulk_create() sends no signals, NoticeComposeView bumps the versions itself.
+track_model_versions(NoticeTag)
+track_model_versions(NoticeContentTag)
+track_model_versions(NoticeRow)
+track_model_versions(Notice)
+
+# Resized copies of uploaded images, NoticeComposeView schedules its bulk created images itself
+track_image_variants(NoticeContent, 'image_content')
+
+# Reference counts and uploaded names of the stored files, deleting a content deletes files no other row uses.
+# For the files NoticeComposeView bulk creates the storage takes the references and the view sets the names.
+track_blobs(NoticeContent, 'image_content', 'file_content')
+track_original_names(NoticeContent, 'image_content', 'file_content')
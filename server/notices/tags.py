@@ -0,0 +1,79 @@
+import threading
+import time
+from django.conf import settings
+from django.db.models import Count, Max
+from tlsa_server.cache import get_model_versions
+from .models import Notice, NoticeContentTag, NoticeRow, NoticeTag
+
+class NoticeTagDictionary:
+    """
+    Process-local NoticeTag name to ID map and per notice type tag counts.
+
+    Both are reloaded when the version counters of the tables they come from change
+    (see notices.signals), so a tag created or deleted in any worker is seen by every
+    worker on its next lookup. Checking the versions costs one cache read.
+
+    The counters only reach every worker through a shared cache (settings.SHARED_CACHE).
+    Without one the tags are checked against their row count and newest ID, one small
+    query, and the facets are reloaded every NOTICE_TAG_FACETS_RELOAD seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tags_version = None
+        self._ids = {}
+        self._facets_version = None
+        self._facets = {}
+
+    def _tags(self):
+        if settings.SHARED_CACHE:
+            version = get_model_versions(NoticeTag)
+        else:
+            version = NoticeTag.objects.aggregate(count=Count('id'), max_id=Max('id'))
+        if version != self._tags_version:
+            # Versions are read before loading, a change during the load triggers another reload
+            with self._lock:
+                self._ids = dict(NoticeTag.objects.values_list('tag_name', 'id'))
+                self._tags_version = version
+        return self._ids
+
+    def ids(self, names):
+        """IDs of the named tags, unknown names are skipped."""
+        tags = self._tags()
+        return [tags[name] for name in names if name in tags]
+
+    def names(self):
+        """{id: tag_name} of every tag."""
+        return {tag_id: name for name, tag_id in self._tags().items()}
+
+    def facets(self):
+        """
+        Number of notices per tag for each notice type, most used first:
+        {"class": [{"tag_id": 1, "tag_name": "Flammable", "count": 3}], "lab": [...]}
+        """
+        if settings.SHARED_CACHE:
+            version = get_model_versions(NoticeTag, NoticeContentTag, NoticeRow, Notice)
+        else:
+            self._tags()
+            version = (self._tags_version, int(time.monotonic() // settings.NOTICE_TAG_FACETS_RELOAD))
+        if version != self._facets_version:
+            counts = NoticeRow.objects.filter(
+                notice_content_id__noticecontenttag__isnull=False
+            ).values(
+                'notice_id__notice_type', 'notice_content_id__noticecontenttag__notice_tag_id'
+            ).annotate(count=Count('notice_id', distinct=True))
+
+            names = self.names()
+            facets = {notice_type: [] for notice_type, _ in Notice.NOTICE_TYPE_CHOICES}
+            for row in counts:
+                tag_id = row['notice_content_id__noticecontenttag__notice_tag_id']
+                facets[row['notice_id__notice_type']].append({"tag_id": tag_id, "tag_name": names.get(tag_id), "count": row['count']})
+            for tags in facets.values():
+                tags.sort(key=lambda tag: (-tag['count'], tag['tag_id']))
+
+            with self._lock:
+                self._facets = facets
+                self._facets_version = version
+        return self._facets
+
+tag_dictionary = NoticeTagDictionary()
@@ -1,3 +1,443 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import time
+from unittest import mock
+from io import BytesIO
+from PIL import Image
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from tlsa_server.models import TLSA_User
+from classes.models import Class, ClassLocation, TeachClass
+from courses.models import Course, CourseClass, CourseEnrollment
+from courses.scope import resolve_notice_audience
+from labs.models import Lab
+from .models import Notice, NoticeCompletion, NoticeContent, NoticeContentTag, NoticeRow, NoticeTag
+from .push import get_broker
+from .tags import tag_dictionary
+from .views import AsyncNoticePageView, NoticePageView
 
-# Create your tests here.
+class ActiveNoticeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.student = TLSA_User.objects.create_user(username='2021000002', user_id='2021000002', password='password', role='student')
+        now = timezone.now()
+        self.class_instance = Class.objects.create(name='Titration', start_time=now)
+        course = Course.objects.create(course_code='00000001', course_sequence='0', department='Chemistry', name='Chemistry')
+        CourseClass.objects.create(course=course, class_instance=self.class_instance)
+        CourseEnrollment.objects.create(student=self.student, course=course)
+
+        self.live = Notice.objects.create(class_or_lab_id=self.class_instance.id, sender=self.teacher, notice_type='class', post_time=now - timedelta(days=1), end_time=now + timedelta(days=1))
+        Notice.objects.create(class_or_lab_id=self.class_instance.id, sender=self.teacher, notice_type='class', post_time=now - timedelta(days=2), end_time=now - timedelta(days=1))
+        Notice.objects.create(class_or_lab_id=self.class_instance.id, sender=self.teacher, notice_type='class', post_time=now + timedelta(days=1), end_time=now + timedelta(days=2))
+
+    def test_notice_view_active(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(reverse('notice-list'))
+        self.assertEqual(len(response.data['results']), 3)
+        response = self.client.get(reverse('notice-list'), {'active': 'true'})
+        self.assertEqual([notice['id'] for notice in response.data['results']], [self.live.id])
+
+    def test_notice_page_active(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(reverse('notice-page'), {'active': 'true'})
+        self.assertEqual([notice['id'] for notice in response.data['results']], [self.live.id])
+
+    def test_course_list_active_counts(self):
+        response = self.client.get(reverse('frontend-course-list'))
+        self.assertEqual(response.data['results'][0]['classes'][0]['notice_count'], 3)
+        response = self.client.get(reverse('frontend-course-list'), {'active': 'true'})
+        self.assertEqual(response.data['results'][0]['classes'][0]['notice_count'], 1)
+
+class NoticeDetailTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        now = timezone.now()
+        for i in range(5):
+            notice = Notice.objects.create(class_or_lab_id=1, sender=self.teacher, notice_type='class', post_time=now, end_time=now + timedelta(days=1))
+            for order_num in (2, 1, 3):
+                content = NoticeContent.objects.create(content_type='text', text_content=f'Row {order_num}')
+                NoticeRow.objects.create(notice_id=notice, notice_content_id=content, order_num=order_num)
+            NoticeCompletion.objects.create(notice=notice, user=self.teacher, completion_time=now)
+
+    def test_notice_details_are_batched(self):
+        self.client.force_authenticate(self.teacher)
+        # notices, rows with their contents, completions
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('notice-list'))
+        self.assertEqual(len(response.data['results']), 5)
+        for notice in response.data['results']:
+            self.assertEqual([row['order_num'] for row in notice['rows']], [1, 2, 3])
+            self.assertEqual(notice['rows'][0]['notice_content']['text_content'], 'Row 1')
+            self.assertEqual(notice['completions'][0]['user'], self.teacher.user_id)
+
+    def test_keyset_pagination(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.get(reverse('notice-list'), {'page_size': 2})
+        notice_ids = [notice['id'] for notice in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            notice_ids += [notice['id'] for notice in response.data['results']]
+        self.assertEqual(notice_ids, sorted(Notice.objects.values_list('id', flat=True)))
+
+        response = self.client.get(reverse('notice-list'), {'legacy': 'true'})
+        self.assertEqual(len(response.data), 5)
+
+@override_settings(SHARED_CACHE=True)
+class NoticePageConditionalGetTests(ActiveNoticeTests):
+    def test_unchanged_poll_returns_304(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(reverse('notice-page'))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+
+        # One aggregate query over the visible notices, no serialization
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('notice-page'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.live.delete()
+        response = self.client.get(reverse('notice-page'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        # A deletion leaves the newest updated_at as it was, If-Modified-Since must not return 304
+        response = self.client.get(reverse('notice-page'), HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual(response.status_code, 200)
+
+@override_settings(SHARED_CACHE=True)
+class AsyncNoticePageViewTests(ActiveNoticeTests):
+    def get(self, view, params, **headers):
+        request = APIRequestFactory().get('/api/v1/notices/notice-page', params, **headers)
+        force_authenticate(request, user=self.student)
+        return view.as_view()(request)
+
+    async def test_matches_sync_view(self):
+        for params in [{}, {'active': 'true'}, {'page_size': 2, 'page': 2}]:
+            response = await self.get(AsyncNoticePageView, params)
+            expected = await sync_to_async(self.get)(NoticePageView, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, expected.data)
+
+        response = await self.get(AsyncNoticePageView, {}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        response = await self.get(AsyncNoticePageView, {'page_size': 2, 'page': 2}, HTTP_IF_NONE_MATCH=expected['ETag'])
+        self.assertEqual(response.status_code, 304)
+        response = await self.get(AsyncNoticePageView, {'page': 5})
+        self.assertEqual(response.status_code, 404)
+
+class NoticePushTests(ActiveNoticeTests):
+    def setUp(self):
+        super().setUp()
+        self.outsider = TLSA_User.objects.create_user(username='2021000003', user_id='2021000003', password='password', role='student')
+        TeachClass.objects.create(class_id=self.class_instance, teacher_id=self.teacher)
+        self.lab = Lab.objects.create(name='Lab 1', location='Building A')
+        ClassLocation.objects.create(class_id=self.class_instance, lab_id=self.lab)
+
+    def test_audience_matches_notice_page_scope(self):
+        expected = {self.student.user_id, self.teacher.user_id}
+        self.assertEqual(resolve_notice_audience('class', self.class_instance.id), expected)
+        self.assertEqual(resolve_notice_audience('lab', self.lab.id), expected)
+        self.assertEqual(resolve_notice_audience('lab', self.lab.id + 1), set())
+
+    def test_post_publishes_on_commit(self):
+        subscriptions = {user: get_broker().subscribe(user.user_id) for user in (self.student, self.outsider)}
+        self.addCleanup(lambda: [subscription.close() for subscription in subscriptions.values()])
+        self.client.force_authenticate(self.teacher)
+        now = timezone.now()
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.client.post(reverse('notice-list'), {
+                'class_or_lab_id': self.lab.id, 'sender': self.teacher.id, 'notice_type': 'lab',
+                'post_time': now, 'end_time': now + timedelta(days=1),
+            })
+        self.assertEqual(response.status_code, 201)
+        # Nothing is sent before the transaction commits
+        self.assertIsNone(subscriptions[self.student].get(timeout=0))
+        for callback in callbacks:
+            callback()
+
+        event = subscriptions[self.student].get(timeout=0)
+        self.assertEqual(event['event'], 'notice_created')
+        self.assertEqual(event['data']['id'], response.data['notice']['id'])
+        self.assertIsNone(subscriptions[self.outsider].get(timeout=0))
+
+        content = NoticeContent.objects.create(content_type='text', text_content='Bring goggles')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('notice-row-list'), {'notice_id': self.live.id, 'notice_content_id': content.id, 'order_num': 1})
+        event = subscriptions[self.student].get(timeout=0)
+        self.assertEqual((event['event'], event['data']['notice_id']), ('notice_row_created', self.live.id))
+        self.assertIsNone(subscriptions[self.outsider].get(timeout=0))
+
+    @override_settings(NOTICE_STREAM_HEARTBEAT=1, NOTICE_STREAM_MAX_AGE=5)
+    def test_stream(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(reverse('notice-stream'), HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertEqual(next(chunks), b'retry: 1000\n\n')
+
+        get_broker().publish([self.student.user_id], {'event': 'notice_created', 'data': {'id': 1}})
+        self.assertEqual(next(chunks), b'event: notice_created\ndata: {"id": 1}\n\n')
+        self.assertEqual(next(chunks), b': keep-alive\n\n')
+        response.close()
+        self.assertNotIn(self.student.user_id, get_broker()._queues)
+
+    @override_settings(NOTICE_STREAM_MAX_CONNECTIONS=1)
+    def test_stream_limit(self):
+        self.client.force_authenticate(self.student)
+        first = self.client.get(reverse('notice-stream'))
+        response = self.client.get(reverse('notice-stream'))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+        # Closing a stream that never started still frees its slot
+        first.close()
+        second = self.client.get(reverse('notice-stream'))
+        self.assertEqual(second.status_code, 200)
+        second.close()
+
+    def test_slow_subscriber_does_not_block_publish(self):
+        subscription = get_broker().subscribe(self.student.user_id)
+        self.addCleanup(subscription.close)
+        for i in range(101):
+            get_broker().publish([self.student.user_id], {'event': 'notice_created', 'data': {'id': i}})
+        self.assertNotIn(self.student.user_id, get_broker()._queues)
+        self.assertFalse(subscription.closed)
+        # Queued events are still delivered before the stream ends
+        events = [subscription.get(timeout=0) for _ in range(100)]
+        self.assertEqual(events[-1]['data']['id'], 99)
+        self.assertTrue(subscription.closed)
+
+class NoticeCompletionTests(ActiveNoticeTests):
+    def setUp(self):
+        super().setUp()
+        self.classmates = [
+            TLSA_User.objects.create_user(username=f'202100001{i}', user_id=f'202100001{i}', password='password', role='student')
+            for i in range(3)
+        ]
+        # A second course of the same class, one student is enrolled in both
+        other_course = Course.objects.create(course_code='00000002', course_sequence='0', department='Chemistry', name='Chemistry Lab')
+        CourseClass.objects.create(course=other_course, class_instance=self.class_instance)
+        for student in self.classmates:
+            CourseEnrollment.objects.create(student=student, course=other_course)
+        CourseEnrollment.objects.create(student=self.classmates[0], course=Course.objects.get(course_code='00000001'))
+        self.outsider = TLSA_User.objects.create_user(username='2021000099', user_id='2021000099', password='password', role='student')
+
+    def test_bulk_mark_own_notices(self):
+        self.client.force_authenticate(self.student)
+        notice_ids = list(Notice.objects.values_list('id', flat=True))
+        response = self.client.post(reverse('notice-completion-bulk'), {'notice_ids': notice_ids}, format='json')
+        self.assertEqual((response.data['created'], response.data['already_completed']), (3, 0))
+        response = self.client.post(reverse('notice-completion-bulk'), {'notice_ids': notice_ids}, format='json')
+        self.assertEqual((response.data['created'], response.data['already_completed']), (0, 3))
+        self.assertEqual(NoticeCompletion.objects.filter(user=self.student).count(), 3)
+
+        # Notices outside the student's classes and marking for others are refused
+        self.client.force_authenticate(self.outsider)
+        response = self.client.post(reverse('notice-completion-bulk'), {'notice_ids': [self.live.id]}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse('notice-completion-bulk'), {'notice_ids': [self.live.id], 'user_ids': [self.student.user_id]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_bulk_mark_for_students(self):
+        self.client.force_authenticate(self.teacher)
+        user_ids = [student.user_id for student in self.classmates]
+        response = self.client.post(reverse('notice-completion-bulk'), {'notice_ids': [self.live.id], 'user_ids': user_ids + ['2099999999']}, format='json')
+        self.assertEqual((response.status_code, response.data['user_ids']), (400, ['2099999999']))
+        response = self.client.post(reverse('notice-completion-bulk'), {'notice_ids': [self.live.id], 'user_ids': user_ids}, format='json')
+        self.assertEqual(response.data['created'], 3)
+
+    def test_bulk_mark_counts_inserted_rows(self):
+        bulk_create = NoticeCompletion.objects.bulk_create
+
+        def complete_concurrently(completions, **kwargs):
+            # Another request completes one of the notices between the lookup and the insert
+            NoticeCompletion.objects.create(notice=self.live, user=self.student, completion_time=timezone.now() - timedelta(seconds=1))
+            return bulk_create(completions, **kwargs)
+
+        self.client.force_authenticate(self.student)
+        notice_ids = list(Notice.objects.values_list('id', flat=True))
+        with mock.patch.object(NoticeCompletion.objects, 'bulk_create', side_effect=complete_concurrently):
+            response = self.client.post(reverse('notice-completion-bulk'), {'notice_ids': notice_ids}, format='json')
+        self.assertEqual((response.data['created'], response.data['already_completed']), (2, 1))
+        self.assertEqual(NoticeCompletion.objects.filter(user=self.student).count(), 3)
+
+    def test_summary(self):
+        now = timezone.now()
+        NoticeCompletion.objects.create(notice=self.live, user=self.student, completion_time=now)
+        NoticeCompletion.objects.create(notice=self.live, user=self.classmates[0], completion_time=now)
+        # Completions of users outside the courses are not counted
+        NoticeCompletion.objects.create(notice=self.live, user=self.teacher, completion_time=now)
+
+        self.client.force_authenticate(self.teacher)
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('notice-completion-summary'), {'notice_id': self.live.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['enrolled'], response.data['completed'], response.data['missing']), (4, 2, 2))
+        self.assertEqual(response.data['completion_rate'], 50.0)
+        self.assertEqual(
+            [(course['enrolled'], course['completed']) for course in response.data['courses']],
+            [(2, 2), (3, 1)]
+        )
+        self.assertEqual([student['user_id'] for student in response.data['missing_students']], [self.classmates[1].user_id, self.classmates[2].user_id])
+
+        response = self.client.get(reverse('notice-completion-summary'), {'notice_id': 0})
+        self.assertEqual(response.status_code, 404)
+        self.client.force_authenticate(self.student)
+        response = self.client.get(reverse('notice-completion-summary'), {'notice_id': self.live.id})
+        self.assertEqual(response.status_code, 403)
+
+    def test_students_only_list_own_completions(self):
+        now = timezone.now()
+        NoticeCompletion.objects.create(notice=self.live, user=self.student, completion_time=now)
+        NoticeCompletion.objects.create(notice=self.live, user=self.classmates[0], completion_time=now)
+        self.client.force_authenticate(self.student)
+        response = self.client.get(reverse('notice-completion-list'), {'notice_id': self.live.id})
+        self.assertEqual([completion['user'] for completion in response.data], [self.student.user_id])
+
+class NoticeComposeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_settings = override_settings(MEDIA_ROOT=media_root)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.client.force_authenticate(self.teacher)
+        self.tags = [NoticeTag.objects.create(tag_name=name) for name in ['Flammable', 'Goggles']]
+        now = timezone.now()
+        self.notice = {'class_or_lab_id': 1, 'notice_type': 'class', 'post_time': now.isoformat(), 'end_time': (now + timedelta(days=1)).isoformat()}
+
+    def image(self):
+        buffer = BytesIO()
+        Image.new('RGB', (4, 4)).save(buffer, format='PNG')
+        return SimpleUploadedFile('goggles.png', buffer.getvalue(), content_type='image/png')
+
+    def test_compose_multipart(self):
+        blocks = [
+            {'content_type': 'text', 'text_content': 'Wear goggles.', 'tag_ids': [self.tags[0].id, self.tags[1].id]},
+            {'content_type': 'image', 'file': 'photo', 'tag_ids': [self.tags[1].id]},
+            {'content_type': 'file', 'file': 'sheet'},
+        ]
+        # Notice, contents, rows and content tags are each one insert, the storage takes the
+        # reference of each uploaded file in a savepoint (four queries per file)
+        with self.assertNumQueries(19):
+            response = self.client.post(reverse('notice-compose'), {
+                'notice': json.dumps(self.notice),
+                'blocks': json.dumps(blocks),
+                'photo': self.image(),
+                'sheet': SimpleUploadedFile('safety.pdf', b'%PDF-1.4', content_type='application/pdf'),
+            }, format='multipart')
+        self.assertEqual(response.status_code, 201)
+
+        notice = response.data['notice']
+        self.assertEqual(notice['sender'], self.teacher.user_id)
+        self.assertEqual([row['order_num'] for row in notice['rows']], [1, 2, 3])
+        self.assertEqual([row['notice_content']['content_type'] for row in notice['rows']], ['text', 'image', 'file'])
+        self.assertTrue(notice['rows'][1]['notice_content']['image_content'])
+        self.assertNotIn('file_content_original_name', notice['rows'][2]['notice_content'])
+        self.assertEqual(NoticeContent.objects.get(id=notice['rows'][2]['notice_content']['id']).file_content_original_name, 'safety.pdf')
+        self.assertEqual(NoticeContentTag.objects.count(), 3)
+
+    def test_compose_is_atomic(self):
+        blocks = [
+            {'content_type': 'text', 'text_content': 'Wear goggles.'},
+            {'content_type': 'image', 'file': 'missing'},
+        ]
+        response = self.client.post(reverse('notice-compose'), {'notice': self.notice, 'blocks': blocks}, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(reverse('notice-compose'), {'notice': self.notice, 'blocks': blocks[:1] + [{'content_type': 'text', 'text_content': '', 'tag_ids': [0]}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Notice.objects.exists())
+        self.assertFalse(NoticeContent.objects.exists())
+
+        response = self.client.post(reverse('notice-compose'), {'notice': self.notice, 'blocks': blocks[:1]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(NoticeRow.objects.get().notice_id_id, response.data['notice']['id'])
+
+@override_settings(SHARED_CACHE=True)
+class NoticeTagDictionaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.client.force_authenticate(self.teacher)
+        self.flammable, self.goggles = [NoticeTag.objects.create(tag_name=name) for name in ['Flammable', 'Goggles']]
+        now = timezone.now()
+        self.contents = []
+        for notice_type, tags in [('class', [self.flammable]), ('class', [self.flammable, self.goggles]), ('lab', [self.goggles])]:
+            notice = Notice.objects.create(class_or_lab_id=1, sender=self.teacher, notice_type=notice_type, post_time=now, end_time=now)
+            content = NoticeContent.objects.create(content_type='text', text_content='Safety')
+            NoticeRow.objects.create(notice_id=notice, notice_content_id=content, order_num=1)
+            for tag in tags:
+                NoticeContentTag.objects.create(notice_content_id=content, notice_tag_id=tag)
+            self.contents.append(content)
+
+    def test_tag_list_is_cached(self):
+        self.client.get(reverse('notice-tag-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('notice-tag-list'))
+        self.assertEqual(response.data, [{'id': self.flammable.id, 'tag_name': 'Flammable'}, {'id': self.goggles.id, 'tag_name': 'Goggles'}])
+
+        # Creating a tag through any path invalidates the dictionary once committed
+        with self.captureOnCommitCallbacks(execute=True):
+            NoticeTag.objects.create(tag_name='Gloves')
+        response = self.client.get(reverse('notice-tag-list'))
+        self.assertEqual([tag['tag_name'] for tag in response.data], ['Flammable', 'Goggles', 'Gloves'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.goggles.delete()
+        response = self.client.get(reverse('notice-tag-list'), {'tag_id': self.flammable.id})
+        self.assertEqual(response.data, [{'id': self.flammable.id, 'tag_name': 'Flammable'}])
+
+    @override_settings(SHARED_CACHE=False, NOTICE_TAG_FACETS_RELOAD=60)
+    def test_worker_local_cache(self):
+        self.client.get(reverse('notice-tag-list'))
+        # As if created on another worker: the version bump (on commit) never reaches this worker
+        gloves = NoticeTag.objects.create(tag_name='Gloves')
+        response = self.client.get(reverse('notice-tag-list'))
+        self.assertEqual([tag['tag_name'] for tag in response.data], ['Flammable', 'Goggles', 'Gloves'])
+        self.assertEqual(tag_dictionary.ids(['Gloves']), [gloves.id])
+
+        url = reverse('notice-tag-facets')
+        with mock.patch('notices.tags.time.monotonic', return_value=0):
+            self.assertEqual(self.client.get(url).data['class'][0]['count'], 2)
+        NoticeContentTag.objects.filter(notice_tag_id=self.flammable).first().delete()
+        with mock.patch('notices.tags.time.monotonic', return_value=59):
+            self.assertEqual(self.client.get(url).data['class'][0]['count'], 2)
+        with mock.patch('notices.tags.time.monotonic', return_value=60):
+            self.assertEqual(self.client.get(url).data['class'][0]['count'], 1)
+
+    def test_content_tag_filter(self):
+        self.client.get(reverse('notice-tag-list'))
+        response = self.client.get(reverse('notice-content-list'), {'tag_name': 'Goggles'})
+        self.assertEqual(sorted(content['id'] for content in response.data['results']), [self.contents[1].id, self.contents[2].id])
+        response = self.client.get(reverse('notice-content-list'), {'tag_name': 'Unknown'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_facets(self):
+        response = self.client.get(reverse('notice-tag-facets'))
+        self.assertEqual(response.data['class'], [
+            {'tag_id': self.flammable.id, 'tag_name': 'Flammable', 'count': 2},
+            {'tag_id': self.goggles.id, 'tag_name': 'Goggles', 'count': 1},
+        ])
+        self.assertEqual(response.data['lab'], [{'tag_id': self.goggles.id, 'tag_name': 'Goggles', 'count': 1}])
+        with self.assertNumQueries(0):
+            self.client.get(reverse('notice-tag-facets'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NoticeContentTag.objects.filter(notice_tag_id=self.flammable).first().delete()
+        response = self.client.get(reverse('notice-tag-facets'))
+        self.assertEqual(response.data['class'][0]['count'], 1)
@@ -1,18 +1,30 @@
+from django.conf import settings
 from django.urls import path
 from .views import (NoticeView, 
+                    NoticeComposeView,
                     NoticeCompletionView, 
+                    NoticeCompletionBulkView,
+                    NoticeCompletionSummaryView,
                     NoticeContentView, 
                     NoticeTagView, 
+                    NoticeTagFacetView,
                     NoticeContentTagView, 
                     NoticeRowView,
-                    NoticePageView)
+                    NoticePageView,
+                    AsyncNoticePageView,
+                    NoticeStreamView)
 
 urlpatterns = [
     path('notices', NoticeView.as_view(), name='notice-list'),
+    path('compose', NoticeComposeView.as_view(), name='notice-compose'),
     path('notice-completions', NoticeCompletionView.as_view(), name='notice-completion-list'),
+    path('notice-completions/bulk', NoticeCompletionBulkView.as_view(), name='notice-completion-bulk'),
+    path('notice-completions/summary', NoticeCompletionSummaryView.as_view(), name='notice-completion-summary'),
     path('notice-contents', NoticeContentView.as_view(), name='notice-content-list'),
     path('notice-tags', NoticeTagView.as_view(), name='notice-tag-list'),
+    path('notice-tags/facets', NoticeTagFacetView.as_view(), name='notice-tag-facets'),
     path('notice-content-tags', NoticeContentTagView.as_view(), name='notice-content-tag-list'),
     path('notice-rows', NoticeRowView.as_view(), name='notice-row-list'),
-    path('notice-page', NoticePageView.as_view(), name='notice-page')
+    path('notice-page', (AsyncNoticePageView if settings.ASYNC_VIEWS else NoticePageView).as_view(), name='notice-page'),
+    path('stream', NoticeStreamView.as_view(), name='notice-stream')
 ]
\ No newline at end of file
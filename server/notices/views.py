@@ -2,12 +2,24 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from .models import Notice, NoticeCompletion, NoticeContent, NoticeTag, NoticeContentTag, NoticeRow
-from .serializers import NoticeSerializer, NoticeCompletionSerializer, NoticeContentSerializer, NoticeTagSerializer, NoticeContentTagSerializer, NoticeRowSerializer, NoticeGetSerializer, NoticePatchSerializer
+from .serializers import NoticeSerializer, NoticeCompletionSerializer, NoticeCompletionBulkSerializer, NoticeComposeSerializer, NoticeContentSerializer, NoticeTagSerializer, NoticeContentTagSerializer, NoticeRowSerializer, NoticeGetSerializer, NoticePatchSerializer, prefetch_notice_details
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from rest_framework.decorators import permission_classes
 from tlsa_server.permissions import IsAuthenticated, IsStudent, IsTeacher, IsManager, IsTeachingAffairs
-
-class NoticeView(APIView):
+from tlsa_server.pagination import KeysetPaginationMixin, KEYSET_PAGINATION_PARAMETERS
+from tlsa_server.models import TLSA_User
+from .push import acquire_stream_slot, get_broker, publish_notice_event
+from .tags import tag_dictionary
+from tlsa_server.cache import bump_model_versions
+from tlsa_server.images import IMAGE_SIZE_PARAMETER, image_size_context, schedule_image_variants
+from tlsa_server.storage import original_name
+from courses.scope import get_user_scope, notice_enrollments
+from django.db.models import Count, Exists, OuterRef
+from django.utils import timezone
+from django.db import transaction
+import json
+
+class NoticeView(KeysetPaginationMixin, APIView):
     serializer_class = NoticeSerializer
 
     def get_permissions(self):
@@ -24,7 +36,8 @@ class NoticeView(APIView):
     def post(self, request, format=None):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            notice = serializer.save()
+            publish_notice_event(notice, 'notice_created', NoticePatchSerializer(notice).data)
             return Response(
                 {
                     "message": "Notice created successfully.",
@@ -57,7 +70,15 @@ class NoticeView(APIView):
                 description='Filter by class_or_lab_id',
                 required=False,
             ),
-        ],
+            OpenApiParameter(
+                name='active',
+                type=bool,
+                location=OpenApiParameter.QUERY,
+                description='Only return notices currently within their post_time and end_time',
+                required=False,
+            ),
+            IMAGE_SIZE_PARAMETER,
+        ] + KEYSET_PAGINATION_PARAMETERS,
         responses={
             200: NoticeGetSerializer(many=True),
         },
@@ -67,6 +88,7 @@ class NoticeView(APIView):
         notice_id = request.query_params.get('notice_id')
         notice_type = request.query_params.get('notice_type')
         class_or_lab_id = request.query_params.get('class_or_lab_id')
+        active = request.query_params.get('active')
 
         filters = {}
         if notice_id:
@@ -77,9 +99,11 @@ class NoticeView(APIView):
             filters["class_or_lab_id"] = class_or_lab_id
 
         notices = Notice.objects.filter(**filters)
+        if active and active.lower() == "true":
+            notices = notices.active()
+        notices = prefetch_notice_details(notices)
 
-        serializer = serializer_class(notices, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(notices, serializer_class, context=image_size_context(request))
 
     @extend_schema(
         request=NoticePatchSerializer,
@@ -149,6 +173,87 @@ class NoticeView(APIView):
         notice.delete()
         return Response({"message": "Notice deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
+class NoticeComposeView(APIView):
+    """
+    Create a notice with its content blocks, rows and content tags in one request.
+
+    Accepts multipart/form-data with `notice` and `blocks` as JSON strings and the
+    images/files of the blocks as further parts, or plain JSON when there are no
+    uploads. Everything is written in one transaction with bulk inserts.
+    """
+    permission_classes = [(IsTeacher|IsManager)]
+
+    @extend_schema(
+        request={'multipart/form-data': NoticeComposeSerializer, 'application/json': NoticeComposeSerializer},
+        examples=[
+            OpenApiExample(
+                'Compose notice',
+                value={
+                    "notice": {"class_or_lab_id": 1, "notice_type": "class", "post_time": "2024-01-01T08:00:00Z", "end_time": "2024-01-10T08:00:00Z"},
+                    "blocks": [
+                        {"content_type": "text", "text_content": "Wear goggles at all times.", "tag_ids": [1]},
+                        {"content_type": "image", "file": "goggles_image"},
+                    ],
+                },
+                request_only=True,
+            ),
+        ],
+        responses={201: NoticeGetSerializer},
+    )
+    def post(self, request, format=None):
+        data = {}
+        for key in ['notice', 'blocks']:
+            value = request.data.get(key)
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    return Response({key: ["Must be valid JSON."]}, status=status.HTTP_400_BAD_REQUEST)
+            data[key] = value
+
+        serializer = NoticeComposeSerializer(data=data, context={'files': request.FILES})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        blocks = serializer.validated_data['blocks']
+        with transaction.atomic():
+            notice = Notice.objects.create(sender=request.user, **serializer.validated_data['notice'])
+            # Uploads are written to storage by bulk_create, the ids come back from the insert
+            contents = NoticeContent.objects.bulk_create([
+                NoticeContent(
+                    content_type=block['content_type'],
+                    text_content=block.get('text_content'),
+                    image_content=block['upload'] if block['content_type'] == 'image' else None,
+                    file_content=block['upload'] if block['content_type'] == 'file' else None,
+                    image_content_original_name=original_name(block['upload']) if block['content_type'] == 'image' else '',
+                    file_content_original_name=original_name(block['upload']) if block['content_type'] == 'file' else '',
+                )
+                for block in blocks
+            ])
+            NoticeRow.objects.bulk_create([
+                NoticeRow(notice_id=notice, notice_content_id=content, order_num=order_num)
+                for order_num, content in enumerate(contents, start=1)
+            ])
+            NoticeContentTag.objects.bulk_create([
+                NoticeContentTag(notice_content_id=content, notice_tag_id_id=tag_id)
+                for content, block in zip(contents, blocks) for tag_id in dict.fromkeys(block['tag_ids'])
+            ])
+            transaction.on_commit(lambda: bump_model_versions(NoticeRow, NoticeContentTag))
+            for content in contents:
+                if content.image_content:
+                    schedule_image_variants(NoticeContent, content.id, 'image_content', content.image_content.name)
+
+        notice = prefetch_notice_details(Notice.objects.select_related('sender').filter(id=notice.id)).get()
+        data = NoticeGetSerializer(notice).data
+        publish_notice_event(notice, 'notice_created', NoticePatchSerializer(notice).data)
+        return Response(
+            {
+                "message": "Notice created successfully.",
+                "notice": data
+            },
+            status=status.HTTP_201_CREATED
+        )
+
 class NoticeCompletionView(APIView):
     serializer_class = NoticeCompletionSerializer
 
@@ -185,6 +290,20 @@ class NoticeCompletionView(APIView):
                 description='Query by completion_id',
                 required=False,
             ),
+            OpenApiParameter(
+                name='notice_id',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='Filter by notice_id',
+                required=False,
+            ),
+            OpenApiParameter(
+                name='user_id',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='Filter by user_id (students only see their own completions)',
+                required=False,
+            ),
         ],
         responses={
             200: NoticeCompletionSerializer(many=True),
@@ -192,12 +311,20 @@ class NoticeCompletionView(APIView):
     )
     def get(self, request, format=None):
         completion_id = request.query_params.get('completion_id')
+        notice_id = request.query_params.get('notice_id')
+        user_id = request.query_params.get('user_id')
 
         filters = {}
         if completion_id:
             filters["id"] = completion_id
+        if notice_id:
+            filters["notice_id"] = notice_id
+        if user_id:
+            filters["user_id"] = user_id
+        if request.user.role == "student":
+            filters["user_id"] = request.user.user_id
 
-        completions = NoticeCompletion.objects.filter(**filters)
+        completions = NoticeCompletion.objects.filter(**filters).order_by('id')
 
         serializer = self.serializer_class(completions, many=True)
         return Response(serializer.data)
@@ -235,7 +362,139 @@ class NoticeCompletionView(APIView):
         completion.delete()
         return Response({"message": "Notice completion deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
-class NoticeContentView(APIView):
+class NoticeCompletionBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=NoticeCompletionBulkSerializer,
+        examples=[
+            OpenApiExample(
+                'Mark own notices',
+                value={"notice_ids": [1, 2, 3]},
+                request_only=True,
+            ),
+            OpenApiExample(
+                'Mark for students (teachers and managers)',
+                value={"notice_ids": [1], "user_ids": ["2021000001", "2021000002"]},
+                request_only=True,
+            ),
+            OpenApiExample(
+                'Notices marked',
+                value={"message": "Notices marked as completed.", "created": 2, "already_completed": 1},
+                response_only=True,
+            ),
+        ],
+    )
+    def post(self, request, format=None):
+        serializer = NoticeCompletionBulkSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        notice_ids = set(serializer.validated_data['notice_ids'])
+        user_ids = set(serializer.validated_data.get('user_ids', [user.user_id]))
+        if user_ids != {user.user_id} and user.role not in ["teacher", "manager"]:
+            return Response({"error": "Only teachers and managers can mark notices for other users."}, status=status.HTTP_403_FORBIDDEN)
+
+        notices = Notice.objects.filter(id__in=notice_ids)
+        if user.role == "student":
+            notices = notices.in_scope(get_user_scope(user))
+        found = set(notices.values_list('id', flat=True))
+        if found != notice_ids:
+            return Response({"error": "Notices not found.", "notice_ids": sorted(notice_ids - found)}, status=status.HTTP_404_NOT_FOUND)
+
+        known = set(TLSA_User.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        if known != user_ids:
+            return Response({"error": "Users not found.", "user_ids": sorted(user_ids - known)}, status=status.HTTP_400_BAD_REQUEST)
+
+        existing = set(NoticeCompletion.objects.filter(notice_id__in=notice_ids, user_id__in=user_ids).values_list('notice_id', 'user_id'))
+        now = timezone.now()
+        completions = [
+            NoticeCompletion(notice_id=notice_id, user_id=user_id, completion_time=now)
+            for notice_id in sorted(notice_ids) for user_id in sorted(user_ids)
+            if (notice_id, user_id) not in existing
+        ]
+        # Completions created concurrently are skipped by the (notice, user) unique constraint,
+        # count the rows this request inserted by their completion time
+        NoticeCompletion.objects.bulk_create(completions, batch_size=500, ignore_conflicts=True)
+        created = 0
+        if completions:
+            created = NoticeCompletion.objects.filter(notice_id__in=notice_ids, user_id__in=user_ids, completion_time=now).count()
+        return Response(
+            {
+                "message": "Notices marked as completed.",
+                "created": created,
+                "already_completed": len(notice_ids) * len(user_ids) - created,
+            },
+            status=status.HTTP_200_OK
+        )
+
+class NoticeCompletionSummaryView(APIView):
+    permission_classes = [(IsTeacher|IsManager|IsTeachingAffairs)]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='notice_id',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='Notice to summarize',
+                required=True,
+            ),
+        ],
+        examples=[
+            OpenApiExample(
+                'Completion summary',
+                value={
+                    "notice_id": 1,
+                    "enrolled": 300,
+                    "completed": 297,
+                    "missing": 3,
+                    "completion_rate": 99.0,
+                    "courses": [{"course_id": 1, "enrolled": 300, "completed": 297, "completion_rate": 99.0}],
+                    "missing_students": [{"user_id": "2021000001", "real_name": "Wang"}],
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request, format=None):
+        """Completion counts of a notice against the students enrolled in the courses it reaches."""
+        try:
+            notice = Notice.objects.get(id=request.query_params.get('notice_id'))
+        except (Notice.DoesNotExist, ValueError, TypeError):
+            return Response({"message": "Notice not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        enrollments = notice_enrollments(notice.notice_type, notice.class_or_lab_id)
+        completions = NoticeCompletion.objects.filter(notice=notice)
+
+        # Students enrolled in several of the courses are counted once in the totals
+        students = TLSA_User.objects.filter(user_id__in=enrollments.values('student_id'))
+        completed = Exists(completions.filter(user_id=OuterRef('user_id')))
+        totals = students.aggregate(enrolled=Count('id'), completed=Count('id', filter=completed))
+        courses = enrollments.values('course_id').annotate(
+            enrolled=Count('id'),
+            completed=Count('id', filter=Exists(completions.filter(user_id=OuterRef('student_id')))),
+        ).order_by('course_id')
+        missing_students = students.exclude(completed).order_by('user_id').values('user_id', 'real_name')
+
+        def rate(completed, enrolled):
+            return round(completed * 100 / enrolled, 1) if enrolled else 0.0
+
+        return Response({
+            "notice_id": notice.id,
+            "enrolled": totals['enrolled'],
+            "completed": totals['completed'],
+            "missing": totals['enrolled'] - totals['completed'],
+            "completion_rate": rate(totals['completed'], totals['enrolled']),
+            "courses": [
+                {**course, "completion_rate": rate(course['completed'], course['enrolled'])}
+                for course in courses
+            ],
+            "missing_students": list(missing_students),
+        })
+
+class NoticeContentView(KeysetPaginationMixin, APIView):
     serializer_class = NoticeContentSerializer
 
     def get_permissions(self):
@@ -285,7 +544,8 @@ class NoticeContentView(APIView):
                 description='Filter by text content (similarity)',
                 required=False,
             ),
-        ],
+            IMAGE_SIZE_PARAMETER,
+        ] + KEYSET_PAGINATION_PARAMETERS,
         responses={
             200: NoticeContentSerializer(many=True),
         },
@@ -304,10 +564,10 @@ class NoticeContentView(APIView):
         contents = NoticeContent.objects.filter(**filters)
 
         if tag_name:
-            contents = contents.filter(noticecontenttag__notice_tag_id__tag_name=tag_name)
+            tag_ids = tag_dictionary.ids([tag_name])
+            contents = contents.filter(id__in=NoticeContentTag.objects.filter(notice_tag_id__in=tag_ids).values('notice_content_id'))
 
-        serializer = self.serializer_class(contents, many=True)
-        return Response(serializer.data)
+        return self.paginated_response(contents, self.serializer_class, context=image_size_context(request))
 
     @extend_schema(
         request=NoticeContentSerializer,
@@ -419,14 +679,12 @@ class NoticeTagView(APIView):
     def get(self, request, format=None):
         tag_id = request.query_params.get('tag_id')
 
-        filters = {}
+        # Served from the tag dictionary, no query unless a tag changed
+        tags = [{"id": pk, "tag_name": name} for pk, name in sorted(tag_dictionary.names().items())]
         if tag_id:
-            filters["id"] = tag_id
+            tags = [tag for tag in tags if str(tag["id"]) == tag_id]
 
-        tags = NoticeTag.objects.filter(**filters)
-
-        serializer = self.serializer_class(tags, many=True)
-        return Response(serializer.data)
+        return Response(tags)
 
     @extend_schema(
         parameters=[
@@ -461,6 +719,25 @@ class NoticeTagView(APIView):
         tag.delete()
         return Response({"message": "Notice tag deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
+class NoticeTagFacetView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        examples=[
+            OpenApiExample(
+                'Tag counts',
+                value={
+                    "class": [{"tag_id": 1, "tag_name": "Flammable", "count": 3}],
+                    "lab": [{"tag_id": 2, "tag_name": "Goggles", "count": 5}, {"tag_id": 1, "tag_name": "Flammable", "count": 1}]
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request, format=None):
+        """Number of notices of each type with content tagged with each tag."""
+        return Response(tag_dictionary.facets())
+
 class NoticeContentTagView(APIView):
     serializer_class = NoticeContentTagSerializer
 
@@ -560,7 +837,8 @@ class NoticeRowView(APIView):
     def post(self, request, format=None):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            row = serializer.save()
+            publish_notice_event(row.notice_id, 'notice_row_created', serializer.data)
             return Response(
                 {
                     "message": "Notice row created successfully.",
@@ -629,44 +907,53 @@ class NoticeRowView(APIView):
         row.delete()
         return Response({"message": "Notice row deleted successfully."}, status=status.HTTP_204_NO_CONTENT)
 
-from django.db.models import Q, F, Case, When, IntegerField, OuterRef, Subquery
+from django.db.models import F, Case, When, IntegerField, Subquery
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated
-from courses.models import CourseEnrollment, CourseClass
-from classes.models import TeachClass, Class, ClassLocation
+from courses.models import CourseClass
 from .serializers import NoticePageSerializer
 from rest_framework.pagination import PageNumberPagination
+from tlsa_server.cache import get_model_versions
+from tlsa_server.conditional import conditional_get, queryset_fingerprint
+from tlsa_server.async_views import AsyncAPIViewMixin
+from tlsa_server.pagination import AsyncPageNumberPaginationMixin
+from asgiref.sync import sync_to_async
 
 class CustomPagination(PageNumberPagination):
     page_size = 20  # Set the page size to 20
     page_size_query_param = 'page_size'
     max_page_size = 100
 
+class AsyncCustomPagination(AsyncPageNumberPaginationMixin, CustomPagination):
+    pass
+
+def notice_page_state(view, request):
+    # No Last-Modified, updated_at does not cover deletions and CourseClass changes
+    return [queryset_fingerprint(view.get_notices()), get_model_versions(CourseClass)], None
+
 class NoticePageView(ListAPIView):
     serializer_class = NoticePageSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
 
-    def get_queryset(self):
+    def get_notices(self):
         user = self.request.user
+        active = self.request.query_params.get('active')
 
-        # Determine if the user is a student or teacher
-        if user.role == "student":  # Assuming you have a method or field to check if the user is a student
-            # Get courses enrolled by the student
-            enrolled_courses = CourseEnrollment.objects.filter(student=user).values_list('course_id', flat=True)
-            # Get classes for those courses
-            classes = Class.objects.filter(courseclass__course_id__in=enrolled_courses)
-        elif user.role == "teacher":  # Assuming you have a method or field to check if the user is a teacher
-            # Get classes taught by the teacher
-            classes = TeachClass.objects.filter(teacher_id=user).values_list('class_id', flat=True)
-        else:
-            return Notice.objects.none()  # Return empty queryset if user role is not recognized
-
-        # Use Q objects to combine class and lab notices
-        queryset = Notice.objects.filter(
-            Q(notice_type='class', class_or_lab_id__in=classes) |
-            Q(notice_type='lab', class_or_lab_id__in=ClassLocation.objects.filter(class_id__in=classes).values_list('lab_id', flat=True))
-        ).annotate(
+        # Only students (enrolled classes) and teachers (taught classes) have a notice page
+        if user.role not in ["student", "teacher"]:
+            return Notice.objects.none()
+        scope = get_user_scope(user)
+
+        notices = Notice.objects.all()
+        if active and active.lower() == "true":
+            notices = notices.active()
+
+        return notices.in_scope(scope)
+
+    def get_queryset(self):
+        # sender references TLSA_User.user_id, the serializer needs the row for its pk
+        queryset = self.get_notices().annotate(
             class_id=Case(
                 When(notice_type='class', then=F('class_or_lab_id')),
                 default=None,
@@ -676,6 +963,116 @@ class NoticePageView(ListAPIView):
                 CourseClass.objects.filter(class_instance_id=OuterRef('class_or_lab_id')).values('course_id')[:1],
                 output_field=IntegerField()
             )
-        )
+        ).select_related('sender').order_by('id')
+
+        return queryset
+
+    @conditional_get(notice_page_state)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+class AsyncNoticePageView(AsyncAPIViewMixin, NoticePageView):
+    """NoticePageView with an async GET, routed instead of NoticePageView when ASYNC_VIEWS is on."""
+    pagination_class = AsyncCustomPagination
+
+    @conditional_get(notice_page_state)
+    async def get(self, request, *args, **kwargs):
+        # Building the queryset may resolve the user's scope, a sync cache/ORM call
+        queryset = await sync_to_async(self.get_queryset)()
+        page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from drf_spectacular.types import OpenApiTypes
+import time
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients send `Accept: text/event-stream`, error responses are rendered as JSON."""
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return JSONRenderer().render(data)
+
+def format_event(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
 
-        return queryset
\ No newline at end of file
+class EventStreamResponse(StreamingHttpResponse):
+    """StreamingHttpResponse running `on_close` when the server closes it, even if the stream never started."""
+
+    def __init__(self, *args, on_close, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._on_close = on_close
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._on_close()
+
+class NoticeStreamView(APIView):
+    """
+    Server-sent events for new notices and notice rows visible to the user.
+
+    Each connection lasts NOTICE_STREAM_MAX_AGE seconds, EventSource clients reconnect
+    on their own after the `retry` delay. Comment lines every NOTICE_STREAM_HEARTBEAT
+    seconds keep proxies from closing an idle connection.
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.STR},
+        examples=[
+            OpenApiExample(
+                'Notice created',
+                value='event: notice_created\ndata: {"id": 1, "class_or_lab_id": 1, "sender": 1, "notice_type": "class", "post_time": "2024-11-01T08:00:00Z", "end_time": "2024-11-08T08:00:00Z"}\n\n',
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request, format=None):
+        # An open stream holds a worker thread (sync) or an executor thread (ASGI) while it waits
+        release = acquire_stream_slot()
+        if release is None:
+            response = Response({"error": "Too many open notice streams, retry later."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(getattr(settings, 'NOTICE_STREAM_HEARTBEAT', 15))
+            return response
+        subscription = get_broker().subscribe(request.user.user_id)
+        heartbeat = getattr(settings, 'NOTICE_STREAM_HEARTBEAT', 15)
+        deadline = time.monotonic() + getattr(settings, 'NOTICE_STREAM_MAX_AGE', 300)
+
+        def close():
+            subscription.close()
+            release()
+
+        # Under ASGI a sync iterator would be consumed completely before sending anything
+        stream = self.async_events if settings.ASYNC_VIEWS else self.events
+        response = EventStreamResponse(stream(subscription, heartbeat, deadline), content_type='text/event-stream', on_close=close)
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def events(self, subscription, heartbeat, deadline):
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while time.monotonic() < deadline and not subscription.closed:
+                event = subscription.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                yield format_event(event) if event else ": keep-alive\n\n"
+        finally:
+            subscription.close()
+
+    async def async_events(self, subscription, heartbeat, deadline):
+        # Waiting happens in a thread of its own, not the thread shared by sync ORM calls
+        get = sync_to_async(subscription.get, thread_sensitive=False)
+        try:
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while time.monotonic() < deadline and not subscription.closed:
+                event = await get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                yield format_event(event) if event else ": keep-alive\n\n"
+        finally:
+            subscription.close()
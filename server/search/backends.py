@@ -0,0 +1,84 @@
+import re
+from django.db import connection
+from django.db.models import Case, FloatField, Q, Value, When
+from .models import SearchDocument
+
+def query_terms(query):
+    """Words of a search query, punctuation and query syntax are dropped."""
+    return re.findall(r'\w+', query)[:10]
+
+class PostgresSearchBackend:
+    """Ranks with ts_rank_cd over the generated search_vector column (GIN indexed)."""
+
+    def search(self, terms, kinds, limit):
+        # Every term must match, as a prefix so results show up while typing
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        sql = (
+            "SELECT id, ts_rank_cd(search_vector, query) AS rank "
+            "FROM search_document, to_tsquery('simple', %s) query "
+            "WHERE search_vector @@ query"
+        )
+        params = [tsquery]
+        if kinds:
+            sql += f" AND kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += kinds
+        sql += " ORDER BY rank DESC, id LIMIT %s"
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+class SQLiteSearchBackend:
+    """Ranks with FTS5 bm25, title matches weigh ten times more than body matches."""
+
+    def search(self, terms, kinds, limit):
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        sql = (
+            "SELECT d.id, -bm25(search_document_fts, 10.0, 1.0) AS rank "
+            "FROM search_document_fts JOIN search_document d ON d.id = search_document_fts.rowid "
+            "WHERE search_document_fts MATCH %s"
+        )
+        params = [match]
+        if kinds:
+            sql += f" AND d.kind IN ({', '.join(['%s'] * len(kinds))})"
+            params += kinds
+        sql += " ORDER BY rank DESC, d.id LIMIT %s"
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+class FallbackSearchBackend:
+    """Unindexed icontains search for databases without a full-text index, title matches first."""
+
+    def search(self, terms, kinds, limit):
+        documents = SearchDocument.objects.all()
+        if kinds:
+            documents = documents.filter(kind__in=kinds)
+        for term in terms:
+            documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        title_matches = Q()
+        for term in terms:
+            title_matches &= Q(title__icontains=term)
+        documents = documents.annotate(rank=Case(When(title_matches, then=Value(1.0)), default=Value(0.5), output_field=FloatField()))
+        return list(documents.order_by('-rank', 'id').values_list('id', 'rank')[:limit])
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SQLiteSearchBackend()
+    return FallbackSearchBackend()
+
+def search_documents(query, kinds=None, limit=20):
+    """
+    The SearchDocuments matching every word of `query`, best first, with their rank.
+
+    Returns a list of (document, rank). Ranks are only comparable within one backend.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    ranked = get_search_backend().search(terms, list(kinds or []), limit)
+    documents = SearchDocument.objects.in_bulk([document_id for document_id, _ in ranked])
+    return [(documents[document_id], rank) for document_id, rank in ranked if document_id in documents]
@@ -0,0 +1,110 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from classes.models import Class, Experiment, TeachClass
+from labs.models import Lab, ManageLab
+from notices.models import Notice, NoticeContentTag, NoticeRow
+from .models import SearchDocument
+
+def join_text(*parts):
+    """Join strings and lists of strings (JSON tag fields), skipping empty values."""
+    words = []
+    for part in parts:
+        if isinstance(part, (list, tuple)):
+            words.extend(str(item) for item in part if item)
+        elif part:
+            words.append(str(part))
+    return '\n'.join(words)
+
+def notice_documents(ids):
+    # Notices have no title, the first line of their first text block stands in for one
+    texts, tags = defaultdict(list), defaultdict(list)
+    rows = NoticeRow.objects.filter(notice_id__in=ids).order_by('order_num', 'id')
+    for notice_id, text in rows.values_list('notice_id', 'notice_content_id__text_content'):
+        if text:
+            texts[notice_id].append(text)
+    content_tags = NoticeContentTag.objects.filter(notice_content_id__noticerow__notice_id__in=ids)
+    for notice_id, tag_name in content_tags.values_list('notice_content_id__noticerow__notice_id', 'notice_tag_id__tag_name').distinct():
+        tags[notice_id].append(tag_name)
+
+    documents = {}
+    for notice_id, notice_type in Notice.objects.filter(id__in=ids).values_list('id', 'notice_type'):
+        lines = texts[notice_id]
+        title = lines[0].strip().splitlines()[0] if lines and lines[0].strip() else f'{notice_type.capitalize()} notice'
+        documents[notice_id] = (title, join_text(lines, sorted(tags[notice_id])))
+    return documents
+
+def experiment_documents(ids):
+    return {
+        experiment.id: (experiment.title, join_text(
+            experiment.description, experiment.safety_tags, experiment.experiment_method_tags,
+            experiment.submission_type_tags, experiment.other_tags,
+        ))
+        for experiment in Experiment.objects.filter(id__in=ids)
+    }
+
+def class_documents(ids):
+    teachers = defaultdict(list)
+    for class_id, real_name in TeachClass.objects.filter(class_id__in=ids).values_list('class_id', 'teacher_id__real_name'):
+        teachers[class_id].append(real_name)
+    return {
+        class_id: (name, join_text(teachers[class_id]))
+        for class_id, name in Class.objects.filter(id__in=ids).values_list('id', 'name')
+    }
+
+def lab_documents(ids):
+    managers = defaultdict(list)
+    for lab_id, real_name in ManageLab.objects.filter(lab_id__in=ids).values_list('lab_id', 'manager__real_name'):
+        managers[lab_id].append(real_name)
+    return {
+        lab.id: (lab.name, join_text(lab.location, lab.safety_notes, lab.safety_equipments, managers[lab.id]))
+        for lab in Lab.objects.filter(id__in=ids)
+    }
+
+# kind: (model, function building {id: (title, body)} for a list of ids)
+DOCUMENT_SOURCES = {
+    'notice': (Notice, notice_documents),
+    'experiment': (Experiment, experiment_documents),
+    'class': (Class, class_documents),
+    'lab': (Lab, lab_documents),
+}
+
+def index_documents(kind, ids):
+    """Create, update or delete the SearchDocuments of the given objects of one kind."""
+    ids = list(set(ids))
+    if not ids:
+        return
+    _, build = DOCUMENT_SOURCES[kind]
+    documents = build(ids)
+    existing = {document.object_id: document for document in SearchDocument.objects.filter(kind=kind, object_id__in=ids)}
+
+    gone = [object_id for object_id in existing if object_id not in documents]
+    if gone:
+        SearchDocument.objects.filter(kind=kind, object_id__in=gone).delete()
+
+    now = timezone.now()
+    created, updated = [], []
+    for object_id, (title, body) in documents.items():
+        title = title[:255]
+        document = existing.get(object_id)
+        if document is None:
+            created.append(SearchDocument(kind=kind, object_id=object_id, title=title, body=body))
+        elif (document.title, document.body) != (title, body):
+            document.title, document.body, document.updated_at = title, body, now
+            updated.append(document)
+    SearchDocument.objects.bulk_create(created, batch_size=500)
+    SearchDocument.objects.bulk_update(updated, ['title', 'body', 'updated_at'], batch_size=500)
+
+def schedule_index(kind, ids):
+    """Index the objects once the current transaction commits, so the documents see its changes."""
+    ids = list(ids)
+    transaction.on_commit(lambda: index_documents(kind, ids))
+
+def rebuild_index(kind, batch_size=500):
+    """Reindex every object of a kind in batches and drop documents of deleted objects, returns the object count."""
+    model, _ = DOCUMENT_SOURCES[kind]
+    SearchDocument.objects.filter(kind=kind).exclude(object_id__in=model.objects.values('id')).delete()
+    ids = list(model.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), batch_size):
+        index_documents(kind, ids[start:start + batch_size])
+    return len(ids)
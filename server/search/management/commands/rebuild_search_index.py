@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from search.indexing import DOCUMENT_SOURCES, rebuild_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the search documents of notices, experiments, classes and labs (e.g. after bulk imports, migrating indexes existing objects)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=sorted(DOCUMENT_SOURCES), action='append', help='Only rebuild this kind, repeat for several (default: all)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Objects indexed per batch')
+
+    def handle(self, *args, **kwargs):
+        for kind in kwargs['kind'] or DOCUMENT_SOURCES:
+            count = rebuild_index(kind, batch_size=kwargs['batch_size'])
+            self.stdout.write(f'Indexed {count} {kind} objects.')
+        self.stdout.write(self.style.SUCCESS('Search index rebuilt.'))
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('notice', 'Notice'), ('experiment', 'Experiment'), ('class', 'Class'), ('lab', 'Lab')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'search_document',
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='search_document_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+from django.db import migrations
+
+
+POSTGRES_CREATE = [
+    """
+    ALTER TABLE search_document ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX search_document_vector_idx ON search_document USING GIN (search_vector)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS search_document_vector_idx",
+    "ALTER TABLE search_document DROP COLUMN IF EXISTS search_vector",
+]
+
+# External content FTS5 table kept in sync with search_document by triggers
+SQLITE_CREATE = [
+    """
+    CREATE VIRTUAL TABLE search_document_fts USING fts5(
+        title, body, content='search_document', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER search_document_fts_insert AFTER INSERT ON search_document BEGIN
+        INSERT INTO search_document_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_document_fts_delete AFTER DELETE ON search_document BEGIN
+        INSERT INTO search_document_fts(search_document_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER search_document_fts_update AFTER UPDATE ON search_document BEGIN
+        INSERT INTO search_document_fts(search_document_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO search_document_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    "INSERT INTO search_document_fts(search_document_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS search_document_fts_insert",
+    "DROP TRIGGER IF EXISTS search_document_fts_delete",
+    "DROP TRIGGER IF EXISTS search_document_fts_update",
+    "DROP TABLE IF EXISTS search_document_fts",
+]
+
+
+def run_for_vendor(postgres, sqlite):
+    # Other databases get no index, search.backends falls back to icontains there
+    def run(apps, schema_editor):
+        statements = {'postgresql': postgres, 'sqlite': sqlite}.get(schema_editor.connection.vendor, [])
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_CREATE, SQLITE_CREATE),
+            run_for_vendor(POSTGRES_DROP, SQLITE_DROP),
+        ),
+    ]
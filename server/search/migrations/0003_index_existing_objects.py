@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+def index_existing_objects(apps, schema_editor):
+    # The documents are built by search.indexing from the current models, like `manage.py
+    # rebuild_search_index`. The dependencies below make sure their tables are up to date.
+    from search.indexing import DOCUMENT_SOURCES, rebuild_index
+
+    for kind in DOCUMENT_SOURCES:
+        rebuild_index(kind)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_fulltext_index'),
+        ('classes', '0009_experimentfile_file_original_name_and_more'),
+        ('labs', '0005_lab_lab_image_original_name_and_more'),
+        ('notices', '0007_noticecontent_file_content_original_name_and_more'),
+        ('tlsa_server', '0005_tlsa_user_profile_picture_original_name'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_existing_objects, migrations.RunPython.noop),
+    ]
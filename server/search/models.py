@@ -0,0 +1,30 @@
+from django.db import models
+
+class SearchDocument(models.Model):
+    """
+    Searchable text of a notice, experiment, class or lab, kept up to date by search.signals.
+
+    The full-text index over title and body is created by the migrations: a generated
+    tsvector column with a GIN index on PostgreSQL, an FTS5 table on SQLite.
+    """
+    KIND_CHOICES = [
+        ('notice', 'Notice'),
+        ('experiment', 'Experiment'),
+        ('class', 'Class'),
+        ('lab', 'Lab'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.IntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'search_document'
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='search_document_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}: {self.title}"
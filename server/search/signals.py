@@ -0,0 +1,66 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from classes.models import Class, Experiment, TeachClass
+from labs.models import Lab, ManageLab
+from notices.models import Notice, NoticeContent, NoticeContentTag, NoticeRow, NoticeTag
+from tlsa_server.models import TLSA_User
+from .indexing import schedule_index
+from .models import SearchDocument
+
+# Indexing runs on commit, so rows bulk inserted in the same transaction as a saved
+# notice (NoticeComposeView) are included. Other bulk_create()/update() calls send no
+# signals, `manage.py rebuild_search_index` brings the documents up to date.
+
+KINDS = {Notice: 'notice', Experiment: 'experiment', Class: 'class', Lab: 'lab'}
+
+@receiver(post_save, sender=Notice)
+@receiver(post_save, sender=Experiment)
+@receiver(post_save, sender=Class)
+@receiver(post_save, sender=Lab)
+def index_object(sender, instance, **kwargs):
+    schedule_index(KINDS[sender], [instance.id])
+
+@receiver(post_delete, sender=Notice)
+@receiver(post_delete, sender=Experiment)
+@receiver(post_delete, sender=Class)
+@receiver(post_delete, sender=Lab)
+def delete_document(sender, instance, **kwargs):
+    SearchDocument.objects.filter(kind=KINDS[sender], object_id=instance.id).delete()
+
+@receiver(post_save, sender=NoticeRow)
+@receiver(post_delete, sender=NoticeRow)
+def index_row_notice(sender, instance, **kwargs):
+    schedule_index('notice', [instance.notice_id_id])
+
+@receiver(post_save, sender=NoticeContent)
+def index_content_notices(sender, instance, **kwargs):
+    schedule_index('notice', NoticeRow.objects.filter(notice_content_id=instance).values_list('notice_id', flat=True))
+
+@receiver(post_save, sender=NoticeContentTag)
+@receiver(post_delete, sender=NoticeContentTag)
+def index_content_tag_notices(sender, instance, **kwargs):
+    schedule_index('notice', NoticeRow.objects.filter(notice_content_id=instance.notice_content_id_id).values_list('notice_id', flat=True))
+
+@receiver(post_save, sender=NoticeTag)
+def index_tag_notices(sender, instance, created, **kwargs):
+    if not created:
+        notices = NoticeRow.objects.filter(notice_content_id__noticecontenttag__notice_tag_id=instance).values_list('notice_id', flat=True)
+        schedule_index('notice', notices.distinct())
+
+@receiver(post_save, sender=TeachClass)
+@receiver(post_delete, sender=TeachClass)
+def index_teach_class(sender, instance, **kwargs):
+    schedule_index('class', [instance.class_id_id])
+
+@receiver(post_save, sender=ManageLab)
+@receiver(post_delete, sender=ManageLab)
+def index_manage_lab(sender, instance, **kwargs):
+    schedule_index('lab', [instance.lab_id])
+
+@receiver(post_save, sender=TLSA_User)
+def index_user_name(sender, instance, update_fields=None, **kwargs):
+    # Logins only save last_login, only real name changes affect the documents
+    if update_fields is not None and 'real_name' not in update_fields:
+        return
+    schedule_index('class', TeachClass.objects.filter(teacher_id=instance.user_id).values_list('class_id', flat=True))
+    schedule_index('lab', ManageLab.objects.filter(manager=instance.user_id).values_list('lab_id', flat=True))
@@ -0,0 +1,94 @@
+from importlib import import_module
+from io import StringIO
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from tlsa_server.models import TLSA_User
+from classes.models import Class, Experiment, TeachClass
+from labs.models import Lab, ManageLab
+from notices.models import Notice, NoticeContent, NoticeContentTag, NoticeRow, NoticeTag
+from .backends import FallbackSearchBackend
+from .models import SearchDocument
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher', real_name='Li Ming')
+        self.manager = TLSA_User.objects.create_user(username='2021000002', user_id='2021000002', password='password', role='manager', real_name='Zhang Wei')
+        self.client.force_authenticate(self.teacher)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.class_instance = Class.objects.create(name='Titration basics', start_time=timezone.now())
+            TeachClass.objects.create(class_id=self.class_instance, teacher_id=self.teacher)
+            self.experiment = Experiment.objects.create(
+                title='Acid base titration', estimated_time=2, class_id=self.class_instance,
+                description='Measure the concentration of an acid', safety_tags=['Corrosive'],
+            )
+            self.lab = Lab.objects.create(name='Chemistry Lab', location='Building A', safety_equipments=['Eye wash'])
+            ManageLab.objects.create(manager=self.manager, lab=self.lab)
+
+            now = timezone.now()
+            self.notice = Notice.objects.create(class_or_lab_id=self.class_instance.id, sender=self.teacher, notice_type='class', post_time=now, end_time=now)
+            content = NoticeContent.objects.create(content_type='text', text_content='Titration safety\nWear goggles in the lab.')
+            NoticeRow.objects.create(notice_id=self.notice, notice_content_id=content, order_num=1)
+            NoticeContentTag.objects.create(notice_content_id=content, notice_tag_id=NoticeTag.objects.create(tag_name='Goggles'))
+
+    def search(self, **params):
+        response = self.client.get(reverse('search'), params)
+        self.assertEqual(response.status_code, 200)
+        return [(result['type'], result['id']) for result in response.data['results']]
+
+    def test_ranked_results(self):
+        results = self.search(q='titra')
+        self.assertEqual(set(results), {('class', self.class_instance.id), ('experiment', self.experiment.id), ('notice', self.notice.id)})
+        self.assertEqual(self.search(q='concentration acid'), [('experiment', self.experiment.id)])
+        self.assertEqual(set(self.search(q='titration', type='class,experiment')), {('class', self.class_instance.id), ('experiment', self.experiment.id)})
+        # Title matches rank above body matches
+        self.assertEqual(self.search(q='lab'), [('lab', self.lab.id), ('notice', self.notice.id)])
+        self.assertEqual(self.search(q='lab', limit=1), [('lab', self.lab.id)])
+
+    def test_related_text_is_searchable(self):
+        self.assertEqual(self.search(q='zhang'), [('lab', self.lab.id)])
+        self.assertEqual(self.search(q='Li Ming'), [('class', self.class_instance.id)])
+        self.assertEqual(self.search(q='corrosive'), [('experiment', self.experiment.id)])
+        self.assertEqual(self.search(q='goggles', type='notice'), [('notice', self.notice.id)])
+        self.assertEqual(SearchDocument.objects.get(kind='notice').title, 'Titration safety')
+
+    def test_updates_and_deletes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.manager.real_name = 'Wang Fang'
+            self.manager.save()
+            self.experiment.delete()
+        self.assertEqual(self.search(q='zhang'), [])
+        self.assertEqual(self.search(q='wang'), [('lab', self.lab.id)])
+        self.assertEqual(self.search(q='acid'), [])
+
+    def test_fallback_backend(self):
+        lab, notice = SearchDocument.objects.get(kind='lab'), SearchDocument.objects.get(kind='notice')
+        self.assertEqual(FallbackSearchBackend().search(['lab'], [], 20), [(lab.id, 1.0), (notice.id, 0.5)])
+        self.assertEqual(FallbackSearchBackend().search(['lab', 'goggles'], ['notice'], 20), [(notice.id, 0.5)])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(reverse('search')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('search'), {'q': 'lab', 'type': 'course'}).status_code, 400)
+        self.assertEqual(self.search(q='"*^'), [])
+
+    def test_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        SearchDocument.objects.create(kind='lab', object_id=0, title='Deleted lab')
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Search index rebuilt.', out.getvalue())
+        self.assertEqual(SearchDocument.objects.count(), 4)
+        self.assertEqual(self.search(q='chemistry'), [('lab', self.lab.id)])
+
+    def test_migration_indexes_existing_objects(self):
+        # Objects created before the search app was installed have no documents
+        SearchDocument.objects.all().delete()
+        migration = import_module('search.migrations.0003_index_existing_objects')
+        migration.index_existing_objects(apps, None)
+        self.assertEqual(SearchDocument.objects.count(), 4)
+        self.assertEqual(self.search(q='goggles'), [('notice', self.notice.id)])
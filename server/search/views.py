@@ -0,0 +1,75 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
+from tlsa_server.permissions import IsAuthenticated
+from .backends import search_documents
+from .models import SearchDocument
+
+class SearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='q',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='Search words, every word must match (as a prefix)',
+                required=True,
+            ),
+            OpenApiParameter(
+                name='type',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='Comma separated result types: notice, experiment, class, lab (default: all)',
+                required=False,
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='Maximum number of results (default 20, max 100)',
+                required=False,
+            ),
+        ],
+        examples=[
+            OpenApiExample(
+                'Search results',
+                value={
+                    "query": "titration",
+                    "results": [
+                        {"type": "experiment", "id": 3, "title": "Acid-base titration", "snippet": "Determine the concentration of ...", "rank": 0.6},
+                        {"type": "class", "id": 1, "title": "Titration", "snippet": "", "rank": 0.5},
+                    ]
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def get(self, request, format=None):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({"error": "q is required."}, status=status.HTTP_400_BAD_REQUEST)
+
+        kinds = [kind for kind in request.query_params.get('type', '').split(',') if kind]
+        valid_kinds = dict(SearchDocument.KIND_CHOICES)
+        if any(kind not in valid_kinds for kind in kinds):
+            return Response({"error": f"type must be one of {', '.join(valid_kinds)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+        except ValueError:
+            return Response({"error": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [
+            {
+                "type": document.kind,
+                "id": document.object_id,
+                "title": document.title,
+                "snippet": document.body[:200],
+                "rank": round(rank, 4),
+            }
+            for document, rank in search_documents(query, kinds, limit)
+        ]
+        return Response({"query": query, "results": results})
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class TlsaServerConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tlsa_server'
+
+    def ready(self):
+        from . import signals
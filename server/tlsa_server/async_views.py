@@ -0,0 +1,41 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+class AsyncAPIViewMixin:
+    """
+    Serve an APIView from the event loop when running under ASGI.
+
+    Handlers written as `async def` are awaited directly, the remaining (sync)
+    handlers of the view run in a thread through sync_to_async, so a view can make
+    only its hot GET handler async. Authentication and permission checks run before
+    the handler like in APIView.dispatch.
+    Under WSGI Django runs the whole view through async_to_sync, it still works but
+    gains nothing, see ASYNC_VIEWS in settings.
+    """
+
+    # Makes View.as_view() return a coroutine function
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
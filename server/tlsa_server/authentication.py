@@ -0,0 +1,108 @@
+import time
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import LazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+class TLSARefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's role, copied into every access token created from it.
+
+    `issued_at` is the issue time with sub-second precision (`iat` only has seconds), so
+    a login right after a revocation is not denied with the tokens it replaces.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['issued_at'] = token.current_time.timestamp()
+        return token
+
+def revoke_token(token):
+    """Deny a single token (by jti) until it expires."""
+    remaining = max(int(token['exp'] - time.time()), 1)
+    cache.set(f"revoked:jti:{token['jti']}", True, timeout=remaining)
+
+def revoke_user_tokens(user_id):
+    """Deny every token issued to the user so far, e.g. after a role or password change."""
+    lifetime = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+    cache.set(f'revoked:user:{user_id}', time.time(), timeout=lifetime)
+
+def is_token_revoked(token):
+    jti_key = f"revoked:jti:{token['jti']}"
+    user_key = f"revoked:user:{token['user_id']}"
+    revoked = cache.get_many([jti_key, user_key])
+    if revoked.get(jti_key):
+        return True
+    revoked_before = revoked.get(user_key)
+    if revoked_before is None:
+        return False
+    if 'issued_at' in token:
+        return token['issued_at'] < revoked_before
+    # Older tokens only have iat with one second resolution, the whole second is denied
+    return token['iat'] <= revoked_before
+
+class ClaimsUser(LazyObject):
+    """
+    User built from the access token claims.
+
+    `user_id` and `role` are read from the token, which is all the permission classes
+    need. Any other attribute (or using the user in a query) loads the TLSA_User row once.
+    """
+
+    def __init__(self, token):
+        super().__init__()
+        self.__dict__['_token'] = token
+
+    def _setup(self):
+        User = get_user_model()
+        try:
+            self._wrapped = User.objects.get(user_id=self.user_id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+    @property
+    def user_id(self):
+        return str(self._token['user_id'])
+
+    @property
+    def role(self):
+        return self._token['role']
+
+    @property
+    def is_authenticated(self):
+        return True
+
+    @property
+    def is_anonymous(self):
+        return False
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        if self._wrapped is empty:
+            return f'<ClaimsUser: {self.user_id} ({self.role})>'
+        return super().__repr__()
+
+class TokenClaimsAuthentication(JWTAuthentication):
+    """
+    JWT authentication without a per-request user query.
+
+    Tokens carrying a `role` claim produce a ClaimsUser, older tokens fall back to
+    loading the user. Both are checked against the cached deny-list. Without a cache
+    shared by the workers (SHARED_CACHE) a revocation only reaches one worker, so
+    every request loads the user and its current role and is_active instead.
+    """
+
+    def get_user(self, validated_token):
+        if is_token_revoked(validated_token):
+            raise InvalidToken("Token has been revoked")
+        if 'role' not in validated_token or not getattr(settings, 'SHARED_CACHE', False):
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
@@ -0,0 +1,104 @@
+from collections import Counter, defaultdict
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save, post_save, post_delete
+from .models import MediaBlob
+
+# (model, field name) of every file field counted in MediaBlob, filled by track_blobs()
+BLOB_FIELDS = []
+
+def acquire_blobs(names):
+    """Add a reference to each stored file name (a name listed twice gets two)."""
+    names = Counter(name for name in names if name)
+    if not names:
+        return
+    # Rows of new files start at 0, a concurrent upload of the same content is not an error
+    MediaBlob.objects.bulk_create([MediaBlob(name=name) for name in names], ignore_conflicts=True)
+    by_count = defaultdict(list)
+    for name, count in names.items():
+        by_count[count].append(name)
+    for count, group in by_count.items():
+        MediaBlob.objects.filter(name__in=group).update(refcount=F('refcount') + count)
+
+def release_blobs(names):
+    """Drop a reference from each name, files left without references are deleted on commit."""
+    names = Counter(name for name in names if name)
+    for name, count in names.items():
+        MediaBlob.objects.filter(name=name, refcount__gte=count).update(refcount=F('refcount') - count)
+    if names:
+        transaction.on_commit(lambda: collect_blobs(names))
+
+def is_referenced(name):
+    return any(model.objects.filter(**{field_name: name}).exists() for model, field_name in BLOB_FIELDS)
+
+def collect_blobs(names):
+    """
+    Delete the stored files among `names` that no row refers to anymore, returns their count.
+
+    The MediaBlob row stays locked while its file is deleted, a concurrent save of the same
+    content waits and then writes the file again. Files stored before MediaBlob existed
+    have no row, they are deleted when no file field holds their name.
+    """
+    deleted = 0
+    for name in set(names):
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if (blob is not None and blob.refcount > 0) or is_referenced(name):
+                continue
+            if blob is not None:
+                blob.delete()
+            default_storage.delete(name)
+            deleted += 1
+    return deleted
+
+def row_blobs(instance, field_names):
+    """Stored file names a row refers to: its file fields and their image variants."""
+    names = []
+    for field_name in field_names:
+        names.append(getattr(instance, field_name).name)
+        variants = getattr(instance, f'{field_name}_variants', None) or {}
+        names.extend(name for key, name in variants.items() if key != 'source')
+    return [name for name in names if name]
+
+def track_blobs(model, *field_names):
+    """
+    Keep the MediaBlob reference counts of the given file fields of `model` up to date.
+
+    Saving a row with another file moves its reference, deleting a row releases its files
+    (and their image variants, see tlsa_server.images). bulk_create() and Queryset.update()
+    send no signals, their callers release_blobs() themselves (storage saves take their own reference).
+    """
+    def remember_blobs(sender, instance, update_fields=None, **kwargs):
+        instance._previous_blobs = None
+        # New uploads are saved by the storage after this signal, it takes their reference itself
+        instance._stored_blobs = {field_name for field_name in field_names if getattr(instance, field_name) and not getattr(instance, field_name)._committed}
+        if instance._state.adding or (update_fields is not None and not set(update_fields) & set(field_names)):
+            return
+        instance._previous_blobs = sender.objects.filter(pk=instance.pk).values_list(*field_names).first()
+
+    def move_blobs(sender, instance, created, update_fields=None, **kwargs):
+        if not created and (update_fields is not None and not set(update_fields) & set(field_names)):
+            return
+        previous = getattr(instance, '_previous_blobs', None) or [None] * len(field_names)
+        stored = getattr(instance, '_stored_blobs', set())
+        acquired, released = [], []
+        for field_name, old in zip(field_names, previous):
+            name = getattr(instance, field_name).name or None
+            if field_name in stored:
+                # Re-uploading the same content also gave the row a second reference to it
+                released.append(old)
+            elif name != old:
+                acquired.append(name)
+                released.append(old)
+        acquire_blobs(acquired)
+        release_blobs(released)
+
+    def release_on_delete(sender, instance, **kwargs):
+        release_blobs(row_blobs(instance, field_names))
+
+    BLOB_FIELDS.extend((model, field_name) for field_name in field_names)
+    uid = model._meta.label_lower
+    pre_save.connect(remember_blobs, sender=model, weak=False, dispatch_uid=f'blobs_pre_save:{uid}')
+    post_save.connect(move_blobs, sender=model, weak=False, dispatch_uid=f'blobs_save:{uid}')
+    post_delete.connect(release_on_delete, sender=model, weak=False, dispatch_uid=f'blobs_delete:{uid}')
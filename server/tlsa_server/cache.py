@@ -0,0 +1,159 @@
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+CACHE_NAMESPACES = {
+    'scope': 'Resolved class and lab IDs per user',
+    'users': 'User profiles',
+    'labs': 'Lab listings',
+    'courses': 'Course pages',
+    'schema': 'OpenAPI schema output',
+}
+
+def _new_version():
+    # Time based, so a version evicted from the cache is never handed out again
+    return int(time.time() * 1000)
+
+class NamespaceCache:
+    """
+    A namespace inside a Django cache.
+
+    Keys are stored as `<namespace>:<version>:<key>`, clear() bumps the version so a
+    whole namespace can be dropped without knowing its keys. Hits and misses are
+    counted in the cache itself so they are shared by every worker (CACHE_STATS).
+    """
+
+    def __init__(self, namespace, alias='default'):
+        if namespace not in CACHE_NAMESPACES:
+            raise ValueError(f"Unknown cache namespace '{namespace}'.")
+        self.namespace = namespace
+        self.cache = caches[alias]
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'CACHE_TIMEOUTS', {}).get(self.namespace, 300)
+
+    def _version_key(self):
+        return f'{self.namespace}:version'
+
+    def _version(self):
+        version = self.cache.get(self._version_key())
+        if version is None:
+            self.cache.add(self._version_key(), _new_version(), timeout=None)
+            version = self.cache.get(self._version_key())
+        return version
+
+    def make_key(self, key, version=None):
+        return f'{self.namespace}:{version or self._version()}:{key}'
+
+    def _record(self, outcome):
+        if not getattr(settings, 'CACHE_STATS', True):
+            return
+        key = f'stats:{self.namespace}:{outcome}'
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            self.cache.add(key, 1, timeout=None)
+
+    def get(self, key, default=None):
+        value = self.cache.get(self.make_key(key))
+        self._record('hits' if value is not None else 'misses')
+        return default if value is None else value
+
+    def set(self, key, value, timeout=None):
+        self.cache.set(self.make_key(key), value, timeout=timeout or self.timeout)
+
+    def get_or_set(self, key, default, timeout=None):
+        """Return the cached value, computing and storing `default()` on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = default()
+            self.set(key, value, timeout)
+        return value
+
+    def delete(self, key):
+        self.cache.delete(self.make_key(key))
+
+    def delete_many(self, keys):
+        version = self._version()
+        self.cache.delete_many([self.make_key(key, version) for key in keys])
+
+    def clear(self):
+        try:
+            self.cache.incr(self._version_key())
+        except ValueError:
+            self.cache.set(self._version_key(), _new_version(), timeout=None)
+
+def namespace_cache(namespace):
+    return NamespaceCache(namespace)
+
+def get_cache_stats():
+    cache = caches['default']
+    keys = [f'stats:{namespace}:{outcome}' for namespace in CACHE_NAMESPACES for outcome in ('hits', 'misses')]
+    counts = cache.get_many(keys)
+
+    stats = {}
+    for namespace, description in CACHE_NAMESPACES.items():
+        hits = counts.get(f'stats:{namespace}:hits', 0)
+        misses = counts.get(f'stats:{namespace}:misses', 0)
+        stats[namespace] = {
+            'description': description,
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+def reset_cache_stats():
+    caches['default'].delete_many([f'stats:{namespace}:{outcome}' for namespace in CACHE_NAMESPACES for outcome in ('hits', 'misses')])
+
+def _model_version_key(model):
+    return f'version:{model._meta.label_lower}'
+
+def get_model_versions(*models):
+    """
+    Version counters of whole tables, for tables without an updated_at column.
+
+    A counter missing from the cache starts at a new time based value, so it never
+    repeats a version handed out before the eviction.
+    """
+    cache = caches['default']
+    keys = [_model_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+def bump_model_versions(*models):
+    cache = caches['default']
+    for model in models:
+        key = _model_version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), timeout=None)
+
+def track_model_versions(model, ignore_fields=()):
+    """
+    Bump the version of `model` whenever a row is saved or deleted.
+
+    The version is bumped once the writer's transaction commits, a reader bumping in
+    between would otherwise cache the data from before the commit under the new version.
+    Saves that only touch `ignore_fields` (e.g. last_login) keep the version.
+    bulk_create(), bulk_update() and Queryset.update() send no signals, callers
+    bump the version themselves.
+    """
+    def bump_on_save(sender, update_fields=None, **kwargs):
+        if update_fields and set(update_fields) <= set(ignore_fields):
+            return
+        transaction.on_commit(lambda: bump_model_versions(sender))
+
+    def bump_on_delete(sender, **kwargs):
+        transaction.on_commit(lambda: bump_model_versions(sender))
+
+    post_save.connect(bump_on_save, sender=model, weak=False, dispatch_uid=f'version_save:{model._meta.label_lower}')
+    post_delete.connect(bump_on_delete, sender=model, weak=False, dispatch_uid=f'version_delete:{model._meta.label_lower}')
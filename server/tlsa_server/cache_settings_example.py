@@ -0,0 +1,5 @@
+# Redis-compatible server shared by every worker (pip install redis)
+REDIS_URL = "redis://127.0.0.1:6379/0"
+
+# Or a directory for the file based cache, shared by workers on the same host
+# CACHE_DIR = "/var/tmp/tlsa_cache"
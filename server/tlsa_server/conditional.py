@@ -0,0 +1,98 @@
+import functools
+import hashlib
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.response import Response
+from .cache import namespace_cache
+
+def queryset_fingerprint(queryset):
+    """
+    Row count, id sum and newest updated_at of a queryset in one aggregate query.
+
+    Inserts and edits move updated_at, deletions change the count and id sum.
+    """
+    return queryset.order_by().aggregate(count=Count('id'), id_sum=Sum('id'), updated_at=Max('updated_at'))
+
+def conditional_get(state_func, cache_namespace=None):
+    """
+    ETag and Last-Modified support for APIView GET handlers.
+
+    `state_func(view, request)` returns `(parts, last_modified)`: any values that change
+    whenever the response would (version counters, fingerprints, scopes) and an optional
+    datetime. The ETag is a hash of the request path with those parts, so a matching
+    If-None-Match returns 304 before the handler and its serializers run. Works on sync
+    and async handlers.
+
+    Last-Modified (and If-Modified-Since) is only supported when `last_modified` moves
+    with every part. A newest updated_at misses deletions, version counters and rows
+    entering or leaving a time window, return None for those states.
+
+    With `cache_namespace` the data of 200 responses is also kept in that namespace
+    (see tlsa_server.cache) under the same state, so a client without the ETag gets it
+    without running the handler either. The parts must then cover everything the data
+    depends on, including the requesting user where it matters.
+
+    The version counters live in the cache, so without a cache shared by the workers
+    (settings.SHARED_CACHE) a write on one worker would not change the state another
+    worker computes. The handler then always runs and no ETag is sent.
+    """
+    def evaluate(request, parts, last_modified):
+        digest = hashlib.md5(repr((request.get_full_path(), parts)).encode(), usedforsecurity=False).hexdigest()
+        etag = f'W/"{digest}"'
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+    def cache_key(request, parts):
+        # Pagination links are absolute, the host is part of the data
+        return hashlib.md5(repr((request.build_absolute_uri(), parts)).encode(), usedforsecurity=False).hexdigest()
+
+    def cached_response(request, parts):
+        if cache_namespace is None:
+            return None
+        data = namespace_cache(cache_namespace).get(cache_key(request, parts))
+        return None if data is None else Response(data)
+
+    def cache_response(request, parts, response):
+        if cache_namespace is not None and response.status_code == 200 and isinstance(response, Response):
+            namespace_cache(cache_namespace).set(cache_key(request, parts), response.data)
+
+    def set_headers(response, etag, timestamp):
+        if response.status_code in (200, 304):
+            response.headers['ETag'] = etag
+            if timestamp is not None:
+                response.headers['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def decorator(method):
+        if iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                if not settings.SHARED_CACHE:
+                    return await method(self, request, *args, **kwargs)
+                parts, last_modified = await sync_to_async(state_func)(self, request)
+                etag, timestamp, response = evaluate(request, parts, last_modified)
+                if response is None:
+                    response = await sync_to_async(cached_response)(request, parts)
+                if response is None:
+                    response = await method(self, request, *args, **kwargs)
+                    await sync_to_async(cache_response)(request, parts, response)
+                return set_headers(response, etag, timestamp)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not settings.SHARED_CACHE:
+                return method(self, request, *args, **kwargs)
+            parts, last_modified = state_func(self, request)
+            etag, timestamp, response = evaluate(request, parts, last_modified)
+            if response is None:
+                response = cached_response(request, parts)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                cache_response(request, parts, response)
+            return set_headers(response, etag, timestamp)
+        return wrapper
+    return decorator
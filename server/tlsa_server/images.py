@@ -0,0 +1,174 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save
+from drf_spectacular.utils import OpenApiParameter
+from PIL import Image, ImageOps
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from .blobs import release_blobs
+from .cache import bump_model_versions
+
+logger = logging.getLogger(__name__)
+
+FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+# (model, field name) of every image field with variants, filled by track_image_variants()
+IMAGE_FIELDS = []
+
+def variants_field(field_name):
+    """Name of the JSONField holding the variants of an image field, e.g. lab_image_variants."""
+    return f'{field_name}_variants'
+
+def render_variant(image, spec):
+    """Encode a copy of `image` fitted inside spec['size'], images are never enlarged."""
+    image = image.copy()
+    image.thumbnail(spec['size'], Image.Resampling.LANCZOS)
+    if spec['format'] == 'JPEG' and image.mode != 'RGB':
+        # JPEG has no alpha channel, transparent areas become white instead of black
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, 'white')
+        image.paste(rgba, mask=rgba.getchannel('A'))
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(buffer, format=spec['format'], quality=spec.get('quality', 85))
+    return buffer.getvalue()
+
+def generate_image_variants(model, pk, field_name, source):
+    """
+    Write the IMAGE_VARIANTS of the image `source` next to it and store their names on the row.
+
+    The row keeps {"source": source, "<variant>": name, ...}. Nothing is stored if the row
+    was deleted or got another image meanwhile, the variants of a replaced image are released
+    (tlsa_server.blobs). Returns the stored dict, or None.
+    """
+    column = variants_field(field_name)
+    storage = model._meta.get_field(field_name).storage
+    rows = model.objects.filter(pk=pk)
+    previous = rows.values_list(column, flat=True).first()
+
+    variants = {}
+    if source:
+        try:
+            with storage.open(source, 'rb') as file:
+                image = Image.open(file)
+                image.load()
+        except (OSError, Image.DecompressionBombError) as error:
+            logger.warning("No variants for %s: %s", source, error)
+            return None
+        # Phone photos are stored sideways with an EXIF orientation tag
+        image = ImageOps.exif_transpose(image)
+        base = os.path.splitext(source)[0]
+        variants['source'] = source
+        for name, spec in settings.IMAGE_VARIANTS.items():
+            path = f"{base}_{name}.{FORMAT_EXTENSIONS[spec['format']]}"
+            variants[name] = storage.save(path, ContentFile(render_variant(image, spec)))
+
+    current = Q(**{field_name: source}) if source else Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True})
+    # Identical images share their variants, storage.save() took a reference to each for this row
+    with transaction.atomic():
+        updated = rows.filter(current).update(**{column: variants})
+        discarded = (previous or {}) if updated else variants
+        release_blobs(name for key, name in discarded.items() if key != 'source')
+    if not updated:
+        return None
+    # Queryset.update() sends no signals, the ETags of listings showing the image must change
+    bump_model_versions(model)
+    return variants
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _run_job(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Image variant job failed")
+    finally:
+        # Worker threads open their own connection, it is not closed by any request
+        connection.close()
+
+def run_in_background(func, *args):
+    """
+    Run `func(*args)` on the image worker threads.
+
+    Decoding and resampling release the GIL in Pillow, so the threads do not slow request
+    threads down much. With IMAGE_VARIANT_WORKERS = 0 the job runs inline instead.
+    Jobs are lost when the process exits, `manage.py generate_image_variants` catches up.
+    """
+    global _executor
+    workers = getattr(settings, 'IMAGE_VARIANT_WORKERS', 2)
+    if not workers:
+        return func(*args)
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-variants')
+    return _executor.submit(_run_job, func, *args)
+
+def schedule_image_variants(model, pk, field_name, source):
+    """Generate the variants once the current transaction commits, so the worker sees the row."""
+    transaction.on_commit(lambda: run_in_background(generate_image_variants, model, pk, field_name, source))
+
+def track_image_variants(model, *field_names):
+    """
+    Generate the variants of the given image fields whenever a row is saved with a new image.
+
+    Each field needs a `<field>_variants` JSONField next to it. bulk_create() sends no
+    signals, callers schedule_image_variants() themselves.
+    """
+    def schedule_on_save(sender, instance, update_fields=None, **kwargs):
+        for field_name in field_names:
+            if update_fields is not None and field_name not in update_fields:
+                continue
+            source = getattr(instance, field_name).name or None
+            if source != (getattr(instance, variants_field(field_name)) or {}).get('source'):
+                schedule_image_variants(sender, instance.pk, field_name, source)
+
+    IMAGE_FIELDS.extend((model, field_name) for field_name in field_names)
+    post_save.connect(schedule_on_save, sender=model, weak=False, dispatch_uid=f'image_variants:{model._meta.label_lower}')
+
+IMAGE_SIZE_PARAMETER = OpenApiParameter(
+    name='image_size',
+    type=str,
+    location=OpenApiParameter.QUERY,
+    description='Size of the returned images: original (default), thumbnail, medium or webp',
+    required=False,
+)
+
+def image_size_context(request):
+    """Serializer context picking the image variant named by the `image_size` query parameter."""
+    image_size = request.query_params.get('image_size', 'original')
+    if image_size != 'original' and image_size not in settings.IMAGE_VARIANTS:
+        raise ValidationError({"image_size": f"Must be one of: original, {', '.join(settings.IMAGE_VARIANTS)}."})
+    return {'image_size': None if image_size == 'original' else image_size}
+
+class ImageVariantField(serializers.ImageField):
+    """
+    ImageField returning the URL of the variant in the `image_size` context,
+    or of the original image while its variants are not generated yet.
+    """
+
+    def to_representation(self, value):
+        image_size = self.context.get('image_size')
+        if not value or not image_size:
+            return super().to_representation(value)
+        variants = getattr(value.instance, variants_field(value.field.name), None) or {}
+        if variants.get('source') != value.name or image_size not in variants:
+            return super().to_representation(value)
+        url = value.storage.url(variants[image_size])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
+
+class ImageVariantSerializerMixin:
+    """ModelSerializer mixin serializing every ImageField with ImageVariantField."""
+    serializer_field_mapping = {
+        **serializers.ModelSerializer.serializer_field_mapping,
+        models.ImageField: ImageVariantField,
+    }
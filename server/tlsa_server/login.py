@@ -0,0 +1,117 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from contextlib import contextmanager
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+
+class LoginBusy(Exception):
+    """Raised when a login cannot be processed right now, the client should retry later."""
+
+class HashPool:
+    """
+    Bounded thread pool for password hashing.
+
+    hashlib releases the GIL while hashing, so request threads wait here without
+    blocking each other. At most `workers` hashes run at once and at most `queue`
+    more wait, further logins fail fast with LoginBusy instead of piling up.
+    """
+
+    def __init__(self, workers, queue, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def run(self, func, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise LoginBusy("Too many logins in progress, please retry.")
+        # The slot is held until the hash finishes, even if the caller stops waiting
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise LoginBusy("Login timed out, please retry.")
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+def get_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = HashPool(
+                workers=getattr(settings, 'LOGIN_HASH_WORKERS', 4),
+                queue=getattr(settings, 'LOGIN_HASH_QUEUE', 64),
+                timeout=getattr(settings, 'LOGIN_HASH_TIMEOUT', 10),
+            )
+        return _hash_pool
+
+def get_client_ip(request):
+    header = getattr(settings, 'LOGIN_CLIENT_IP_HEADER', None)
+    if header and request.META.get(header):
+        return request.META[header]
+    return request.META.get('REMOTE_ADDR', '')
+
+@contextmanager
+def login_slot(user_id, ip):
+    """
+    Limit concurrent login attempts per user and per IP address.
+
+    Counters live in the cache so the limits hold across workers, a short timeout
+    releases slots left behind by a crashed worker.
+    """
+    limits = [
+        (f'login:user:{user_id}', getattr(settings, 'LOGIN_CONCURRENCY_PER_USER', 2)),
+        (f'login:ip:{ip}', getattr(settings, 'LOGIN_CONCURRENCY_PER_IP', 50)),
+    ]
+    timeout = getattr(settings, 'LOGIN_HASH_TIMEOUT', 10) * 2
+    acquired = []
+    try:
+        for key, limit in limits:
+            cache.add(key, 0, timeout=timeout)
+            try:
+                count = cache.incr(key)
+            except ValueError:
+                # Expired between add() and incr()
+                cache.add(key, 1, timeout=timeout)
+                count = 1
+            acquired.append(key)
+            if count > limit:
+                raise LoginBusy("Too many concurrent login attempts, please retry.")
+        yield
+    finally:
+        for key in acquired:
+            try:
+                cache.decr(key)
+            except ValueError:
+                pass
+
+def _verify(encoded, password):
+    """Runs in the hash pool, returns (valid, upgraded hash or None) without touching the database."""
+    if encoded is None:
+        # Hash anyway so unknown user IDs take as long as wrong passwords
+        make_password(password)
+        return False, None
+
+    upgraded = []
+    valid = check_password(password, encoded, lambda raw_password: upgraded.append(make_password(raw_password)))
+    return valid, upgraded[0] if upgraded else None
+
+def verify_login(request, user, user_id, password):
+    """
+    Check a login attempt through the concurrency governor and the hash pool.
+
+    `user` is None for unknown user IDs. Hashes made with an older hasher (e.g. PBKDF2)
+    are replaced by the preferred one (PASSWORD_HASHERS[0]) on a successful login.
+    Raises LoginBusy when over the limits.
+    """
+    with login_slot(user_id, get_client_ip(request)):
+        valid, upgraded = get_hash_pool().run(_verify, user.password if user else None, password)
+
+    if valid and upgraded:
+        # Upgrading the hash is not a password change, see tlsa_server.signals
+        user.password = upgraded
+        user._password_rehash = True
+        user.save(update_fields=['password'])
+    return valid and user.is_active
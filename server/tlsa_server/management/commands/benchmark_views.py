@@ -0,0 +1,78 @@
+import asyncio
+import statistics
+import time
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+User = get_user_model()
+
+def get_endpoints():
+    from classes.views import AsyncClassView, ClassView
+    from labs.views import AsyncLabView, LabView
+    from notices.views import AsyncNoticePageView, NoticePageView
+    from tlsa_server.views import AsyncUserInfoView, UserInfoView
+
+    return {
+        'lab': ('/api/v1/labs/lab', LabView, AsyncLabView),
+        'class': ('/api/v1/classes/class', ClassView, AsyncClassView),
+        'notice-page': ('/api/v1/notices/notice-page', NoticePageView, AsyncNoticePageView),
+        'user-info': ('/api/v1/users/user-info', UserInfoView, AsyncUserInfoView),
+    }
+
+class Command(BaseCommand):
+    help = 'Compare the sync and async read views under concurrent requests and report p50/p99 latency and throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user-id', type=str, required=True, help='user_id of the user the requests are made as')
+        parser.add_argument('--endpoint', choices=sorted(get_endpoints()), action='append', help='Endpoint to benchmark, repeat for several (default: all)')
+        parser.add_argument('--requests', type=int, default=200, help='Number of requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=20, help='Number of requests in flight at once')
+
+    def handle(self, *args, **kwargs):
+        user = User.objects.filter(user_id=kwargs['user_id']).first()
+        if user is None:
+            raise CommandError(f"User {kwargs['user_id']} does not exist.")
+        if kwargs['requests'] < 1 or kwargs['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be positive.')
+
+        endpoints = get_endpoints()
+        for name in kwargs['endpoint'] or sorted(endpoints):
+            path, sync_view, async_view = endpoints[name]
+            self.stdout.write(f'{name} ({path}), {kwargs["requests"]} requests, concurrency {kwargs["concurrency"]}')
+            for mode, view in (('sync', sync_view), ('async', async_view)):
+                # Runs inside async_to_sync like the ASGI handler, sync views go through
+                # sync_to_async(thread_sensitive=True) exactly as Django serves them there
+                latencies, elapsed, failures = async_to_sync(self.run_view)(view, path, user, kwargs['requests'], kwargs['concurrency'])
+                percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+                line = f'  {mode:<5} {len(latencies) / elapsed:8.1f} req/s, p50 {percentiles[49]:.1f} ms, p99 {percentiles[98]:.1f} ms'
+                if failures:
+                    self.stdout.write(self.style.WARNING(f'{line}, {failures} non-200 responses'))
+                else:
+                    self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS('Benchmark finished.'))
+
+    async def run_view(self, view, path, user, requests, concurrency):
+        handler = view.as_view()
+        if not asyncio.iscoroutinefunction(handler):
+            handler = sync_to_async(handler, thread_sensitive=True)
+        factory = APIRequestFactory()
+        slots = asyncio.Semaphore(concurrency)
+
+        async def call():
+            request = factory.get(path)
+            force_authenticate(request, user=user)
+            async with slots:
+                start = time.perf_counter()
+                response = await handler(request)
+                return (time.perf_counter() - start) * 1000, response.status_code
+
+        # Warm up caches (scope, ETag versions) so both modes measure the same path
+        await call()
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(requests)))
+        elapsed = time.perf_counter() - started
+        latencies = sorted(latency for latency, _ in results)
+        return latencies, elapsed, sum(1 for _, status_code in results if status_code != 200)
@@ -0,0 +1,138 @@
+import re
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+User = get_user_model()
+
+SEQUENTIAL_SCAN = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    # SQLite reports index scans as "SCAN <table> USING [COVERING] INDEX ..."
+    'sqlite': re.compile(r'\bSCAN (\w+)(?!\w| USING)'),
+}
+
+def get_hot_queries(sample):
+    """The filters and orderings the list views run, keyed by a label (page size 20 + 1 like KeysetPagination)."""
+    from classes.models import ClassComment, Experiment
+    from courses.models import CourseEnrollment
+    from notices.models import Notice, NoticeCompletion
+
+    scope = {'class_ids': sample['class_ids'], 'lab_ids': sample['lab_ids']}
+    return {
+        'user-info ?role=teacher': User.objects.filter(role='teacher').order_by('user_id')[:21],
+        'user-info ?role=student': User.objects.filter(role='student').order_by('user_id')[:21],
+        'notices ?notice_type&class_or_lab_id': Notice.objects.filter(notice_type='class', class_or_lab_id=sample['class_id']).order_by('id')[:21],
+        'notices ?active=true': Notice.objects.active().filter(notice_type='class', class_or_lab_id=sample['class_id']).order_by('id')[:21],
+        'notice-page (scope)': Notice.objects.active().in_scope(scope).order_by('id')[:21],
+        'class comments ?class_id': ClassComment.objects.filter(class_id=sample['class_id']).order_by('id')[:21],
+        'experiments ?class_id': Experiment.objects.filter(class_id=sample['class_id']).order_by('id')[:21],
+        'notice completions ?notice_id': NoticeCompletion.objects.filter(notice_id=sample['notice_id']).order_by('id')[:21],
+        'course enrollments ?course_id': CourseEnrollment.objects.filter(course_id=sample['course_id']).order_by('id')[:21],
+    }
+
+class Command(BaseCommand):
+    help = 'EXPLAIN (ANALYZE on PostgreSQL) the hot list queries against seeded data and flag sequential scans (the seeded rows are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20000, help='Number of seeded users, 1 in 50 is a teacher')
+        parser.add_argument('--classes', type=int, default=500, help='Number of seeded classes, each with a course')
+        parser.add_argument('--rows', type=int, default=50000, help='Number of seeded notices, comments, experiments, completions and enrollments each')
+        parser.add_argument('--prefix', type=str, default='98', help='user_id prefix of the seeded users')
+
+    def handle(self, *args, **kwargs):
+        if connection.vendor not in SEQUENTIAL_SCAN:
+            raise CommandError(f'Plans of the {connection.vendor} backend are not supported.')
+        if min(kwargs['users'], kwargs['classes'], kwargs['rows']) < 2:
+            raise CommandError('--users, --classes and --rows must be at least 2.')
+
+        flagged = []
+        with transaction.atomic():
+            sample = self.seed(kwargs['users'], kwargs['classes'], kwargs['rows'], kwargs['prefix'])
+            # Fresh statistics, the planner would otherwise assume the tables are still empty
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+            options = {'analyze': True} if connection.vendor == 'postgresql' else {}
+            for label, queryset in get_hot_queries(sample).items():
+                plan = queryset.explain(**options)
+                tables = sorted(set(SEQUENTIAL_SCAN[connection.vendor].findall(plan)))
+                if tables:
+                    flagged.append(label)
+                    self.stdout.write(self.style.WARNING(f'{label}: sequential scan on {", ".join(tables)}'))
+                else:
+                    self.stdout.write(f'{label}: no sequential scan')
+                if kwargs['verbosity'] > 1:
+                    self.stdout.write('\n'.join(f'    {line}' for line in plan.splitlines()))
+            transaction.set_rollback(True)
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'{len(flagged)} hot queries use sequential scans.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No hot query uses a sequential scan.'))
+
+    def seed(self, user_count, class_count, row_count, prefix):
+        """Bulk insert a realistic spread of rows, returns the ids the hot queries filter on."""
+        from classes.models import Class, ClassComment, Experiment
+        from courses.models import Course, CourseClass, CourseEnrollment
+        from notices.models import Notice, NoticeCompletion
+
+        if len(prefix) >= 10 or user_count >= 10 ** (10 - len(prefix)):
+            raise CommandError('Too many users for the user_id prefix.')
+        user_ids = [f'{prefix}{i:0{10 - len(prefix)}d}' for i in range(user_count)]
+        if User.objects.filter(user_id__in=user_ids[:1]).exists():
+            raise CommandError(f'Users with prefix {prefix} already exist, choose another --prefix.')
+        User.objects.bulk_create([
+            User(id=int(user_id), username=user_id, user_id=user_id, password='!', role='teacher' if i % 50 == 0 else 'student')
+            for i, user_id in enumerate(user_ids)
+        ], batch_size=1000)
+        teachers = user_ids[::50]
+        students = [user_id for i, user_id in enumerate(user_ids) if i % 50]
+
+        now = timezone.now()
+        classes = Class.objects.bulk_create([Class(name=f'Class {i}', start_time=now + timedelta(days=i % 120)) for i in range(class_count)], batch_size=1000)
+        class_ids = [class_instance.id for class_instance in classes]
+        courses = Course.objects.bulk_create([
+            Course(course_code=f'{i:08d}', course_sequence=prefix[:5], department=f'Department {i % 20}', name=f'Course {i}')
+            for i in range(class_count)
+        ], batch_size=1000)
+        CourseClass.objects.bulk_create([CourseClass(course=course, class_instance_id=class_id) for course, class_id in zip(courses, class_ids)], batch_size=1000)
+
+        notices = Notice.objects.bulk_create([
+            Notice(
+                notice_type='class' if i % 5 else 'lab',
+                class_or_lab_id=class_ids[i % class_count] if i % 5 else i % 50 + 1,
+                sender_id=teachers[i % len(teachers)],
+                # A quarter of the notices is still shown
+                post_time=now - timedelta(days=i % 400),
+                end_time=now - timedelta(days=i % 400) + timedelta(days=100),
+            )
+            for i in range(row_count)
+        ], batch_size=1000)
+        ClassComment.objects.bulk_create([
+            ClassComment(sender_id_id=students[i % len(students)], class_id_id=class_ids[i % class_count], content='Comment')
+            for i in range(row_count)
+        ], batch_size=1000)
+        Experiment.objects.bulk_create([
+            Experiment(title=f'Experiment {i}', estimated_time=1, class_id_id=class_ids[i % class_count])
+            for i in range(row_count)
+        ], batch_size=1000)
+        # Distinct (notice, user) and (student, course) pairs for the unique constraints
+        NoticeCompletion.objects.bulk_create([
+            NoticeCompletion(notice=notices[i % len(notices)], user_id=students[i // len(notices) % len(students)], completion_time=now)
+            for i in range(min(row_count, len(notices) * len(students)))
+        ], batch_size=1000)
+        CourseEnrollment.objects.bulk_create([
+            CourseEnrollment(student_id=students[i % len(students)], course=courses[i // len(students) % len(courses)])
+            for i in range(min(row_count, len(students) * len(courses)))
+        ], batch_size=1000)
+
+        return {
+            'class_id': class_ids[class_count // 2],
+            'class_ids': class_ids[:10],
+            'lab_ids': [1, 2],
+            'notice_id': notices[len(notices) // 2].id,
+            'course_id': courses[class_count // 2].id,
+        }
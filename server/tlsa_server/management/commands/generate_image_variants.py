@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from tlsa_server.images import IMAGE_FIELDS, generate_image_variants, variants_field
+
+class Command(BaseCommand):
+    help = 'Generate the missing thumbnail, medium and WebP variants of uploaded images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate the variants of every image, e.g. after IMAGE_VARIANTS changed')
+
+    def handle(self, *args, **kwargs):
+        total = 0
+        for model, field_name in IMAGE_FIELDS:
+            column = variants_field(field_name)
+            rows = model.objects.exclude(Q(**{f'{field_name}__isnull': True}) | Q(**{field_name: ''}))
+            generated = failed = 0
+            for pk, source, variants in rows.values_list('pk', field_name, column).iterator():
+                if not kwargs['all'] and (variants or {}).get('source') == source:
+                    continue
+                if generate_image_variants(model, pk, field_name, source) is None:
+                    failed += 1
+                else:
+                    generated += 1
+            total += generated
+            line = f'{model._meta.label}.{field_name}: {generated} generated'
+            if failed:
+                self.stdout.write(self.style.WARNING(f'{line}, {failed} unreadable or changed meanwhile'))
+            else:
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f'Generated variants of {total} images.'))
@@ -0,0 +1,80 @@
+import json
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from tlsa_server.views import LoginView
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Benchmark LoginView with a burst of concurrent logins and report p50/p99 latency (creates and deletes temporary users, use a development database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Number of temporary users logging in')
+        parser.add_argument('--concurrency', type=int, default=50, help='Number of logins in flight at once')
+        parser.add_argument('--ips', type=int, default=10, help='Number of distinct client IPs the logins come from')
+        parser.add_argument('--legacy-hasher', action='store_true', help='Store the users with PBKDF2 to include upgrade-on-login')
+        parser.add_argument('--prefix', type=str, default='99', help='user_id prefix of the temporary users')
+
+    def handle(self, *args, **kwargs):
+        user_count = kwargs['users']
+        prefix = kwargs['prefix']
+        if len(prefix) >= 10 or user_count >= 10 ** (10 - len(prefix)):
+            raise CommandError('Too many users for the user_id prefix.')
+
+        user_ids = [f'{prefix}{i:0{10 - len(prefix)}d}' for i in range(user_count)]
+        if User.objects.filter(user_id__in=user_ids).exists():
+            raise CommandError(f'Users with prefix {prefix} already exist, choose another --prefix.')
+
+        password = 'login-storm-password'
+        # One hash shared by every user keeps the setup fast, each login still verifies it
+        encoded = make_password(password, hasher='pbkdf2_sha256' if kwargs['legacy_hasher'] else 'default')
+        User.objects.bulk_create([
+            User(id=int(user_id), username=user_id, user_id=user_id, password=encoded, role='student')
+            for user_id in user_ids
+        ])
+
+        factory = RequestFactory()
+        view = LoginView.as_view()
+        ips = max(kwargs['ips'], 1)
+
+        def login(index):
+            request = factory.post(
+                '/api/v1/users/login/',
+                json.dumps({'user_id': user_ids[index], 'password': password}),
+                content_type='application/json',
+                REMOTE_ADDR=f'10.0.{index % ips // 250}.{index % ips % 250 + 1}',
+            )
+            start = time.perf_counter()
+            try:
+                response = view(request)
+            finally:
+                connection.close()
+            return time.perf_counter() - start, response.status_code
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=kwargs['concurrency']) as executor:
+                results = list(executor.map(login, range(user_count)))
+            elapsed = time.perf_counter() - started
+        finally:
+            User.objects.filter(user_id__in=user_ids).delete()
+
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        statuses = Counter(status_code for _, status_code in results)
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+
+        self.stdout.write(f'{user_count} logins, concurrency {kwargs["concurrency"]}, {elapsed:.2f}s ({user_count / elapsed:.1f} logins/s)')
+        self.stdout.write('Status codes: ' + ', '.join(f'{code}: {count}' for code, count in sorted(statuses.items())))
+        self.stdout.write(f'p50 {percentiles[49]:.1f} ms, p90 {percentiles[89]:.1f} ms, p99 {percentiles[98]:.1f} ms, max {latencies[-1]:.1f} ms')
+        if statuses.get(200) == user_count:
+            self.stdout.write(self.style.SUCCESS('All logins succeeded.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{user_count - statuses.get(200, 0)} logins did not succeed.'))
@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from tlsa_server.orphans import collect_orphans
+
+class Command(BaseCommand):
+    help = 'Delete the files in MEDIA_ROOT that no row refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report the orphaned files')
+        parser.add_argument('--min-age', type=int, default=3600, help='Skip files modified in the last MIN_AGE seconds (default 3600)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orphans checked and deleted together (default 500)')
+        parser.add_argument('--every', type=int, metavar='SECONDS', help='Keep running, collecting every SECONDS seconds')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            self.collect(kwargs['dry_run'], kwargs['min_age'], kwargs['batch_size'], kwargs['verbosity'])
+            if not kwargs['every']:
+                break
+            time.sleep(kwargs['every'])
+
+    def collect(self, dry_run, min_age, batch_size, verbosity):
+        count = size = 0
+        for name, file_size in collect_orphans(dry_run=dry_run, min_age=min_age, batch_size=batch_size):
+            count += 1
+            size += file_size
+            if verbosity > 1:
+                self.stdout.write(name)
+        action = 'Found' if dry_run else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{action} {count} orphaned files ({size} bytes).'))
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tlsa_server', '0002_tlsa_user_profile_picture_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'media_blob',
+            },
+        ),
+        migrations.AlterField(
+            model_name='tlsa_user',
+            name='profile_picture',
+            field=models.ImageField(blank=True, null=True, upload_to='profile_pics/'),
+        ),
+    ]
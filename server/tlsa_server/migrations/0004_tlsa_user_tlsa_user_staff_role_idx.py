@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tlsa_server', '0003_mediablob_alter_tlsa_user_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tlsa_user',
+            index=models.Index(condition=models.Q(('role', 'student'), _negated=True), fields=['role', 'user_id'], name='tlsa_user_staff_role_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tlsa_server', '0004_tlsa_user_tlsa_user_staff_role_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tlsa_user',
+            name='profile_picture_original_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=255),
+        ),
+    ]
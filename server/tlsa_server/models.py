@@ -1,9 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator, MinLengthValidator, MaxLengthValidator
 from django.db import models
-import os
-from datetime import datetime
-from django.utils.deconstruct import deconstructible
+# Referenced by migrations/0001_initial.py
+from .storage import DateTimeFileName  # noqa: F401
 
 # Custom validator to ensure the user_id contains only numbers
 numeric_validator = RegexValidator(
@@ -11,27 +10,6 @@ numeric_validator = RegexValidator(
     message="user_id must be exactly 10 digits and contain only numbers."
 )
 
-@deconstructible
-class DateTimeFileName(object):
-    def __init__(self, path):
-        self.path = path
-
-    def __call__(self, instance, filename):
-        # Get the file extension
-        ext = filename.split('.')[-1]
-        
-        # Get the original filename (without extension)
-        original_name = os.path.splitext(filename)[0]
-        
-        # Get the current datetime in a readable format
-        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Create the new filename
-        new_filename = f"{original_name}-{current_datetime}.{ext}"
-        
-        # Return the full path
-        return os.path.join(self.path, new_filename)
-
 class TLSA_User(AbstractUser):
     ROLE_CHOICES = (
         ('student', 'Student'),
@@ -42,7 +20,9 @@ class TLSA_User(AbstractUser):
     
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     phone_number = models.CharField(max_length=20, blank=True, null=True)
-    profile_picture = models.ImageField(upload_to=DateTimeFileName('profile_pics/'), blank=True, null=True)
+    profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)  # See tlsa_server.images
+    profile_picture_original_name = models.CharField(max_length=255, blank=True, default='', editable=False)  # Uploaded file name, see tlsa_server.storage
     real_name = models.CharField(max_length=150, blank=True, null=True)
     department = models.CharField(max_length=50, blank=True, null=True)
 
@@ -68,6 +48,28 @@ class TLSA_User(AbstractUser):
     class Meta:
         swappable = 'AUTH_USER_MODEL'
         db_table = 'tlsa_user'
+        indexes = [
+            # UserInfoView: role=... ORDER BY user_id. Students are most of the table and are listed
+            # through the user_id index, the other roles are few rows and get a small partial index
+            models.Index(fields=['role', 'user_id'], name='tlsa_user_staff_role_idx', condition=~models.Q(role='student')),
+        ]
+
+    def __str__(self):
+        return f"{self.real_name} ({self.user_id})"
+
+class MediaBlob(models.Model):
+    """
+    Number of references to a stored file, see tlsa_server.blobs.
+
+    ContentAddressedStorage stores identical uploads once, the file is deleted when its
+    last reference goes away.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'media_blob'
 
     def __str__(self):
-        return f"{self.real_name} ({self.user_id})"
\ No newline at end of file
+        return f"{self.name} ({self.refcount} references)"
@@ -0,0 +1,125 @@
+import os
+import time
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import models
+from django.db.models import Q
+from .images import IMAGE_FIELDS, variants_field
+from .models import MediaBlob
+
+def file_fields():
+    """(model, field name) of every FileField and ImageField of the installed apps."""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField)
+    ]
+
+def in_directory(field_name, directory):
+    """Q matching the names stored under a top directory of MEDIA_ROOT ('' for MEDIA_ROOT itself)."""
+    if directory:
+        return Q(**{f'{field_name}__startswith': f'{directory}/'})
+    return ~Q(**{f'{field_name}__contains': '/'})
+
+def referenced_names(directory):
+    """
+    Set of the names under `directory` some row refers to: file fields, image variants
+    and MediaBlob counts. Rows are streamed, only the names are kept.
+    """
+    names = set()
+    for model, field_name in file_fields():
+        rows = model.objects.filter(in_directory(field_name, directory))
+        names.update(rows.values_list(field_name, flat=True).iterator())
+    # Variants are stored next to their source image
+    for model, field_name in IMAGE_FIELDS:
+        rows = model.objects.filter(in_directory(field_name, directory))
+        for variants in rows.values_list(variants_field(field_name), flat=True).iterator():
+            names.update(name for key, name in (variants or {}).items() if key != 'source')
+    blobs = MediaBlob.objects.filter(in_directory('name', directory), refcount__gt=0)
+    names.update(blobs.values_list('name', flat=True).iterator())
+    return names
+
+def referenced_among(names):
+    """Subset of `names` some row refers to right now."""
+    found = set(MediaBlob.objects.filter(name__in=names, refcount__gt=0).values_list('name', flat=True))
+    for model, field_name in file_fields():
+        found.update(model.objects.filter(**{f'{field_name}__in': names}).values_list(field_name, flat=True))
+    for model, field_name in IMAGE_FIELDS:
+        column = variants_field(field_name)
+        for variant in settings.IMAGE_VARIANTS:
+            lookup = f'{column}__{variant}'
+            found.update(model.objects.filter(**{f'{lookup}__in': names}).values_list(lookup, flat=True))
+    return found
+
+def iter_files(path, name=''):
+    """Yield (name, DirEntry) of the files under `path`, listing one directory at a time."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            entry_name = f'{name}/{entry.name}' if name else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(entry.path, entry_name)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry_name, entry
+
+def find_orphans(min_age=3600):
+    """
+    Yield (name, size) of the files in MEDIA_ROOT no row refers to.
+
+    MEDIA_ROOT is walked one top directory at a time against the set of names referenced
+    under that directory, so memory grows with the rows of one directory, not with the
+    files. Files modified in the last `min_age` seconds may belong to a request still
+    running and are skipped, and so is UPLOAD_TEMP_DIR (see `manage.py expire_uploads`).
+    """
+    root = settings.MEDIA_ROOT
+    if not os.path.isdir(root):
+        return
+    skipped = {getattr(settings, 'UPLOAD_TEMP_DIR', None)}
+    cutoff = time.time() - min_age
+
+    directories = []
+    with os.scandir(root) as entries:
+        files = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in skipped:
+                    directories.append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                files.append((entry.name, entry))
+    for directory in [''] + sorted(directories):
+        entries = iter_files(os.path.join(root, directory), directory) if directory else files
+        referenced = None
+        for name, entry in entries:
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > cutoff:
+                continue
+            if referenced is None:
+                referenced = referenced_names(directory)
+            if name not in referenced:
+                yield name, stat.st_size
+
+def collect_orphans(dry_run=False, min_age=3600, batch_size=500):
+    """
+    Delete the files find_orphans() reports and yield their (name, size), nothing is deleted
+    with dry_run. Each batch is checked again right before deleting, a row may have taken
+    a file (e.g. an identical upload) since its directory was indexed.
+    """
+    batch = []
+
+    def flush():
+        referenced = referenced_among([name for name, _ in batch])
+        orphans = [(name, size) for name, size in batch if name not in referenced]
+        if not dry_run:
+            for name, _ in orphans:
+                default_storage.delete(name)
+            MediaBlob.objects.filter(name__in=[name for name, _ in orphans], refcount=0).delete()
+        batch.clear()
+        return orphans
+
+    for orphan in find_orphans(min_age):
+        batch.append(orphan)
+        if len(batch) >= batch_size:
+            yield from flush()
+    if batch:
+        yield from flush()
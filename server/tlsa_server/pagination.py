@@ -0,0 +1,146 @@
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+from rest_framework.response import Response
+from drf_spectacular.utils import OpenApiParameter
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination, pages are fetched with `WHERE <ordering> > <last seen value>`
+    so the cost of a page does not grow with its position in the table.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = 'id'
+
+class AsyncKeysetPagination(KeysetPagination):
+    """KeysetPagination for async views, the page is fetched with the async ORM."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Mirrors CursorPagination.paginate_queryset, only the fetch is awaited
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            order = self.ordering[0]
+            order_attr = order.lstrip('-')
+            if self.cursor.reverse != order.startswith('-'):
+                queryset = queryset.filter(**{order_attr + '__lt': current_position})
+            else:
+                queryset = queryset.filter(**{order_attr + '__gt': current_position})
+
+        # One extra row tells whether a following page exists
+        results = [obj async for obj in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        return self.page
+
+class AsyncPageNumberPaginationMixin:
+    """apaginate_queryset for PageNumberPagination subclasses, counts and fetches with the async ORM."""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # Paginator.count is a cached_property, filling it avoids the sync count query
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        return [obj async for obj in self.page.object_list]
+
+KEYSET_PAGINATION_PARAMETERS = [
+    OpenApiParameter(
+        name='cursor',
+        type=str,
+        location=OpenApiParameter.QUERY,
+        description='Opaque cursor taken from the `next` or `previous` link of a previous page',
+        required=False,
+    ),
+    OpenApiParameter(
+        name='page_size',
+        type=int,
+        location=OpenApiParameter.QUERY,
+        description='Number of results per page (max 100)',
+        required=False,
+    ),
+    OpenApiParameter(
+        name='legacy',
+        type=bool,
+        location=OpenApiParameter.QUERY,
+        description='Return the full unpaginated list as a plain array',
+        required=False,
+    ),
+]
+
+class KeysetPaginationMixin:
+    """
+    Keyset pagination for APIView GET handlers.
+
+    `pagination_ordering` must be unique and unchanging, e.g. the primary key.
+    Clients that still expect a plain array can pass `legacy=true`.
+    """
+    pagination_ordering = 'id'
+
+    def paginated_response(self, queryset, serializer_class, **serializer_kwargs):
+        legacy = self.request.query_params.get('legacy')
+        if legacy and legacy.lower() == "true":
+            serializer = serializer_class(queryset, many=True, **serializer_kwargs)
+            return Response(serializer.data)
+
+        paginator = KeysetPagination()
+        paginator.ordering = self.pagination_ordering
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(page, many=True, **serializer_kwargs)
+        return paginator.get_paginated_response(serializer.data)
+
+    async def apaginated_response(self, queryset, serializer_class, **serializer_kwargs):
+        """paginated_response for async handlers, related rows must be select/prefetch_related."""
+        legacy = self.request.query_params.get('legacy')
+        if legacy and legacy.lower() == "true":
+            rows = [obj async for obj in queryset]
+            return Response(serializer_class(rows, many=True, **serializer_kwargs).data)
+
+        paginator = AsyncKeysetPagination()
+        paginator.ordering = self.pagination_ordering
+        page = await paginator.apaginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(page, many=True, **serializer_kwargs)
+        return paginator.get_paginated_response(serializer.data)
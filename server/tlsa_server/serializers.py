@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from .images import ImageVariantSerializerMixin
 from .models import TLSA_User, numeric_validator
 from django.contrib.auth.hashers import make_password
 
-class TLSAUserSerializer(serializers.ModelSerializer):
+class TLSAUserSerializer(ImageVariantSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = TLSA_User
         fields = ['user_id', 'email', 'role', 'phone_number', 'profile_picture', 'real_name', 'department']
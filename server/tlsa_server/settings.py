@@ -52,7 +52,10 @@ INSTALLED_APPS = [
     'labs',
     'courses',
     'classes',
-    'notices'
+    'notices',
+    'search',
+    'uploads',
+    'downloads'
 
 ]
 
@@ -103,6 +106,21 @@ WSGI_APPLICATION = 'tlsa_server.wsgi.application'
 from .postgres_settings import DATABASES
 
 
+# Password hashing
+# New hashes use the first hasher, older PBKDF2 hashes are upgraded when their user logs in.
+# Argon2 is preferred when argon2-cffi is installed (pip install argon2-cffi), scrypt otherwise.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+try:
+    import argon2
+    PASSWORD_HASHERS.insert(0, 'django.contrib.auth.hashers.Argon2PasswordHasher')
+except ImportError:
+    pass
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -150,10 +168,129 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tlsa_server.authentication.TokenClaimsAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Access tokens carry user_id and role so requests are authenticated without loading the user
+SIMPLE_JWT = {
+    'USER_ID_FIELD': 'user_id',
+}
+
 MEDIA_URL = 'http://localhost:5000/media/'
-MEDIA_ROOT = os.path.join(os.path.dirname(BASE_DIR), 'nginx', 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(os.path.dirname(BASE_DIR), 'nginx', 'media')
+
+# Uploads are named by the SHA-256 of their content and stored once (see tlsa_server.storage),
+# tlsa_server.blobs deletes a file when no row refers to it anymore
+STORAGES = {
+    'default': {
+        'BACKEND': 'tlsa_server.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# Resized copies of uploaded images (see tlsa_server.images), returned for ?image_size=<name>.
+# Images are fitted inside `size` and never enlarged.
+IMAGE_VARIANTS = {
+    'thumbnail': {'size': (200, 200), 'format': 'JPEG', 'quality': 80},
+    'medium': {'size': (800, 800), 'format': 'JPEG', 'quality': 85},
+    'webp': {'size': (1600, 1600), 'format': 'WEBP', 'quality': 80},
+}
+# Background threads generating the variants per process, 0 generates them inline on commit
+IMAGE_VARIANT_WORKERS = 2
+
+# Chunked uploads (see the uploads app): partial files are written to MEDIA_ROOT/UPLOAD_TEMP_DIR,
+# keep UPLOAD_CHUNK_MAX_SIZE within client_max_body_size of /api/v1/uploads/ in nginx.conf.
+# Unfinished uploads untouched for UPLOAD_SESSION_MAX_AGE seconds are removed by `manage.py expire_uploads`.
+UPLOAD_TEMP_DIR = 'uploads_partial'
+UPLOAD_CHUNK_MAX_SIZE = 8 * 1024 * 1024
+UPLOAD_MAX_SIZE = 4 * 1024 ** 3
+UPLOAD_SESSION_MAX_AGE = 24 * 3600
+
+# Internal nginx location serving MEDIA_ROOT to /api/v1/downloads/ through X-Accel-Redirect (see nginx.conf).
+# None streams the files through Django instead, e.g. when running without nginx in front.
+MEDIA_X_ACCEL_REDIRECT = '/protected-media/'
+
+# Make a cache_settings.py to share the cache between workers, see cache_settings_example.py
+# REDIS_URL uses a Redis-compatible server (requires the redis package), CACHE_DIR a file based cache.
+# Without either every worker process keeps its own local memory cache.
+try:
+    from . import cache_settings
+except ImportError:
+    cache_settings = None
+
+if getattr(cache_settings, 'REDIS_URL', None):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': cache_settings.REDIS_URL,
+            'KEY_PREFIX': 'tlsa',
+        }
+    }
+elif getattr(cache_settings, 'CACHE_DIR', None):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cache_settings.CACHE_DIR,
+            'KEY_PREFIX': 'tlsa',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tlsa',
+        }
+    }
+
+# Whether every worker process sees the same cache. The token deny-list (tlsa_server.authentication)
+# lives in the cache, without a shared one requests load the user from the database instead of
+# trusting the role in the token, so role and is_active changes apply on every worker. The table
+# version counters behind ETags and cached listings (tlsa_server.conditional) are in the cache too,
+# without a shared one those are turned off.
+SHARED_CACHE = bool(getattr(cache_settings, 'REDIS_URL', None) or getattr(cache_settings, 'CACHE_DIR', None))
+
+# Seconds entries of each cache namespace stay cached (see tlsa_server.cache)
+CACHE_TIMEOUTS = {
+    'scope': 300,
+    'users': 300,
+    'labs': 300,
+    'courses': 300,
+    'schema': 3600,
+}
+
+# Count hits and misses per namespace, reported by the cache-stats endpoint
+CACHE_STATS = True
+
+# Login pipeline (see tlsa_server.login): password hashing threads, logins allowed to wait for one,
+# seconds a login may wait, and concurrent login attempts allowed per user ID and per client IP
+LOGIN_HASH_WORKERS = 4
+LOGIN_HASH_QUEUE = 64
+LOGIN_HASH_TIMEOUT = 10
+LOGIN_CONCURRENCY_PER_USER = 2
+LOGIN_CONCURRENCY_PER_IP = 50
+# request.META key holding the client IP set by the reverse proxy, None uses REMOTE_ADDR
+LOGIN_CLIENT_IP_HEADER = None
+
+# Notice push (see notices.push): broker delivering new notices to /api/v1/notices/stream.
+# InProcessBroker only reaches clients connected to the same worker process, RedisBroker
+# reaches every worker and is used when cache_settings.py sets REDIS_URL.
+NOTICE_PUSH_REDIS_URL = getattr(cache_settings, 'REDIS_URL', None)
+NOTICE_PUSH_BROKER = 'notices.push.RedisBroker' if NOTICE_PUSH_REDIS_URL else 'notices.push.InProcessBroker'
+# Seconds between keep-alive comments and before a stream is closed for the client to reconnect
+NOTICE_STREAM_HEARTBEAT = 15
+NOTICE_STREAM_MAX_AGE = 300
+# Open streams per worker process, more get 503. Each sync stream holds a worker thread for up to
+# NOTICE_STREAM_MAX_AGE seconds, keep this well below the gunicorn --threads of a worker
+NOTICE_STREAM_MAX_CONNECTIONS = 4
+
+# Seconds the notice tag counts of a worker may lag behind writes on other workers, only used
+# without a shared cache (see notices.tags)
+NOTICE_TAG_FACETS_RELOAD = 60
+
+# Route the hot read endpoints (labs, classes, notice page, user info) to their async views.
+# Turn on when serving through ASGI, e.g. `gunicorn -k uvicorn.workers.UvicornWorker tlsa_server.asgi:application`
+ASYNC_VIEWS = False
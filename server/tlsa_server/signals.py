@@ -0,0 +1,36 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .authentication import revoke_user_tokens
+from .blobs import track_blobs
+from .images import track_image_variants
+from .models import TLSA_User
+from .storage import track_original_names
+
+# Access tokens carry the role, changing it (or the password) revokes the tokens issued so far.
+TOKEN_FIELDS = ['role', 'password', 'is_active']
+
+# Resized copies, reference counts and uploaded names of profile pictures
+track_image_variants(TLSA_User, 'profile_picture')
+track_blobs(TLSA_User, 'profile_picture')
+track_original_names(TLSA_User, 'profile_picture')
+
+@receiver(pre_save, sender=TLSA_User)
+def remember_token_fields(sender, instance, update_fields=None, **kwargs):
+    instance._previous_token_fields = None
+    if instance._state.adding or getattr(instance, '_password_rehash', False) or (update_fields and not set(update_fields) & set(TOKEN_FIELDS)):
+        return
+    instance._previous_token_fields = TLSA_User.objects.filter(pk=instance.pk).values_list(*TOKEN_FIELDS).first()
+
+@receiver(post_save, sender=TLSA_User)
+def revoke_tokens_on_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_token_fields', None)
+    if getattr(instance, '_password_rehash', False):
+        # Login replaced the hash of the same password (tlsa_server.login), tokens stay valid
+        instance._password_rehash = False
+        return
+    if previous and previous != tuple(getattr(instance, field) for field in TOKEN_FIELDS):
+        revoke_user_tokens(instance.user_id)
+
+@receiver(post_delete, sender=TLSA_User)
+def revoke_tokens_on_delete(sender, instance, **kwargs):
+    revoke_user_tokens(instance.user_id)
@@ -0,0 +1,92 @@
+import hashlib
+import os
+from datetime import datetime
+from django.core.files.storage import FileSystemStorage
+from django.db.models.signals import pre_save
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+@deconstructible
+class DateTimeFileName(object):
+    """upload_to of the file fields before ContentAddressedStorage, the initial migrations refer to it through each app's models."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, instance, filename):
+        # Get the file extension
+        ext = filename.split('.')[-1]
+
+        # Get the original filename (without extension)
+        original_name = os.path.splitext(filename)[0]
+
+        # Get the current datetime in a readable format
+        current_datetime = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Create the new filename
+        new_filename = f"{original_name}-{current_datetime}.{ext}"
+
+        # Return the full path
+        return os.path.join(self.path, new_filename)
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage naming files by the SHA-256 of their content.
+
+    A file is stored as `<top directory of upload_to>/<2 first hex digits>/<sha256>.<ext>`,
+    saving content already stored returns the existing name instead of writing a copy.
+    Every save takes a MediaBlob reference for the caller (tlsa_server.blobs), stored files
+    are deleted through release_blobs() once no row refers to them, never directly.
+    """
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        # chunks() reads from the start and never holds more than one chunk in memory
+        for chunk in content.chunks():
+            digest.update(chunk)
+        hexdigest = digest.hexdigest()
+        directory = name.replace('\\', '/').split('/')[0] if '/' in name else ''
+        filename = f'{hexdigest[:2]}/{hexdigest}{os.path.splitext(name)[1].lower()}'
+        return f'{directory}/{filename}' if directory else filename
+
+    def _save(self, name, content):
+        from .blobs import acquire_blobs
+
+        name = self.content_name(name, content)
+        with transaction.atomic():
+            # The reference is taken (and its row locked) before looking at the file, so
+            # collect_blobs() cannot delete a file this save is about to reuse
+            acquire_blobs([name])
+            if self.exists(name):
+                # A fresh modification time keeps `manage.py media_gc` off a file reused right now
+                os.utime(self.path(name))
+                return name
+            return super()._save(name, content)
+
+def original_name_field(field_name):
+    """Name of the CharField keeping the uploaded file name of a file field, e.g. file_original_name."""
+    return f'{field_name}_original_name'
+
+def original_name(file):
+    """File name of an upload without its directory, as the client sent it."""
+    return os.path.basename(file.name.replace('\\', '/'))[:255]
+
+def track_original_names(model, *field_names):
+    """
+    Keep the uploaded file name of the given file fields, stored names are content hashes.
+
+    Each field needs a `<field>_original_name` CharField next to it. bulk_create() sends no
+    signals, callers set the names themselves.
+    """
+    def remember_names(sender, instance, update_fields=None, **kwargs):
+        for field_name in field_names:
+            file = getattr(instance, field_name)
+            if update_fields is not None and field_name not in update_fields:
+                continue
+            if not file:
+                setattr(instance, original_name_field(field_name), '')
+            elif not file._committed:
+                # Not saved to storage yet, the name is still the client's
+                setattr(instance, original_name_field(field_name), original_name(file))
+
+    pre_save.connect(remember_names, sender=model, weak=False, dispatch_uid=f'original_names:{model._meta.label_lower}')
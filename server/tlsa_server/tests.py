@@ -0,0 +1,505 @@
+import os
+import shutil
+import tempfile
+import threading
+from unittest import mock
+from PIL import Image
+from django.core.cache import cache
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from io import BytesIO, StringIO
+from django.urls import reverse
+from asgiref.sync import sync_to_async
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+from .authentication import ClaimsUser, TLSARefreshToken, revoke_user_tokens
+from classes.models import Class, Experiment, ExperimentFile
+from labs.models import Lab
+from notices.models import NoticeContent
+from .cache import namespace_cache, get_cache_stats
+from .images import run_in_background
+from .orphans import collect_orphans
+from .blobs import collect_blobs
+from .models import MediaBlob, TLSA_User
+from .views import AsyncUserInfoView, UserInfoView
+
+class NamespaceCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_get_set_and_clear(self):
+        labs = namespace_cache('labs')
+        self.assertIsNone(labs.get('list'))
+        labs.set('list', [1, 2])
+        self.assertEqual(labs.get('list'), [1, 2])
+        namespace_cache('courses').clear()
+        self.assertEqual(labs.get('list'), [1, 2])
+        labs.clear()
+        self.assertIsNone(labs.get('list'))
+
+        stats = get_cache_stats()
+        self.assertEqual((stats['labs']['hits'], stats['labs']['misses']), (2, 2))
+        self.assertEqual(stats['labs']['hit_ratio'], 0.5)
+        self.assertIsNone(stats['courses']['hit_ratio'])
+
+    def test_unknown_namespace(self):
+        with self.assertRaises(ValueError):
+            namespace_cache('unknown')
+
+    @override_settings(CACHE_STATS=False)
+    def test_stats_disabled(self):
+        namespace_cache('labs').get('list')
+        self.assertEqual(get_cache_stats()['labs']['misses'], 0)
+
+class CacheStatsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.admin = TLSA_User.objects.create_user(username='2019000001', user_id='2019000001', password='password', role='teachingAffairs')
+        self.student = TLSA_User.objects.create_user(username='2022000001', user_id='2022000001', password='password', role='student')
+
+    def test_schema_is_cached(self):
+        first = self.client.get(reverse('schema'))
+        self.assertEqual(first.status_code, 200)
+        second = self.client.get(reverse('schema'))
+        self.assertEqual(second.content, first.content)
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('cache-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['namespaces']['schema']['hits'], 1)
+        self.assertEqual(response.data['namespaces']['schema']['misses'], 1)
+
+        response = self.client.delete(reverse('cache-stats') + '?namespace=schema')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_cache_stats()['schema']['hits'], 0)
+        self.assertIsNone(namespace_cache('schema').get('unknown'))
+
+    def test_requires_teaching_affairs(self):
+        self.client.force_authenticate(user=self.student)
+        self.assertEqual(self.client.get(reverse('cache-stats')).status_code, 403)
+
+@override_settings(SHARED_CACHE=True)
+class TokenClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher', real_name='Teacher')
+
+    def login(self):
+        response = self.client.post(reverse('login'), {'user_id': '2021000001', 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_claims_authenticate_without_user_query(self):
+        tokens = self.login()
+        access = AccessToken(tokens['access'])
+        self.assertEqual((access['user_id'], access['role']), ('2021000001', 'teacher'))
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('verify'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_claims_user_loads_row_on_demand(self):
+        user = ClaimsUser(TLSARefreshToken.for_user(self.teacher).access_token)
+        with self.assertNumQueries(0):
+            self.assertEqual((user.user_id, user.role, user.is_authenticated), ('2021000001', 'teacher', True))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.real_name, 'Teacher')
+            self.assertEqual(user.department, None)
+
+    def test_refresh_keeps_claims(self):
+        tokens = self.login()
+        response = self.client.post(reverse('refresh-token'), {'refresh': tokens['refresh']})
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'teacher')
+
+    def test_refresh_reads_role_from_database(self):
+        tokens = self.login()
+        # A change the deny-list of this worker never heard of
+        TLSA_User.objects.filter(pk=self.teacher.pk).update(role='manager')
+        response = self.client.post(reverse('refresh-token'), {'refresh': tokens['refresh']})
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'manager')
+
+        TLSA_User.objects.filter(pk=self.teacher.pk).update(is_active=False)
+        response = self.client.post(reverse('refresh-token'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_unshared_cache_loads_user(self):
+        tokens = self.login()
+        TLSA_User.objects.filter(pk=self.teacher.pk).update(is_active=False)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get(reverse('verify')).status_code, 401)
+
+    def test_role_change_revokes_tokens(self):
+        tokens = self.login()
+        self.teacher.role = 'manager'
+        self.teacher.save()
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get(reverse('verify')).status_code, 401)
+        response = self.client.post(reverse('refresh-token'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_login_right_after_revocation(self):
+        tokens = self.login()
+        # Revoked a microsecond after the first login, the new login is usually in the same second
+        issued_at = AccessToken(tokens['access'])['issued_at']
+        with mock.patch('tlsa_server.authentication.time.time', return_value=issued_at + 1e-6):
+            revoke_user_tokens(self.teacher.user_id)
+        fresh = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {fresh['access']}")
+        self.assertEqual(self.client.get(reverse('verify')).status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get(reverse('verify')).status_code, 401)
+
+    def test_logout_revokes_tokens(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        response = self.client.post(reverse('logout'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.get(reverse('verify')).status_code, 401)
+        response = self.client.post(reverse('refresh-token'), {'refresh': tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+class LoginPipelineTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.student = TLSA_User.objects.create(user_id='2022000001', role='student', password=make_password('password', hasher='pbkdf2_sha256'))
+
+    def login(self, password='password'):
+        return self.client.post(reverse('login'), {'user_id': '2022000001', 'password': password})
+
+    def test_login_upgrades_legacy_hash(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.student.refresh_from_db()
+        self.assertTrue(self.student.password.startswith('scrypt$'))
+
+        # The upgrade is not a password change, the new tokens stay valid
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get(reverse('verify')).status_code, 200)
+
+    def test_invalid_credentials(self):
+        self.assertEqual(self.login('wrong').status_code, 401)
+        response = self.client.post(reverse('login'), {'user_id': '2022999999', 'password': 'password'})
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(LOGIN_CONCURRENCY_PER_USER=1)
+    def test_concurrency_governor(self):
+        # Another login for the same user is still in progress
+        cache.set('login:user:2022000001', 1)
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(cache.get('login:user:2022000001'), 1)
+
+        cache.delete('login:user:2022000001')
+        self.assertEqual(self.login().status_code, 200)
+
+class LoginStormCommandTests(TransactionTestCase):
+    def test_reports_percentiles(self):
+        out = StringIO()
+        call_command('login_storm', '--users', '4', '--concurrency', '2', '--legacy-hasher', stdout=out)
+        output = out.getvalue()
+        self.assertIn('p50', output)
+        self.assertIn('p99', output)
+        self.assertIn('All logins succeeded.', output)
+        self.assertFalse(TLSA_User.objects.filter(user_id__startswith='99').exists())
+
+class BenchmarkViewsCommandTests(TestCase):
+    def test_reports_both_modes(self):
+        TLSA_User.objects.create_user(username='2022000000', user_id='2022000000', password='password', role='student')
+        out = StringIO()
+        call_command('benchmark_views', '--user-id', '2022000000', '--endpoint', 'lab', '--endpoint', 'notice-page', '--requests', '4', '--concurrency', '2', stdout=out)
+        output = out.getvalue()
+        self.assertEqual(output.count('p99'), 4)
+        self.assertNotIn('non-200', output)
+        self.assertIn('Benchmark finished.', output)
+
+class AsyncUserInfoViewTests(TestCase):
+    def setUp(self):
+        self.users = [
+            TLSA_User.objects.create_user(username=f'202200000{i}', user_id=f'202200000{i}', password='password', role='student')
+            for i in range(3)
+        ]
+
+    def get(self, view, params):
+        request = APIRequestFactory().get('/api/v1/users/user-info', params)
+        force_authenticate(request, user=self.users[0])
+        return view.as_view()(request)
+
+    async def test_matches_sync_view(self):
+        for params in [{}, {'page_size': 2}, {'user_id': '2022000001'}]:
+            response = await self.get(AsyncUserInfoView, params)
+            expected = await sync_to_async(self.get)(UserInfoView, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, expected.data)
+
+@override_settings(SHARED_CACHE=True)
+class UserInfoCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.student = TLSA_User.objects.create_user(username='2022000001', user_id='2022000001', password='password', role='student', real_name='Student')
+
+    def test_user_list_is_cached_per_role(self):
+        url = reverse('user-info')
+        self.client.force_authenticate(self.student)
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data, first.data)
+        self.assertEqual(get_cache_stats()['users']['hits'], 1)
+
+        # Another role does not share the entry
+        self.client.force_authenticate(self.teacher)
+        self.client.get(url)
+        self.assertEqual(get_cache_stats()['users']['misses'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.real_name = 'Renamed'
+            self.student.save()
+        response = self.client.get(url, {'user_id': '2022000001'})
+        self.assertEqual(response.data['results'][0]['real_name'], 'Renamed')
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][1]['real_name'], 'Renamed')
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        image_settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WORKERS=0)
+        image_settings.enable()
+        self.addCleanup(image_settings.disable)
+
+        self.client = APIClient()
+        self.client.force_authenticate(TLSA_User.objects.create_user(username='2022000000', user_id='2022000000', password='password', role='manager'))
+
+    def image(self, name='bench.png', size=(2000, 1000)):
+        buffer = BytesIO()
+        Image.new('RGBA', size, (255, 0, 0, 128)).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def create_lab(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Lab.objects.create(name='Chemistry', location='B101', lab_image=self.image())
+
+    def test_variants_generated_on_save(self):
+        lab = self.create_lab()
+        lab.refresh_from_db()
+        variants = lab.lab_image_variants
+        self.assertEqual(variants['source'], lab.lab_image.name)
+        self.assertEqual(lab.map_image_variants, {})
+
+        expected = {'thumbnail': ('JPEG', (200, 100)), 'medium': ('JPEG', (800, 400)), 'webp': ('WEBP', (1600, 800))}
+        for name, (image_format, size) in expected.items():
+            with Image.open(os.path.join(self.media_root, variants[name])) as image:
+                self.assertEqual((image.format, image.size), (image_format, size))
+
+    def test_image_size_parameter(self):
+        lab = self.create_lab()
+        lab.refresh_from_db()
+        url = reverse('lab')
+
+        original = self.client.get(url).data['results'][0]['lab_image']
+        self.assertTrue(original.endswith(lab.lab_image.name))
+        thumbnail = self.client.get(url, {'image_size': 'thumbnail'}).data['results'][0]['lab_image']
+        self.assertTrue(thumbnail.endswith(lab.lab_image_variants['thumbnail']))
+        self.assertIsNone(self.client.get(url, {'image_size': 'webp'}).data['results'][0]['map_image'])
+        self.assertEqual(self.client.get(url, {'image_size': 'huge'}).status_code, 400)
+
+    def test_replaced_image_drops_old_variants(self):
+        lab = self.create_lab()
+        lab.refresh_from_db()
+        old_variants = lab.lab_image_variants
+
+        lab.lab_image = self.image('bench2.png', (300, 300))
+        with self.captureOnCommitCallbacks(execute=True):
+            lab.save()
+        lab.refresh_from_db()
+        self.assertEqual(lab.lab_image_variants['source'], lab.lab_image.name)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, old_variants['thumbnail'])))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, lab.lab_image_variants['thumbnail'])))
+
+    def test_command_generates_missing_variants(self):
+        lab = self.create_lab()
+        Lab.objects.filter(pk=lab.pk).update(lab_image_variants={})
+
+        out = StringIO()
+        call_command('generate_image_variants', stdout=out)
+        self.assertIn('labs.Lab.lab_image: 1 generated', out.getvalue())
+        lab.refresh_from_db()
+        self.assertEqual(lab.lab_image_variants['source'], lab.lab_image.name)
+
+    def test_background_worker(self):
+        threads = []
+        with override_settings(IMAGE_VARIANT_WORKERS=1):
+            run_in_background(lambda: threads.append(threading.current_thread().name)).result(timeout=5)
+        self.assertTrue(threads[0].startswith('image-variants'))
+
+class MediaBlobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WORKERS=0)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        class_instance = Class.objects.create(name='Titration', start_time='2024-10-01T08:00:00Z')
+        self.experiment = Experiment.objects.create(title='Titration', estimated_time=1, class_id=class_instance)
+
+    def attach(self, name='safety.pdf', data=b'%PDF-1.4 safety'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ExperimentFile.objects.create(experiment=self.experiment, file=SimpleUploadedFile(name, data))
+
+    def delete(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.delete()
+
+    def test_identical_files_are_stored_once(self):
+        first = self.attach()
+        second = self.attach('safety (1).pdf')
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertTrue(first.file.name.startswith('experiment_files/'))
+        self.assertEqual(len(os.listdir(os.path.dirname(first.file.path))), 1)
+        self.assertEqual(MediaBlob.objects.get(name=first.file.name).refcount, 2)
+
+        self.delete(first)
+        self.assertTrue(os.path.exists(second.file.path))
+        self.assertEqual(MediaBlob.objects.get(name=second.file.name).refcount, 1)
+        self.delete(second)
+        self.assertFalse(os.path.exists(second.file.path))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_replaced_file_is_collected(self):
+        experiment_file = self.attach()
+        old_path = experiment_file.file.path
+        experiment_file.file = SimpleUploadedFile('safety.pdf', b'%PDF-1.4 revised')
+        with self.captureOnCommitCallbacks(execute=True):
+            experiment_file.save()
+        self.assertFalse(os.path.exists(old_path))
+        self.assertEqual(list(MediaBlob.objects.values_list('name', 'refcount')), [(experiment_file.file.name, 1)])
+
+    def test_notice_content_shares_nothing_across_directories(self):
+        experiment_file = self.attach()
+        with self.captureOnCommitCallbacks(execute=True):
+            content = NoticeContent.objects.create(content_type='file', file_content=SimpleUploadedFile('safety.pdf', b'%PDF-1.4 safety'))
+        self.assertNotEqual(content.file_content.name, experiment_file.file.name)
+        self.delete(content)
+        self.assertFalse(os.path.exists(content.file_content.path))
+        self.assertTrue(os.path.exists(experiment_file.file.path))
+
+    def test_storage_save_takes_reference_before_the_row_exists(self):
+        name = default_storage.save('experiment_files/safety.pdf', ContentFile(b'%PDF-1.4 safety'))
+        self.assertEqual(MediaBlob.objects.get(name=name).refcount, 1)
+        # A collection running before the row is saved leaves the file alone
+        self.assertEqual(collect_blobs([name]), 0)
+        self.assertTrue(default_storage.exists(name))
+
+        MediaBlob.objects.filter(name=name).update(refcount=0)
+        self.assertEqual(collect_blobs([name]), 1)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_reupload_of_same_content_keeps_one_reference(self):
+        experiment_file = self.attach()
+        experiment_file.file = SimpleUploadedFile('safety.pdf', b'%PDF-1.4 safety')
+        with self.captureOnCommitCallbacks(execute=True):
+            experiment_file.save()
+        self.assertEqual(MediaBlob.objects.get(name=experiment_file.file.name).refcount, 1)
+        self.assertTrue(os.path.exists(experiment_file.file.path))
+
+    def test_legacy_file_without_blob_row(self):
+        experiment_file = self.attach()
+        MediaBlob.objects.all().delete()
+        self.delete(experiment_file)
+        self.assertFalse(os.path.exists(experiment_file.file.path))
+
+class MediaGarbageCollectorTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WORKERS=0)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300), 'red').save(buffer, format='PNG')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lab = Lab.objects.create(name='Chemistry', location='B101', lab_image=SimpleUploadedFile('bench.png', buffer.getvalue()))
+            self.content = NoticeContent.objects.create(content_type='file', file_content=SimpleUploadedFile('rules.txt', b'Wear goggles.'))
+        self.lab.refresh_from_db()
+
+        self.orphans = [self.write('notice_files/ab/stray.txt'), self.write('lab_images/bench-20241101_120000.png'), self.write('old.txt')]
+        self.partial = self.write('uploads_partial/upload.part')
+        for name in os.listdir(self.media_root):
+            self.age(name)
+
+    def write(self, name):
+        path = os.path.join(self.media_root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(b'orphan')
+        return name
+
+    def age(self, name):
+        # Backdate every file below `name` past --min-age
+        path = os.path.join(self.media_root, name)
+        paths = [os.path.join(directory, file) for directory, _, files in os.walk(path) for file in files] if os.path.isdir(path) else [path]
+        for path in paths:
+            os.utime(path, (0, 0))
+
+    def stored(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, file), self.media_root).replace(os.sep, '/')
+            for directory, _, files in os.walk(self.media_root) for file in files
+        )
+
+    def test_dry_run_reports_without_deleting(self):
+        before = self.stored()
+        out = StringIO()
+        call_command('media_gc', '--dry-run', verbosity=2, stdout=out)
+        self.assertEqual(sorted(line for line in out.getvalue().splitlines() if not line.startswith('Found')), sorted(self.orphans))
+        self.assertIn('Found 3 orphaned files (18 bytes).', out.getvalue())
+        self.assertEqual(self.stored(), before)
+
+    def test_deletes_only_orphans(self):
+        out = StringIO()
+        call_command('media_gc', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 3 orphaned files', out.getvalue())
+        kept = self.stored()
+        for name in self.orphans:
+            self.assertNotIn(name, kept)
+        self.assertIn(self.partial, kept)
+        self.assertIn(self.content.file_content.name, kept)
+        self.assertIn(self.lab.lab_image.name, kept)
+        self.assertIn(self.lab.lab_image_variants['thumbnail'], kept)
+
+    def test_recent_and_reused_files_are_kept(self):
+        recent = self.write('notice_files/recent.txt')
+        self.assertNotIn(recent, [name for name, _ in collect_orphans(dry_run=True)])
+
+        # A row taking a file after its directory was walked keeps it
+        NoticeContent.objects.create(content_type='file', file_content=self.orphans[0])
+        stale = [(name, 6) for name in self.orphans]
+        with mock.patch('tlsa_server.orphans.find_orphans', return_value=stale):
+            self.assertEqual([name for name, _ in collect_orphans()], self.orphans[1:])
+        self.assertIn(self.orphans[0], self.stored())
+
+class ExplainHotQueriesCommandTests(TestCase):
+    def test_reports_plans_and_rolls_back(self):
+        out = StringIO()
+        call_command('explain_hot_queries', '--users', '200', '--classes', '20', '--rows', '500', verbosity=2, stdout=out)
+        output = out.getvalue()
+        self.assertIn('user-info ?role=teacher: no sequential scan', output)
+        self.assertIn('class comments ?class_id: no sequential scan', output)
+        self.assertIn('notice-page (scope)', output)
+        self.assertFalse(TLSA_User.objects.exists())
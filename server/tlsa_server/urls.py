@@ -17,19 +17,23 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from drf_spectacular.views import SpectacularSwaggerView, SpectacularRedocView
 from .views import (RegisterView,
                     RegisterStaffView,
                     LoginView, 
                     UserInfoView, 
+                    AsyncUserInfoView,
                     ValidateTokenView, 
                     RefreshTokenView, 
-                    VerifyView)
+                    VerifyView,
+                    LogoutView,
+                    CachedSpectacularAPIView,
+                    CacheStatsView)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
 
-    path('api/v1/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/v1/schema/', CachedSpectacularAPIView.as_view(), name='schema'),
     path('api/v1/docs/swagger/', SpectacularSwaggerView.as_view(), name='swagger-ui'),
     path('api/v1/docs/redoc/', SpectacularRedocView.as_view(), name='redoc-ui'),
     
@@ -37,16 +41,21 @@ urlpatterns = [
     path('api/v1/users/register/', RegisterView.as_view(), name='register'),
     path('api/v1/users/register-staff', RegisterStaffView.as_view(), name='register-staff'),
     path('api/v1/users/login/', LoginView.as_view(), name='login'),
-    path('api/v1/users/user-info', UserInfoView.as_view(), name='user-info'),
+    path('api/v1/users/logout/', LogoutView.as_view(), name='logout'),
+    path('api/v1/users/user-info', (AsyncUserInfoView if settings.ASYNC_VIEWS else UserInfoView).as_view(), name='user-info'),
     path('api/v1/token/validate/', ValidateTokenView.as_view(), name='validate-token'),
     path('api/v1/refresh-token/', RefreshTokenView.as_view(), name='refresh-token'),
     path('api/v1/verify/', VerifyView.as_view(), name='verify'),
+    path('api/v1/cache-stats', CacheStatsView.as_view(), name='cache-stats'),
 
     # Apps
     path('api/v1/labs/', include('labs.urls')),
     path('api/v1/courses/', include('courses.urls')),
     path('api/v1/classes/', include('classes.urls')),
-    path('api/v1/notices/', include('notices.urls'))
+    path('api/v1/notices/', include('notices.urls')),
+    path('api/v1/search', include('search.urls')),
+    path('api/v1/uploads/', include('uploads.urls')),
+    path('api/v1/downloads/', include('downloads.urls'))
 ]
 
 # if settings.DEBUG:
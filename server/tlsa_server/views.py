@@ -1,10 +1,12 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import translation
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
-from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework.views import APIView
 from .serializers import (TLSAUserSerializer, 
@@ -14,6 +16,13 @@ from .serializers import (TLSAUserSerializer,
                           RefreshTokenSerializer, 
                           UserInfoPatchSerializer)
 from .permissions import IsTeachingAffairs
+from .pagination import KeysetPaginationMixin, KEYSET_PAGINATION_PARAMETERS
+from .authentication import TokenClaimsAuthentication, TLSARefreshToken, is_token_revoked, revoke_token
+from .login import LoginBusy, verify_login
+from .async_views import AsyncAPIViewMixin
+from .images import IMAGE_SIZE_PARAMETER, image_size_context
+from .cache import namespace_cache, get_cache_stats, get_model_versions, reset_cache_stats
+from .conditional import conditional_get
 
 class RegisterView(APIView):
     """Register a new user."""
@@ -167,15 +176,17 @@ class LoginView(APIView):
             password = request.data.get('password')
 
             User = get_user_model()
+            user = User.objects.filter(user_id=user_id).first()
+
             try:
-                user = User.objects.get(user_id=user_id)
-            except User.DoesNotExist:
-                return Response({"error": "Invalid user ID or password."}, status=status.HTTP_401_UNAUTHORIZED)
+                valid = verify_login(request, user, user_id, password)
+            except LoginBusy as e:
+                return Response({"error": str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={"Retry-After": "1"})
 
-            if not user.check_password(password):
+            if not valid:
                 return Response({"error": "Invalid user ID or password."}, status=status.HTTP_401_UNAUTHORIZED)
 
-            refresh = RefreshToken.for_user(user)
+            refresh = TLSARefreshToken.for_user(user)
             return Response({
                 'refresh': str(refresh),
                 'access': str(refresh.access_token),
@@ -185,10 +196,40 @@ class LoginView(APIView):
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class UserInfoView(APIView):
+def user_info_state(view, request):
+    # Per role, a role the handler refuses must never be served another role's cached list
+    return get_model_versions(get_user_model()) + [request.user.role], None
+
+USER_LIST_SCHEMA = dict(
+    parameters=[
+        OpenApiParameter(
+            name='user_id',
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description='User ID to retrieve information for',
+            required=False,
+        ),
+        OpenApiParameter(
+            name='role',
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description='Filter users by role (student/teacher/manager)',
+            required=False,
+        ),
+        IMAGE_SIZE_PARAMETER,
+    ] + KEYSET_PAGINATION_PARAMETERS,
+    responses={
+        200: TLSAUserSerializer(many=True),
+        404: None,
+        403: None,
+    },
+)
+
+class UserInfoView(KeysetPaginationMixin, APIView):
     """Retrieve user information based on user_id."""
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenClaimsAuthentication]
     serializer_class = TLSAUserSerializer
+    pagination_ordering = 'user_id'
 
     def get_permissions(self):
         # IMPORTANT: GET method may have additional user role behaviours defined
@@ -196,30 +237,7 @@ class UserInfoView(APIView):
             return [IsAuthenticated()]
         return []
 
-    @extend_schema(
-        parameters=[
-            OpenApiParameter(
-                name='user_id',
-                type=str,
-                location=OpenApiParameter.QUERY,
-                description='User ID to retrieve information for',
-                required=False,
-            ),
-            OpenApiParameter(
-                name='role',
-                type=str,
-                location=OpenApiParameter.QUERY,
-                description='Filter users by role (student/teacher/manager)',
-                required=False,
-            ),
-        ],
-        responses={
-            200: TLSAUserSerializer(many=True),
-            404: None,
-            403: None,
-        },
-    )
-    def get(self, request):
+    def get_users(self, request):
         user_id = request.query_params.get('user_id')
         role = request.query_params.get('role')
 
@@ -230,16 +248,20 @@ class UserInfoView(APIView):
             filters["role"] = role
 
         User = get_user_model()
-        users = User.objects.filter(**filters)
+        return User.objects.filter(**filters)
+
+    @extend_schema(**USER_LIST_SCHEMA)
+    @conditional_get(user_info_state, cache_namespace='users')
+    def get(self, request):
+        user_id = request.query_params.get('user_id')
+        users = self.get_users(request)
 
         # Check if the requesting user is allowed to view the information
         if request.user.role in ['teacher', 'manager', 'student', 'teachingAffairs']:
-            serializer = self.serializer_class(users, many=True)
-            return Response(serializer.data)
+            return self.paginated_response(users, self.serializer_class, context=image_size_context(request))
         elif request.user.role == 'student':
             if user_id and request.user.user_id == user_id:
-                serializer = self.serializer_class(users, many=True)
-                return Response(serializer.data)
+                return self.paginated_response(users, self.serializer_class, context=image_size_context(request))
             else:
                 return Response({"error": "You do not have permission to view this user's information."}, status=status.HTTP_403_FORBIDDEN)
         else:
@@ -272,9 +294,19 @@ class UserInfoView(APIView):
         else:
             return Response({"error": "You do not have permission to update this user's information."}, status=status.HTTP_403_FORBIDDEN)
         
+class AsyncUserInfoView(AsyncAPIViewMixin, UserInfoView):
+    """UserInfoView with an async GET, routed instead of UserInfoView when ASYNC_VIEWS is on."""
+
+    @extend_schema(**USER_LIST_SCHEMA)
+    @conditional_get(user_info_state, cache_namespace='users')
+    async def get(self, request):
+        if request.user.role not in ['teacher', 'manager', 'student', 'teachingAffairs']:
+            return Response({"error": "You do not have permission to view this user's information."}, status=status.HTTP_403_FORBIDDEN)
+        return await self.apaginated_response(self.get_users(request), self.serializer_class, context=image_size_context(request))
+
 class ChangeUserRoleView(APIView):
     """Change user role."""
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [TokenClaimsAuthentication]
     serializer_class = TLSAUserSerializer
 
     def get_permissions(self):
@@ -385,7 +417,18 @@ class RefreshTokenView(APIView):
 
             try:
                 # Create a token object from the refresh token string
-                token = RefreshToken(refresh)
+                token = TLSARefreshToken(refresh)
+                if is_token_revoked(token):
+                    return Response({"error": "Invalid refresh token."}, status=status.HTTP_401_UNAUTHORIZED)
+
+                # The role claim comes from the database, not from the refresh token: a role or
+                # is_active change may only have reached another worker's deny-list
+                User = get_user_model()
+                user = User.objects.filter(user_id=token['user_id'], is_active=True).only('user_id', 'role').first()
+                if user is None:
+                    return Response({"error": "Invalid refresh token."}, status=status.HTTP_401_UNAUTHORIZED)
+                token['user_id'] = user.user_id
+                token['role'] = user.role
 
                 # Generate a new access token
                 new_access = str(token.access_token)
@@ -398,6 +441,28 @@ class RefreshTokenView(APIView):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class LogoutView(APIView):
+    """Revoke the refresh token and the access token used for this request."""
+    authentication_classes = [TokenClaimsAuthentication]
+    permission_classes = [IsAuthenticated]
+    serializer_class = RefreshTokenSerializer
+
+    def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        if serializer.is_valid():
+            try:
+                refresh = TLSARefreshToken(serializer.validated_data['refresh'])
+            except TokenError:
+                return Response({"error": "Invalid refresh token."}, status=status.HTTP_401_UNAUTHORIZED)
+            if str(refresh['user_id']) != request.user.user_id:
+                return Response({"error": "Refresh token belongs to another user."}, status=status.HTTP_403_FORBIDDEN)
+
+            revoke_token(refresh)
+            revoke_token(request.auth)
+            return Response({"message": "Logged out successfully."})
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
 
 class VerifyView(APIView):
     """Verify the current user's token."""
@@ -405,4 +470,73 @@ class VerifyView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        return Response({"message": "Token is valid."})
\ No newline at end of file
+        return Response({"message": "Token is valid."})
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """OpenAPI schema, generated once per version and language and kept in the schema cache namespace."""
+
+    def _get_schema_response(self, request):
+        version = self.api_version or request.version or self._get_version_parameter(request)
+        schema_cache = namespace_cache('schema')
+        key = f"{version}:{translation.get_language()}:{self.serve_public}"
+        schema = schema_cache.get(key)
+        if schema is None:
+            generator = self.generator_class(urlconf=self.urlconf, api_version=version, patterns=self.patterns)
+            schema = generator.get_schema(request=request, public=self.serve_public)
+            schema_cache.set(key, schema)
+        return Response(
+            data=schema,
+            headers={"Content-Disposition": f'inline; filename="{self._get_filename(request, version)}"'}
+        )
+
+class CacheStatsView(APIView):
+    """Report cache hit/miss ratios per namespace for operators."""
+    authentication_classes = [TokenClaimsAuthentication]
+    permission_classes = [IsTeachingAffairs]
+
+    @extend_schema(
+        responses={
+            200: OpenApiExample(
+                'Cache statistics',
+                value={
+                    "backend": "django.core.cache.backends.redis.RedisCache",
+                    "stats_enabled": True,
+                    "namespaces": {
+                        "scope": {
+                            "description": "Resolved class and lab IDs per user",
+                            "hits": 90,
+                            "misses": 10,
+                            "hit_ratio": 0.9
+                        }
+                    }
+                }
+            ),
+        },
+    )
+    def get(self, request):
+        return Response({
+            "backend": settings.CACHES['default']['BACKEND'],
+            "stats_enabled": getattr(settings, 'CACHE_STATS', True),
+            "namespaces": get_cache_stats(),
+        })
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='namespace',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='Also drop every cached entry of this namespace',
+                required=False,
+            ),
+        ],
+    )
+    def delete(self, request):
+        namespace = request.query_params.get('namespace')
+        if namespace:
+            try:
+                namespace_cache(namespace).clear()
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        reset_cache_stats()
+        return Response({"message": "Cache statistics reset."})
@@ -0,0 +1,56 @@
+import hashlib
+import os
+from django.core.files import File
+
+# Bytes read from the request or the partial file at a time, so memory use does not grow with the upload
+READ_SIZE = 64 * 1024
+
+class IncompleteChunk(Exception):
+    pass
+
+def create_partial_file(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+
+def write_chunk(path, stream, offset, length):
+    """
+    Copy `length` bytes of `stream` into the partial file at `offset`.
+
+    Bytes past the chunk, left by an earlier interrupted chunk, are cut off. Returns the
+    SHA-256 hex digest of the chunk, raises IncompleteChunk if the stream ends early.
+    """
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, 'r+b') as file:
+        file.seek(offset)
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                raise IncompleteChunk(f"Received {length - remaining} of {length} bytes.")
+            file.write(data)
+            digest.update(data)
+            remaining -= len(data)
+        file.truncate()
+    return digest.hexdigest()
+
+def file_sha256(path, length=None):
+    """SHA-256 hex digest of the first `length` bytes of a file, of all of it by default."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        remaining = os.path.getsize(path) if length is None else length
+        while remaining:
+            data = file.read(min(READ_SIZE * 16, remaining))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+    return digest.hexdigest()
+
+class PartialFile(File):
+    """
+    A finished partial file. Like Django's TemporaryUploadedFile, FileSystemStorage moves
+    it into place instead of copying it.
+    """
+
+    def temporary_file_path(self):
+        return self.file.name
@@ -0,0 +1,31 @@
+import os
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from uploads.models import UploadSession
+
+class Command(BaseCommand):
+    help = 'Delete unfinished uploads untouched for UPLOAD_SESSION_MAX_AGE seconds and partial files without an upload'
+
+    def handle(self, *args, **kwargs):
+        max_age = settings.UPLOAD_SESSION_MAX_AGE
+        expired = UploadSession.objects.filter(updated_at__lt=timezone.now() - timedelta(seconds=max_age))
+        count = 0
+        for session in expired.iterator():
+            session.discard()
+            count += 1
+
+        # Partial files of sessions deleted with their owner
+        orphans = 0
+        directory = os.path.join(settings.MEDIA_ROOT, settings.UPLOAD_TEMP_DIR)
+        if os.path.isdir(directory):
+            live = {f'{upload_id}.part' for upload_id in UploadSession.objects.values_list('id', flat=True)}
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name not in live and entry.stat().st_mtime < time.time() - max_age:
+                        os.remove(entry.path)
+                        orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} expired uploads and {orphans} orphaned partial files.'))
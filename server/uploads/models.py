@@ -0,0 +1,45 @@
+import os
+import uuid
+from django.conf import settings
+from django.db import models
+from tlsa_server.models import TLSA_User
+
+class UploadSession(models.Model):
+    """
+    A chunked upload in progress (see uploads.views).
+
+    Chunks are appended to a partial file under MEDIA_ROOT until `received` reaches
+    `size`. Finalizing moves the file into its target field and deletes the session,
+    `manage.py expire_uploads` removes abandoned sessions.
+    """
+    TARGET_CHOICES = [
+        ('experiment_file', 'Experiment file'),
+        ('notice_file', 'Notice file'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(TLSA_User, on_delete=models.CASCADE, to_field='user_id', db_column='owner_user_id')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    target_id = models.BigIntegerField(blank=True, null=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    checksum = models.CharField(max_length=64, blank=True, null=True)  # Expected SHA-256 of the whole file
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'upload_session'
+
+    @property
+    def partial_path(self):
+        return os.path.join(settings.MEDIA_ROOT, settings.UPLOAD_TEMP_DIR, f'{self.id}.part')
+
+    def discard(self):
+        """Delete the session and its partial file."""
+        if os.path.exists(self.partial_path):
+            os.remove(self.partial_path)
+        self.delete()
+
+    def __str__(self):
+        return f"Upload {self.id} of {self.filename} ({self.received}/{self.size} bytes)"
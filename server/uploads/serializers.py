@@ -0,0 +1,39 @@
+import os
+from django.conf import settings
+from rest_framework import serializers
+from .models import UploadSession
+
+SHA256_REGEX = r'^[0-9a-fA-F]{64}$'
+
+class UploadInitSerializer(serializers.Serializer):
+    target = serializers.ChoiceField(choices=UploadSession.TARGET_CHOICES)
+    target_id = serializers.IntegerField(required=False, allow_null=True)
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+    checksum = serializers.RegexField(SHA256_REGEX, required=False, allow_null=True)
+
+    def validate_filename(self, value):
+        # Only the name is kept, the directory comes from the target field
+        name = os.path.basename(value.replace('\\', '/'))
+        if not name:
+            raise serializers.ValidationError("Must be a file name.")
+        return name
+
+    def validate_size(self, value):
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Files are limited to {settings.UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+    def validate_checksum(self, value):
+        return value.lower() if value else value
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    upload_id = serializers.UUIDField(source='id', read_only=True)
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['upload_id', 'target', 'target_id', 'filename', 'size', 'checksum', 'offset', 'created_at', 'updated_at']
+
+class UploadFinalizeSerializer(serializers.Serializer):
+    checksum = serializers.RegexField(SHA256_REGEX, required=False, allow_null=True)
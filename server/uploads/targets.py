@@ -0,0 +1,36 @@
+from classes.models import Experiment, ExperimentFile
+from notices.models import NoticeContent
+
+class ExperimentFileTarget:
+    """Adds an ExperimentFile to the experiment `target_id`."""
+    roles = ['teacher', 'manager', 'teachingAffairs']  # Same as ExperimentView.patch
+    not_found = "Experiment not found."
+
+    def exists(self, target_id):
+        return target_id is not None and Experiment.objects.filter(id=target_id).exists()
+
+    def attach(self, target_id, file):
+        experiment_file = ExperimentFile.objects.create(experiment_id=target_id, file=file)
+        return experiment_file.id, experiment_file.file
+
+class NoticeFileTarget:
+    """Sets file_content of the NoticeContent `target_id`, or creates a file content without one."""
+    roles = ['teacher', 'manager']  # Same as NoticeContentView.post
+    not_found = "Notice content not found."
+
+    def exists(self, target_id):
+        return target_id is None or NoticeContent.objects.filter(id=target_id).exists()
+
+    def attach(self, target_id, file):
+        if target_id is None:
+            content = NoticeContent(content_type='file')
+        else:
+            content = NoticeContent.objects.get(id=target_id)
+        content.file_content = file
+        content.save()
+        return content.id, content.file_content
+
+UPLOAD_TARGETS = {
+    'experiment_file': ExperimentFileTarget(),
+    'notice_file': NoticeFileTarget(),
+}
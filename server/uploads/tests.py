@@ -0,0 +1,120 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from classes.models import Class, Experiment, ExperimentFile
+from notices.models import NoticeContent
+from tlsa_server.models import TLSA_User
+from .models import UploadSession
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media_settings = override_settings(MEDIA_ROOT=self.media_root, UPLOAD_CHUNK_MAX_SIZE=1024)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+        self.client = APIClient()
+        self.teacher = TLSA_User.objects.create_user(username='2021000001', user_id='2021000001', password='password', role='teacher')
+        self.client.force_authenticate(self.teacher)
+        class_instance = Class.objects.create(name='Titration', start_time=timezone.now())
+        self.experiment = Experiment.objects.create(title='Titration', estimated_time=1, class_id=class_instance)
+        self.data = os.urandom(2500)
+
+    def start(self, **fields):
+        body = {'target': 'experiment_file', 'target_id': self.experiment.id, 'filename': 'video.mp4', 'size': len(self.data)}
+        body.update(fields)
+        return self.client.post(reverse('upload'), body, format='json')
+
+    def put_chunk(self, upload_id, offset, chunk, **params):
+        url = reverse('upload-chunk', args=[upload_id]) + '?' + '&'.join(f'{key}={value}' for key, value in {'offset': offset, **params}.items())
+        return self.client.put(url, chunk, content_type='application/octet-stream')
+
+    def test_upload_to_experiment(self):
+        response = self.start(checksum=hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(response.status_code, 201)
+        upload_id = response.data['upload_id']
+
+        for offset in range(0, len(self.data), 1024):
+            chunk = self.data[offset:offset + 1024]
+            response = self.put_chunk(upload_id, offset, chunk, checksum=hashlib.sha256(chunk).hexdigest())
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['offset'], offset + len(chunk))
+
+        response = self.client.post(reverse('upload-finalize', args=[upload_id]), {}, format='json')
+        self.assertEqual(response.status_code, 201)
+        experiment_file = ExperimentFile.objects.get(experiment=self.experiment)
+        self.assertEqual(response.data['id'], experiment_file.id)
+        digest = hashlib.sha256(self.data).hexdigest()
+        self.assertEqual(experiment_file.file.name, f'experiment_files/{digest[:2]}/{digest}.mp4')
+        with experiment_file.file.open('rb') as file:
+            self.assertEqual(file.read(), self.data)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'uploads_partial')), [])
+
+    def test_resume_after_interrupted_chunk(self):
+        upload_id = self.start().data['upload_id']
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data[:1024]).status_code, 200)
+
+        # A chunk with a bad checksum is written but not counted, the offset stays put
+        response = self.put_chunk(upload_id, 1024, self.data[1024:2048], checksum='0' * 64)
+        self.assertEqual((response.status_code, response.data['offset']), (400, 1024))
+        response = self.put_chunk(upload_id, 2048, self.data[2048:])
+        self.assertEqual((response.status_code, response.data['offset']), (409, 1024))
+
+        response = self.client.get(reverse('upload-checksum', args=[upload_id]))
+        self.assertEqual(response.data, {'offset': 1024, 'sha256': hashlib.sha256(self.data[:1024]).hexdigest()})
+
+        self.put_chunk(upload_id, 1024, self.data[1024:2048])
+        self.put_chunk(upload_id, 2048, self.data[2048:])
+        self.assertEqual(self.client.get(reverse('upload-detail', args=[upload_id])).data['offset'], len(self.data))
+        response = self.client.post(reverse('upload-finalize', args=[upload_id]), {'checksum': hashlib.sha256(self.data).hexdigest()}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_checksum_mismatch_resets_upload(self):
+        upload_id = self.start(checksum='a' * 64).data['upload_id']
+        for offset in range(0, len(self.data), 1024):
+            self.put_chunk(upload_id, offset, self.data[offset:offset + 1024])
+        response = self.client.post(reverse('upload-finalize', args=[upload_id]), {}, format='json')
+        self.assertEqual((response.status_code, response.data['offset']), (400, 0))
+        self.assertFalse(ExperimentFile.objects.exists())
+
+    def test_notice_file_creates_content(self):
+        upload_id = self.start(target='notice_file', target_id=None, filename='../sheet.pdf').data['upload_id']
+        for offset in range(0, len(self.data), 1024):
+            self.put_chunk(upload_id, offset, self.data[offset:offset + 1024])
+        response = self.client.post(reverse('upload-finalize', args=[upload_id]), {}, format='json')
+        self.assertEqual(response.status_code, 201)
+        content = NoticeContent.objects.get(id=response.data['id'])
+        self.assertEqual(content.content_type, 'file')
+        self.assertTrue(content.file_content.name.startswith('notice_files/'))
+        self.assertTrue(content.file_content.name.endswith('.pdf'))
+        self.assertEqual(content.file_content_original_name, 'sheet.pdf')
+
+    def test_validation_and_ownership(self):
+        self.assertEqual(self.start(target_id=999).status_code, 404)
+        self.assertEqual(self.start(size=10 ** 12).status_code, 400)
+        upload_id = self.start().data['upload_id']
+        self.assertEqual(self.put_chunk(upload_id, 0, b'x' * 1025).status_code, 413)
+        self.assertEqual(self.client.post(reverse('upload-finalize', args=[upload_id]), {}, format='json').status_code, 400)
+
+        student = TLSA_User.objects.create_user(username='2022000001', user_id='2022000001', password='password', role='student')
+        self.client.force_authenticate(student)
+        self.assertEqual(self.start().status_code, 403)
+        self.assertEqual(self.put_chunk(upload_id, 0, self.data[:10]).status_code, 404)
+
+    def test_expire_uploads(self):
+        upload_id = self.start().data['upload_id']
+        UploadSession.objects.filter(id=upload_id).update(updated_at=timezone.now() - timedelta(days=2))
+        out = StringIO()
+        call_command('expire_uploads', stdout=out)
+        self.assertIn('Deleted 1 expired uploads', out.getvalue())
+        self.assertFalse(UploadSession.objects.exists())
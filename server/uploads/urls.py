@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import UploadView, UploadDetailView, UploadChunkView, UploadChecksumView, UploadFinalizeView
+
+urlpatterns = [
+    path('', UploadView.as_view(), name='upload'),
+    path('<uuid:upload_id>', UploadDetailView.as_view(), name='upload-detail'),
+    path('<uuid:upload_id>/chunk', UploadChunkView.as_view(), name='upload-chunk'),
+    path('<uuid:upload_id>/checksum', UploadChecksumView.as_view(), name='upload-checksum'),
+    path('<uuid:upload_id>/finalize', UploadFinalizeView.as_view(), name='upload-finalize'),
+]
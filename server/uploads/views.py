@@ -0,0 +1,238 @@
+from django.conf import settings
+from django.db import transaction
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
+from tlsa_server.permissions import IsAuthenticated, IsTeacher, IsManager, IsTeachingAffairs
+from .chunks import IncompleteChunk, PartialFile, create_partial_file, file_sha256, write_chunk
+from .models import UploadSession
+from .serializers import UploadFinalizeSerializer, UploadInitSerializer, UploadSessionSerializer
+from .targets import UPLOAD_TARGETS
+
+def get_upload(request, upload_id, lock=False):
+    """The upload session `upload_id` of the requesting user, or None."""
+    sessions = UploadSession.objects.select_for_update() if lock else UploadSession.objects
+    return sessions.filter(id=upload_id, owner_id=request.user.user_id).first()
+
+UPLOAD_NOT_FOUND = OpenApiExample(
+    name="Upload not found",
+    value={"message": "Upload not found."},
+    response_only=True,
+)
+
+class UploadView(APIView):
+    """Start a chunked upload."""
+    permission_classes = [(IsTeacher|IsManager|IsTeachingAffairs)]
+
+    @extend_schema(
+        request=UploadInitSerializer,
+        examples=[
+            OpenApiExample(
+                "Experiment video",
+                value={"target": "experiment_file", "target_id": 1, "filename": "titration.mp4", "size": 734003200, "checksum": "<sha256 hex>"},
+                request_only=True,
+            ),
+            OpenApiExample(
+                "Upload started",
+                value={"upload_id": "4f6c1b0e-7c1d-4b53-9d7c-2b1f0a8e9c11", "offset": 0, "chunk_size": 8388608},
+                response_only=True,
+            ),
+        ],
+    )
+    def post(self, request, format=None):
+        serializer = UploadInitSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        target = UPLOAD_TARGETS[data['target']]
+        if request.user.role not in target.roles:
+            return Response({"error": "You do not have permission to upload this file."}, status=status.HTTP_403_FORBIDDEN)
+        if not target.exists(data.get('target_id')):
+            return Response({"message": target.not_found}, status=status.HTTP_404_NOT_FOUND)
+
+        session = UploadSession.objects.create(owner_id=request.user.user_id, **data)
+        create_partial_file(session.partial_path)
+        return Response(
+            {"upload_id": session.id, "offset": 0, "chunk_size": settings.UPLOAD_CHUNK_MAX_SIZE},
+            status=status.HTTP_201_CREATED
+        )
+
+class UploadDetailView(APIView):
+    """State of an upload, e.g. the offset to resume from after a lost connection."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(responses={200: UploadSessionSerializer, 404: UPLOAD_NOT_FOUND})
+    def get(self, request, upload_id, format=None):
+        session = get_upload(request, upload_id)
+        if session is None:
+            return Response({"message": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(UploadSessionSerializer(session).data)
+
+    @extend_schema(
+        responses={
+            204: OpenApiExample(
+                name="Upload cancelled",
+                value={"message": "Upload cancelled."},
+                response_only=True,
+            ),
+            404: UPLOAD_NOT_FOUND,
+        },
+    )
+    def delete(self, request, upload_id, format=None):
+        session = get_upload(request, upload_id)
+        if session is None:
+            return Response({"message": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        session.discard()
+        return Response({"message": "Upload cancelled."}, status=status.HTTP_204_NO_CONTENT)
+
+class UploadChunkView(APIView):
+    """Append the raw request body to an upload."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request={'application/octet-stream': {'type': 'string', 'format': 'binary'}},
+        parameters=[
+            OpenApiParameter(
+                name='offset',
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description='Position of the chunk in the file, must equal the offset received so far',
+                required=True,
+            ),
+            OpenApiParameter(
+                name='checksum',
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description='SHA-256 (hex) of the chunk, the chunk is rejected when it differs',
+                required=False,
+            ),
+        ],
+        examples=[
+            OpenApiExample(
+                "Chunk stored",
+                value={"offset": 8388608},
+                response_only=True,
+            ),
+            OpenApiExample(
+                "Wrong offset",
+                value={"error": "Chunk does not start at the received offset.", "offset": 8388608},
+                response_only=True,
+                status_codes=['409'],
+            ),
+        ],
+    )
+    def put(self, request, upload_id, format=None):
+        try:
+            offset = int(request.query_params.get('offset', ''))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({"error": "offset and Content-Length must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if length < 1:
+            return Response({"error": "The chunk is empty."}, status=status.HTTP_400_BAD_REQUEST)
+        if length > settings.UPLOAD_CHUNK_MAX_SIZE:
+            return Response({"error": f"Chunks are limited to {settings.UPLOAD_CHUNK_MAX_SIZE} bytes."}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        # The row lock keeps two requests from writing the same upload at once
+        with transaction.atomic():
+            session = get_upload(request, upload_id, lock=True)
+            if session is None:
+                return Response({"message": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+            if offset != session.received:
+                return Response({"error": "Chunk does not start at the received offset.", "offset": session.received}, status=status.HTTP_409_CONFLICT)
+            if offset + length > session.size:
+                return Response({"error": "Chunk goes past the size given when the upload started.", "offset": session.received}, status=status.HTTP_400_BAD_REQUEST)
+
+            try:
+                digest = write_chunk(session.partial_path, request.stream, offset, length)
+            except IncompleteChunk as error:
+                return Response({"error": str(error), "offset": session.received}, status=status.HTTP_400_BAD_REQUEST)
+            checksum = request.query_params.get('checksum')
+            if checksum and checksum.lower() != digest:
+                return Response({"error": "Chunk checksum mismatch.", "offset": session.received}, status=status.HTTP_400_BAD_REQUEST)
+
+            session.received = offset + length
+            session.save(update_fields=['received', 'updated_at'])
+        return Response({"offset": session.received})
+
+class UploadChecksumView(APIView):
+    """SHA-256 of the bytes received so far, to check them before resuming an upload."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        examples=[
+            OpenApiExample(
+                "Checksum",
+                value={"offset": 8388608, "sha256": "<sha256 hex>"},
+                response_only=True,
+            ),
+        ],
+        responses={200: None, 404: UPLOAD_NOT_FOUND},
+    )
+    def get(self, request, upload_id, format=None):
+        session = get_upload(request, upload_id)
+        if session is None:
+            return Response({"message": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"offset": session.received, "sha256": file_sha256(session.partial_path, session.received)})
+
+class UploadFinalizeView(APIView):
+    """Check a complete upload and attach it to its experiment or notice content."""
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        request=UploadFinalizeSerializer,
+        examples=[
+            OpenApiExample(
+                "Upload finished",
+                value={
+                    "message": "Upload finished.",
+                    "target": "experiment_file",
+                    "id": 12,
+                    "file": "http://<ip>/media/experiment_files/titration-20241101_120000.mp4",
+                    "sha256": "<sha256 hex>",
+                },
+                response_only=True,
+            ),
+        ],
+    )
+    def post(self, request, upload_id, format=None):
+        serializer = UploadFinalizeSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            session = get_upload(request, upload_id, lock=True)
+            if session is None:
+                return Response({"message": "Upload not found."}, status=status.HTTP_404_NOT_FOUND)
+            if session.received != session.size:
+                return Response({"error": "The upload is incomplete.", "offset": session.received}, status=status.HTTP_400_BAD_REQUEST)
+
+            digest = file_sha256(session.partial_path)
+            expected = serializer.validated_data.get('checksum') or session.checksum
+            if expected and expected.lower() != digest:
+                # The received bytes are unusable, the client starts over at offset 0
+                create_partial_file(session.partial_path)
+                session.received = 0
+                session.save(update_fields=['received', 'updated_at'])
+                return Response({"error": "Checksum mismatch, the upload was reset.", "offset": 0}, status=status.HTTP_400_BAD_REQUEST)
+
+            target = UPLOAD_TARGETS[session.target]
+            if not target.exists(session.target_id):
+                session.discard()
+                return Response({"message": target.not_found}, status=status.HTTP_404_NOT_FOUND)
+
+            with open(session.partial_path, 'rb') as partial:
+                object_id, file = target.attach(session.target_id, PartialFile(partial, name=session.filename))
+            session.discard()
+
+        return Response(
+            {
+                "message": "Upload finished.",
+                "target": session.target,
+                "id": object_id,
+                "file": file.url,
+                "sha256": digest,
+            },
+            status=status.HTTP_201_CREATED
+        )